@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark for the aria2c progress parser
+
+Replays aria2c console output and reports the cost per line of the
+structured parser next to the old split-and-search loop it replaced.
+
+parse_line is a per-line regression: it does more work per readout than
+the old loop (sizes, speed, ETA and connections instead of just the
+percentage) and costs several times as much per line. The only offset is
+the time-based skipping in Aria2ProgressParser's rate limiter, which
+parses a readout only when a record is due. A replay runs far faster than
+real time, so the limiter skips almost every readout and parser.feed
+looks cheap; live aria2c prints about one readout per second, so there
+the limiter skips little and the per-line cost is what matters.
+
+data/aria2c_output.txt is synthetic: aria2c 1.37.0 output from a 160 MiB
+download over 4 connections from a local server throttled to a constant
+rate, so the readouts advance in uniform steps and do not reflect a
+real network. To measure real output, capture a download and pass the
+file:
+
+    aria2c -x4 -s4 --enable-color=false --summary-interval=0 <url> > output.txt 2>&1
+    python benchmarks/bench_aria2_progress.py [output.txt] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.aria2_progress import Aria2ProgressParser, parse_line  # noqa: E402
+
+
+DEFAULT_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'aria2c_output.txt')
+
+
+def legacy_parse(lines):
+    """The text-mode loop previously in Aria2Manager._download_cli (decoding included)"""
+    for line in lines:
+        line = line.decode('utf-8', 'replace')
+        if '%' in line:
+            try:
+                parts = line.split()
+                for part in parts:
+                    if '%' in part:
+                        int(part.replace('%', '').replace('(', ''))
+                        break
+            except Exception:
+                pass
+
+
+def structured_parse(lines):
+    """parse_line on every line"""
+    for line in lines:
+        parse_line(line)
+
+
+def rate_limited_feed(lines):
+    """The full parser as used by _download_cli (callback rate limit included)"""
+    parser = Aria2ProgressParser(lambda record: None)
+    for line in lines:
+        parser.feed(line)
+    parser.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('data', nargs='?', default=DEFAULT_DATA, help='recorded aria2c output')
+    parser.add_argument('--repeat', type=int, default=200, help='times the recording is replayed per run')
+    args = parser.parse_args(argv)
+
+    with open(args.data, 'rb') as f:
+        raw = f.read().splitlines(keepends=True) * args.repeat
+
+    records = [record for record in map(parse_line, raw[:len(raw) // args.repeat]) if record]
+    print(f'{len(raw)} lines, {len(records)} readouts per replay; last: {records[-1] if records else None}')
+
+    per_line = {}
+    for name, func in (
+        ('legacy split', legacy_parse),
+        ('parse_line', structured_parse),
+        ('parser.feed', rate_limited_feed),
+    ):
+        best = min(timeit.repeat(lambda: func(raw), number=1, repeat=5))
+        per_line[name] = best * 1e9 / len(raw)
+        print(f'{name:14s} {per_line[name]:8.0f} ns/line')
+
+    # Per-line cost against the old loop; above 1.0 is a regression
+    legacy = per_line['legacy split']
+    print(f"parse_line vs legacy: {per_line['parse_line'] / legacy:.2f}x per line")
+    print(f"parser.feed vs legacy: {per_line['parser.feed'] / legacy:.2f}x per line "
+          f"(replay faster than real time: the rate limiter skips most readouts)")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,18 +3,25 @@
 """
 yt-dlp GUI Application
 メインエントリーポイント
+
+--headless を指定するとGUIなしで起動します（QtWidgetsは読み込みません）
 """
 
 import sys
 import os
-from PyQt5.QtWidgets import QApplication
-from PyQt5.QtCore import Qt
-from src.app import YtDlpGUI
-from src.core.config import ConfigManager
-from src.core.logger import setup_logger
 
 def main():
     """アプリケーションのメインエントリーポイント"""
+    # ヘッドレスモード（QtCoreのみ）
+    if '--headless' in sys.argv[1:]:
+        from src.headless import main as headless_main
+        sys.exit(headless_main([arg for arg in sys.argv[1:] if arg != '--headless']))
+    
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import Qt
+    from src.app import YtDlpGUI
+    from src.core.logger import setup_logger
+    
     # ハイDPI対応
     QApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
     QApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Plugin API - shared by the GUI and headless front ends (QtCore only)
+"""
+
+import os
+from PyQt5.QtCore import pyqtSignal, QObject
+
+from .hook_bus import HookBus
+
+
+class AppAPI(QObject):
+    """Public API for plugins"""
+    
+    log_signal = pyqtSignal(str, str)  # message, level
+    config_changed = pyqtSignal(dict)  # changed key -> new value
+    
+    def __init__(self, app):
+        super().__init__()
+        self._app = app
+        self.hook_bus = HookBus.from_config(app.config, log=self.log)
+        
+        # Re-emit as a signal so listeners run on the UI thread
+        app.config.subscribe(self.config_changed.emit)
+    
+    def register_hook(self, name: str, callback):
+        """Register a hook callback"""
+        self.hook_bus.register(name, callback)
+    
+    def clear_hooks(self):
+        """Remove all hook callbacks"""
+        self.hook_bus.clear()
+    
+    def call_hook(self, name: str, info: dict):
+        """Queue hook callbacks; they run on the hook bus, not the caller's thread"""
+        self.hook_bus.emit(name, info)
+    
+    def get_hook_stats(self) -> dict:
+        """Per-plugin hook timing statistics"""
+        return self.hook_bus.stats()
+    
+    def get_cache_stats(self) -> dict:
+        """Extraction cache hit/miss counters and size (empty if the cache is disabled)"""
+        cache = self._app.download_manager.resolver.cache
+        return cache.stats() if cache else {}
+    
+    def log(self, message: str, level: str = 'INFO'):
+        """Log message to UI"""
+        self.log_signal.emit(message, level)
+    
+    def open_file(self, path: str):
+        """Open file with system default application"""
+        import subprocess
+        import platform
+        
+        try:
+            if platform.system() == 'Windows':
+                os.startfile(path)
+            elif platform.system() == 'Darwin':
+                subprocess.run(['open', path])
+            else:
+                subprocess.run(['xdg-open', path])
+        except Exception as e:
+            self.log(f"Failed to open file: {e}")
+    
+    def get_config(self) -> dict:
+        """Get all configuration (a copy; connect config_changed to follow changes)"""
+        return self._app.config.get_all()
+    
+    def set_config(self, key: str, value):
+        """Set configuration value"""
+        self._app.config.set(key, value)
+    
+    def update_config(self, values: dict):
+        """Set several configuration values at once"""
+        self._app.config.update(values)
+    
+    def add_downloads(self, urls, output_dir: str = None, priority: int = 0,
+                      playlist: bool = False) -> dict:
+        """Queue several URLs; returns new task ids and URLs skipped as already downloaded"""
+        manager = self._app.download_manager
+        output_dir = output_dir or self._app.config.get('output_dir')
+        added, skipped = [], []
+        
+        for url in urls:
+            if playlist:
+                manager.add_playlist(url, output_dir, priority)
+                continue
+            
+            task = manager.add_download(url, output_dir, priority)
+            if task is None:
+                skipped.append(url)
+            else:
+                added.append(task.id)
+        
+        return {'success': True, 'added': added, 'skipped': skipped}
+    
+    def list_tasks(self, state: str = None, query: str = None) -> list:
+        """Snapshot of tasks, optionally filtered by state name and URL/title text"""
+        tasks = [task.snapshot() for task in list(self._app.download_manager.tasks)]
+        
+        if state:
+            states = set(state.split(','))
+            tasks = [t for t in tasks if t['state'] in states]
+        if query:
+            query = query.lower()
+            tasks = [
+                t for t in tasks
+                if query in t['url'].lower() or query in (t['title'] or '').lower()
+            ]
+        return tasks
+    
+    def pause_downloads(self, ids) -> int:
+        """Pause tasks by id; returns the number paused"""
+        manager = self._app.download_manager
+        return manager.pause_downloads(manager.find_tasks(ids))
+    
+    def resume_downloads(self, ids) -> int:
+        """Resume tasks by id; returns the number resumed"""
+        manager = self._app.download_manager
+        return manager.resume_downloads(manager.find_tasks(ids))
+    
+    def set_priority(self, ids, priority: int) -> int:
+        """Change the priority of tasks by id; returns the number changed"""
+        manager = self._app.download_manager
+        return manager.set_priority(manager.find_tasks(ids), int(priority))
+    
+    def set_speed_limit(self, ids, limit) -> int:
+        """Limit the download speed of tasks by id ('2M', '500K', 0 for none)"""
+        manager = self._app.download_manager
+        return manager.set_speed_limit(manager.find_tasks(ids), limit)
+    
+    def cancel_downloads(self, ids) -> int:
+        """Cancel and remove tasks by id; returns the number cancelled"""
+        manager = self._app.download_manager
+        tasks = manager.find_tasks(ids)
+        manager.cancel_downloads(tasks)
+        return len(tasks)
+    
+    def add_menu_action(self, menu_name: str, action_name: str, callback):
+        """Add action to menu"""
+        self._app.add_plugin_menu_action(menu_name, action_name, callback)
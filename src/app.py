@@ -8,81 +8,24 @@ import os
 import sys
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QPushButton, QLineEdit, QTextEdit, QLabel,
+    QPushButton, QLineEdit, QLabel,
     QFileDialog, QMessageBox, QMenuBar, QMenu, QAction,
     QDialog, QFormLayout, QSpinBox, QCheckBox, QComboBox,
-    QProgressBar, QScrollArea, QGroupBox, QListWidget,
-    QSplitter
+    QProgressBar, QGroupBox, QListWidget,
+    QSplitter, QTableView, QHeaderView, QAbstractItemView, QShortcut, QInputDialog
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QObject
-from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt, QSortFilterProxyModel
+from PyQt5.QtGui import QKeySequence
 
 from .config import ConfigManager
+from .api import AppAPI
 from .plugin_manager import PluginManager
 from .updater import Updater
 from .download_manager import DownloadManager
+from .download_model import DownloadListModel, ProgressDelegate
 from .settings_dialog import SettingsDialog
-
-
-class AppAPI(QObject):
-    """Public API for plugins"""
-    
-    log_signal = pyqtSignal(str)
-    
-    def __init__(self, app):
-        super().__init__()
-        self._app = app
-        self._hooks = {
-            'on_download_start': [],
-            'on_progress': [],
-            'on_complete': [],
-            'on_error': []
-        }
-    
-    def register_hook(self, name: str, callback):
-        """Register a hook callback"""
-        if name in self._hooks:
-            self._hooks[name].append(callback)
-    
-    def call_hook(self, name: str, info: dict):
-        """Call all registered hooks"""
-        if name in self._hooks:
-            for callback in self._hooks[name]:
-                try:
-                    callback(info)
-                except Exception as e:
-                    self.log(f"Plugin hook error: {e}")
-    
-    def log(self, message: str):
-        """Log message to UI"""
-        self.log_signal.emit(message)
-    
-    def open_file(self, path: str):
-        """Open file with system default application"""
-        import subprocess
-        import platform
-        
-        try:
-            if platform.system() == 'Windows':
-                os.startfile(path)
-            elif platform.system() == 'Darwin':
-                subprocess.run(['open', path])
-            else:
-                subprocess.run(['xdg-open', path])
-        except Exception as e:
-            self.log(f"Failed to open file: {e}")
-    
-    def get_config(self) -> dict:
-        """Get all configuration"""
-        return self._app.config.get_all()
-    
-    def set_config(self, key: str, value):
-        """Set configuration value"""
-        self._app.config.set(key, value)
-    
-    def add_menu_action(self, menu_name: str, action_name: str, callback):
-        """Add action to menu"""
-        self._app.add_plugin_menu_action(menu_name, action_name, callback)
+from .log_view import LogView
+from .control_server import ControlServer
 
 
 class YtDlpGUI(QMainWindow):
@@ -103,10 +46,21 @@ class YtDlpGUI(QMainWindow):
         
         # Connect signals
         self.api.log_signal.connect(self.log_message)
+        self.api.config_changed.connect(self.apply_config_changes)
         
         # Load plugins
         self.plugin_manager.load_plugins()
         
+        # Resume the queue left by the previous session
+        restored = self.download_manager.restore()
+        if restored:
+            self.log_message(f'前回のキューを復元しました: {restored}件')
+        
+        # Local HTTP control API (optional)
+        self.control_server = ControlServer.from_config(self.config, self.api)
+        if self.control_server:
+            self.control_server.start()
+        
         # Check for updates
         if self.config.get('auto_check_updates'):
             self.check_updates(silent=True)
@@ -133,6 +87,10 @@ class YtDlpGUI(QMainWindow):
         self.url_input.setPlaceholderText('動画URLを入力してください...')
         url_layout.addWidget(self.url_input)
         
+        self.playlist_check = QCheckBox('プレイリスト')
+        self.playlist_check.setToolTip('プレイリスト・チャンネルの全動画を順次キューに追加')
+        url_layout.addWidget(self.playlist_check)
+        
         self.download_btn = QPushButton('ダウンロード')
         self.download_btn.clicked.connect(self.start_download)
         url_layout.addWidget(self.download_btn)
@@ -159,17 +117,40 @@ class YtDlpGUI(QMainWindow):
         downloads_group = QGroupBox('ダウンロード')
         downloads_layout = QVBoxLayout()
         
-        # Downloads scroll area
-        scroll = QScrollArea()
-        scroll.setWidgetResizable(True)
-        scroll.setMinimumHeight(200)
+        # Downloads table (virtualized; only visible rows are painted)
+        self.downloads_model = DownloadListModel(
+            self.download_manager,
+            refresh_hz=self.config.get('progress_refresh_hz', 8),
+            parent=self
+        )
+        self.downloads_proxy = QSortFilterProxyModel(self)
+        self.downloads_proxy.setSourceModel(self.downloads_model)
+        self.downloads_proxy.setSortRole(DownloadListModel.SortRole)
+        self.downloads_proxy.setDynamicSortFilter(False)
+        
+        self.downloads_view = QTableView()
+        self.downloads_view.setModel(self.downloads_proxy)
+        self.downloads_view.setMinimumHeight(200)
+        self.downloads_view.setSortingEnabled(True)
+        self.downloads_view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.downloads_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.downloads_view.setItemDelegateForColumn(
+            DownloadListModel.COLUMN_PROGRESS, ProgressDelegate(self.downloads_view)
+        )
+        self.downloads_view.verticalHeader().hide()
+        self.downloads_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.downloads_view.horizontalHeader().setSectionResizeMode(
+            DownloadListModel.COLUMN_TITLE, QHeaderView.Stretch
+        )
+        self.downloads_view.setColumnWidth(DownloadListModel.COLUMN_PROGRESS, 160)
+        self.downloads_view.setColumnWidth(DownloadListModel.COLUMN_STATUS, 200)
+        self.downloads_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.downloads_view.customContextMenuRequested.connect(self.show_downloads_menu)
         
-        self.downloads_widget = QWidget()
-        self.downloads_layout = QVBoxLayout(self.downloads_widget)
-        self.downloads_layout.setAlignment(Qt.AlignTop)
-        scroll.setWidget(self.downloads_widget)
+        remove_shortcut = QShortcut(QKeySequence.Delete, self.downloads_view)
+        remove_shortcut.activated.connect(self.remove_selected_downloads)
         
-        downloads_layout.addWidget(scroll)
+        downloads_layout.addWidget(self.downloads_view)
         downloads_group.setLayout(downloads_layout)
         
         splitter.addWidget(downloads_group)
@@ -178,10 +159,12 @@ class YtDlpGUI(QMainWindow):
         log_group = QGroupBox('ログ')
         log_layout = QVBoxLayout()
         
-        self.log_text = QTextEdit()
-        self.log_text.setReadOnly(True)
-        self.log_text.setMaximumHeight(150)
-        log_layout.addWidget(self.log_text)
+        self.log_view = LogView(
+            capacity=self.config.get('log_max_lines', 5000),
+            flush_interval_ms=self.config.get('log_flush_interval_ms', 200)
+        )
+        self.log_view.setMaximumHeight(180)
+        log_layout.addWidget(self.log_view)
         
         log_group.setLayout(log_layout)
         splitter.addWidget(log_group)
@@ -225,6 +208,16 @@ class YtDlpGUI(QMainWindow):
         
         downloads_menu.addSeparator()
         
+        import_archive_action = QAction('アーカイブをインポート(&I)...', self)
+        import_archive_action.triggered.connect(self.import_archive)
+        downloads_menu.addAction(import_archive_action)
+        
+        export_archive_action = QAction('アーカイブをエクスポート(&E)...', self)
+        export_archive_action.triggered.connect(self.export_archive)
+        downloads_menu.addAction(export_archive_action)
+        
+        downloads_menu.addSeparator()
+        
         open_folder_action = QAction('保存フォルダを開く(&O)', self)
         open_folder_action.triggered.connect(self.open_output_folder)
         downloads_menu.addAction(open_folder_action)
@@ -275,14 +268,96 @@ class YtDlpGUI(QMainWindow):
         
         output_dir = self.output_dir.text()
         
-        # Add download task
-        self.download_manager.add_download(url, output_dir, self.downloads_layout)
+        # Add download task (playlists are fed into the queue as they are enumerated)
+        if self.playlist_check.isChecked():
+            self.download_manager.add_playlist(url, output_dir)
+        elif self.download_manager.add_download(url, output_dir) is None:
+            self.url_input.clear()
+            self.log_message(f'ダウンロード済みのためスキップしました: {url}')
+            return
         
         # Clear URL input
         self.url_input.clear()
         
         self.log_message(f'ダウンロード開始: {url}')
     
+    def selected_tasks(self):
+        """Tasks for the selected rows, in view order"""
+        rows = sorted(index.row() for index in self.downloads_view.selectionModel().selectedRows())
+        return [
+            self.downloads_model.task_at(
+                self.downloads_proxy.mapToSource(self.downloads_proxy.index(row, 0)).row()
+            )
+            for row in rows
+        ]
+    
+    def show_downloads_menu(self, pos):
+        """Context menu for the selected downloads"""
+        if not self.selected_tasks():
+            return
+        
+        menu = QMenu(self)
+        menu.addAction('先頭へ移動', lambda: self.download_manager.move_to_top(self.selected_tasks()))
+        menu.addAction('末尾へ移動', lambda: self.download_manager.move_to_bottom(self.selected_tasks()))
+        menu.addAction('優先度...', self.prioritize_selected_downloads)
+        menu.addAction('速度制限...', self.limit_selected_downloads)
+        menu.addSeparator()
+        menu.addAction('一時停止', self.pause_selected_downloads)
+        menu.addAction('再開', self.resume_selected_downloads)
+        menu.addSeparator()
+        menu.addAction('削除', self.remove_selected_downloads)
+        menu.exec_(self.downloads_view.viewport().mapToGlobal(pos))
+    
+    def prioritize_selected_downloads(self):
+        """Set the priority of the selected downloads"""
+        tasks = self.selected_tasks()
+        if not tasks:
+            return
+        
+        priority, ok = QInputDialog.getInt(
+            self, '優先度', '優先度 (大きいほど先に開始):', tasks[0].priority, -100, 100
+        )
+        if ok:
+            self.download_manager.set_priority(tasks, priority)
+            self.log_message(f'優先度を設定しました: {priority} ({len(tasks)}件)')
+    
+    def limit_selected_downloads(self):
+        """Set a speed limit on the selected downloads"""
+        tasks = self.selected_tasks()
+        if not tasks:
+            return
+        
+        text, ok = QInputDialog.getText(
+            self, '速度制限', '上限 (例: 2M, 500K, 0=無制限):',
+            text=self.config.get('bandwidth_task_limit', '0')
+        )
+        if not ok:
+            return
+        
+        try:
+            self.download_manager.set_speed_limit(tasks, text.strip() or '0')
+            self.log_message(f'速度制限を設定しました: {text} ({len(tasks)}件)')
+        except ValueError as e:
+            QMessageBox.warning(self, '速度制限', f'値が正しくありません\n\n{e}')
+    
+    def pause_selected_downloads(self):
+        """Pause the selected downloads"""
+        count = self.download_manager.pause_downloads(self.selected_tasks())
+        if count:
+            self.log_message(f'一時停止しました: {count}件')
+    
+    def resume_selected_downloads(self):
+        """Resume the selected downloads"""
+        count = self.download_manager.resume_downloads(self.selected_tasks())
+        if count:
+            self.log_message(f'再開しました: {count}件')
+    
+    def remove_selected_downloads(self):
+        """Cancel and remove the selected downloads"""
+        tasks = self.selected_tasks()
+        if tasks:
+            self.download_manager.cancel_downloads(tasks)
+    
     def browse_output_dir(self):
         """Browse for output directory"""
         directory = QFileDialog.getExistingDirectory(
@@ -292,7 +367,6 @@ class YtDlpGUI(QMainWindow):
         )
         
         if directory:
-            self.output_dir.setText(directory)
             self.config.set('output_dir', directory)
             self.log_message(f'保存先変更: {directory}')
     
@@ -300,10 +374,21 @@ class YtDlpGUI(QMainWindow):
         """Open settings dialog"""
         dialog = SettingsDialog(self.config, self)
         if dialog.exec_() == QDialog.Accepted:
-            # Reload output dir
-            self.output_dir.setText(self.config.get('output_dir'))
+            # Changed values are applied through config_changed
             self.log_message('設定を保存しました')
     
+    def apply_config_changes(self, changed: dict):
+        """Apply configuration changes to running components"""
+        if 'output_dir' in changed:
+            self.output_dir.setText(changed['output_dir'])
+        if 'max_concurrent_downloads' in changed:
+            self.download_manager.set_max_concurrent(changed['max_concurrent_downloads'])
+        if any(key in changed for key in (
+                'max_downloads_per_host', 'max_downloads_per_extractor', 'host_concurrency_limits')):
+            self.download_manager.refresh_group_limits()
+        if 'progress_refresh_hz' in changed:
+            self.downloads_model.set_refresh_rate(changed['progress_refresh_hz'])
+    
     def clear_completed_downloads(self):
         """Clear completed download tasks"""
         self.download_manager.clear_completed()
@@ -322,6 +407,40 @@ class YtDlpGUI(QMainWindow):
             self.download_manager.clear_all()
             self.log_message('すべてのタスクをクリアしました')
     
+    def import_archive(self):
+        """Import a yt-dlp --download-archive file"""
+        archive = self.download_manager.archive
+        if archive is None:
+            QMessageBox.warning(self, 'アーカイブ', 'ダウンロードアーカイブが無効です')
+            return
+        
+        path, _ = QFileDialog.getOpenFileName(self, 'アーカイブファイルを選択', '', 'Text (*.txt);;All (*)')
+        if not path:
+            return
+        
+        try:
+            count = archive.import_file(path)
+            self.log_message(f'アーカイブをインポートしました: {count}件 ({path})')
+        except Exception as e:
+            QMessageBox.warning(self, 'アーカイブ', f'インポートに失敗しました\n\nエラー: {e}')
+    
+    def export_archive(self):
+        """Export the archive in yt-dlp --download-archive format"""
+        archive = self.download_manager.archive
+        if archive is None:
+            QMessageBox.warning(self, 'アーカイブ', 'ダウンロードアーカイブが無効です')
+            return
+        
+        path, _ = QFileDialog.getSaveFileName(self, 'アーカイブの保存先', 'archive.txt', 'Text (*.txt);;All (*)')
+        if not path:
+            return
+        
+        try:
+            count = archive.export_file(path)
+            self.log_message(f'アーカイブをエクスポートしました: {count}件 ({path})')
+        except Exception as e:
+            QMessageBox.warning(self, 'アーカイブ', f'エクスポートに失敗しました\n\nエラー: {e}')
+    
     def open_output_folder(self):
         """Open output folder"""
         self.api.open_file(self.output_dir.text())
@@ -421,7 +540,7 @@ class YtDlpGUI(QMainWindow):
                     '更新確認失敗',
                     f'更新の確認に失敗しました\n\nエラー: {e}'
                 )
-            self.log_message(f'更新確認エラー: {e}')
+            self.log_message(f'更新確認エラー: {e}', 'ERROR')
     
     def show_about(self):
         """Show about dialog"""
@@ -441,12 +560,17 @@ class YtDlpGUI(QMainWindow):
         
         QMessageBox.about(self, 'このアプリについて', about_text)
     
-    def log_message(self, message: str):
-        """Log message to text area"""
-        self.log_text.append(f'[{self.get_timestamp()}] {message}')
-        # Auto-scroll to bottom
-        scrollbar = self.log_text.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+    def closeEvent(self, event):
+        """Shut down background services on exit"""
+        if self.control_server:
+            self.control_server.stop()
+        self.download_manager.shutdown()
+        self.config.flush()
+        super().closeEvent(event)
+    
+    def log_message(self, message: str, level: str = 'INFO'):
+        """Log message to the log panel (appended in batches)"""
+        self.log_view.append(f'[{self.get_timestamp()}] [{level}] {message}', level)
     
     @staticmethod
     def get_timestamp():
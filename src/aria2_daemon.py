@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+aria2c Daemon - local RPC server started and supervised by the app
+"""
+
+import os
+import secrets
+import subprocess
+import threading
+import time
+from typing import List, Optional
+from urllib.parse import urlparse
+
+from .aria2_rpc import Aria2RPCClient
+
+
+class Aria2Daemon:
+    """Starts a local ``aria2c --enable-rpc`` process and restarts it if it dies
+
+    The session file is written periodically and on shutdown, and fed back
+    with --input-file on the next start, so queued jobs survive restarts.
+    """
+
+    LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+    def __init__(self, config, rpc: Aria2RPCClient, bandwidth=None):
+        self.config = config
+        self.rpc = rpc
+        self.bandwidth = bandwidth  # BandwidthPolicy; its global limit is set at startup
+        self.aria2c_path = config.get('aria2c_path', 'aria2c')
+        self.session_file = os.path.abspath(config.get('aria2c_session_file', 'aria2.session'))
+        self.health_interval = config.get('aria2c_health_interval', 5)
+        self.process: Optional[subprocess.Popen] = None
+        self.restarts = 0
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+        parsed = urlparse(rpc.url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6800
+
+    def ensure_secret(self) -> str:
+        """Generate an RPC secret for a daemon we spawn if none is configured
+
+        The secret only lives in this session's RPC client; the config is
+        left alone so an external aria2c without a secret keeps working.
+        """
+        if not self.rpc.secret:
+            self.rpc.secret = secrets.token_urlsafe(24)
+        return self.rpc.secret
+
+    def is_local(self) -> bool:
+        """Whether the configured RPC URL points at this machine"""
+        return self.host in self.LOCAL_HOSTS
+
+    def is_alive(self) -> bool:
+        """Whether an aria2 RPC server answers on the configured URL"""
+        return self.rpc.call('aria2.getVersion') is not None
+
+    def start(self):
+        """Start the daemon (if needed) and its supervisor thread"""
+        if self._thread:
+            return
+
+        # Nothing to spawn for a remote server; don't make callers wait on it
+        if not self.is_local():
+            self._ready.set()
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._supervise, daemon=True)
+        self._thread.start()
+
+    def wait_ready(self, timeout: float = 10) -> bool:
+        """Block until the RPC server answers"""
+        return self._ready.wait(timeout)
+
+    def stop(self):
+        """Save the session and shut the daemon down"""
+        self._stopping.set()
+        self._thread = None
+
+        with self._lock:
+            process = self.process
+            self.process = None
+
+        if process is None or process.poll() is not None:
+            return
+
+        # Persist the queue, then ask aria2 to exit cleanly
+        self.rpc.call('aria2.saveSession')
+        self.rpc.call('aria2.shutdown')
+
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    def _command(self) -> List[str]:
+        """aria2c command line for the daemon"""
+        cmd = [
+            self.aria2c_path,
+            '--enable-rpc=true',
+            '--rpc-listen-all=false',
+            f'--rpc-listen-port={self.port}',
+            f'--max-concurrent-downloads={self.config.get("aria2c_max_concurrent", 16)}',
+            f'--save-session={self.session_file}',
+            f'--save-session-interval={self.config.get("aria2c_save_session_interval", 30)}',
+            '--continue=true',
+            '--quiet=true'
+        ]
+
+        if self.rpc.secret:
+            cmd.append(f'--rpc-secret={self.rpc.secret}')
+
+        # The limit in force now, before the policy thread can reach the new daemon
+        if self.bandwidth:
+            limit = self.bandwidth.global_limit()
+            if limit:
+                cmd.append(f'--max-overall-download-limit={limit}')
+
+        # Restore jobs saved by the previous run
+        if os.path.exists(self.session_file):
+            cmd.append(f'--input-file={self.session_file}')
+
+        return cmd
+
+    def _spawn(self) -> bool:
+        """Launch aria2c and wait for the RPC port"""
+        self.ensure_secret()
+        try:
+            process = subprocess.Popen(
+                self._command(),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+            )
+        except Exception:
+            return False
+
+        with self._lock:
+            self.process = process
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and process.poll() is None:
+            if self.is_alive():
+                return True
+            time.sleep(0.2)
+
+        return False
+
+    def _supervise(self):
+        """Health check loop; (re)starts aria2c whenever it stops answering"""
+        failures = 0
+
+        while not self._stopping.is_set():
+            if self.is_alive():
+                failures = 0
+                self._ready.set()
+            else:
+                self._ready.clear()
+                failures += 1
+
+                with self._lock:
+                    process = self.process
+
+                # Replace our own dead or hung process
+                if process is not None and process.poll() is None and failures < 3:
+                    self._stopping.wait(self.health_interval)
+                    continue
+                if process is not None and process.poll() is None:
+                    process.kill()
+
+                if self._spawn():
+                    if process is not None:
+                        self.restarts += 1
+                    failures = 0
+                    self._ready.set()
+                else:
+                    # Back off while aria2c keeps failing to come up
+                    self._stopping.wait(min(60, 2 ** min(failures, 6)))
+                    continue
+
+            self._stopping.wait(self.health_interval)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+aria2 WebSocket notifications - event-driven download state
+"""
+
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+try:
+    import aiohttp
+except ImportError:  # WebSocket notifications are optional
+    aiohttp = None
+
+
+def websocket_url(rpc_url: str) -> str:
+    """Derive the WebSocket endpoint from the HTTP JSON-RPC URL"""
+    if rpc_url.startswith('https://'):
+        return 'wss://' + rpc_url[len('https://'):]
+    if rpc_url.startswith('http://'):
+        return 'ws://' + rpc_url[len('http://'):]
+    return rpc_url
+
+
+class Aria2EventListener:
+    """One persistent WebSocket connection routing aria2 notifications by GID"""
+
+    EVENTS = {
+        'aria2.onDownloadStart': 'start',
+        'aria2.onDownloadPause': 'pause',
+        'aria2.onDownloadStop': 'stop',
+        'aria2.onDownloadComplete': 'complete',
+        'aria2.onBtDownloadComplete': 'complete',
+        'aria2.onDownloadError': 'error',
+    }
+
+    # Events for GIDs nobody has subscribed to yet (addUri may race the notification)
+    MAX_UNCLAIMED = 1000
+
+    def __init__(self, rpc_url: str, reconnect_delay: float = 2.0):
+        self.ws_url = websocket_url(rpc_url)
+        self.reconnect_delay = reconnect_delay
+        self.connected = threading.Event()
+        self._handlers: Dict[str, Callable[[str, str], None]] = {}
+        self._unclaimed = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._loop = None
+        self._task = None
+        self._stopping = False
+
+    @staticmethod
+    def is_supported() -> bool:
+        """Whether the WebSocket client library is installed"""
+        return aiohttp is not None
+
+    def start(self):
+        """Connect in a background thread (reconnects automatically)"""
+        if self._thread or not self.is_supported():
+            return
+
+        self._stopping = False
+        self._thread = threading.Thread(target=self._thread_main, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Close the connection and stop the background thread"""
+        self._stopping = True
+        if self._loop:
+            # Cancelling the task closes the socket and session cleanly
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        self._thread = None
+        self.connected.clear()
+
+    def subscribe(self, gid: str, callback: Callable[[str, str], None]):
+        """Call callback(event, gid) for notifications about gid"""
+        with self._lock:
+            self._handlers[gid] = callback
+            pending = self._unclaimed.pop(gid, None)
+
+        if pending:
+            callback(pending, gid)
+
+    def unsubscribe(self, gid: str):
+        """Stop routing notifications for gid"""
+        with self._lock:
+            self._handlers.pop(gid, None)
+
+    def _thread_main(self):
+        """Run the asyncio loop for the connection"""
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(self._run())
+        self._task, self._loop = task, loop
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass  # stopped by stop()
+        finally:
+            self._loop = None
+            loop.close()
+
+    async def _run(self):
+        """Keep a WebSocket open and dispatch every notification"""
+        while not self._stopping:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    async with session.ws_connect(self.ws_url, heartbeat=30) as ws:
+                        self.connected.set()
+                        async for msg in ws:
+                            if msg.type == aiohttp.WSMsgType.TEXT:
+                                self._dispatch(msg.data)
+                            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                                break
+            except Exception:
+                pass
+
+            self.connected.clear()
+            if not self._stopping:
+                await asyncio.sleep(self.reconnect_delay)
+
+    def _dispatch(self, data: str):
+        """Route a notification to the handler registered for its GID"""
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            return
+
+        event = self.EVENTS.get(payload.get('method'))
+        if not event:
+            return  # responses to calls or unknown notifications
+
+        for param in payload.get('params') or []:
+            gid = param.get('gid') if isinstance(param, dict) else None
+            if not gid:
+                continue
+
+            with self._lock:
+                handler = self._handlers.get(gid)
+                if handler is None:
+                    self._unclaimed[gid] = event
+                    while len(self._unclaimed) > self.MAX_UNCLAIMED:
+                        self._unclaimed.popitem(last=False)
+
+            if handler:
+                try:
+                    handler(event, gid)
+                except Exception:
+                    pass
@@ -5,22 +5,80 @@ aria2c Manager - RPC and CLI modes
 """
 
 import os
+import queue
+import re
 import subprocess
 import json
 import time
-import requests
-from typing import Optional, Dict, Callable
+import threading
+from collections import deque
+from typing import Optional, Dict, List, Tuple, Callable
+
+from .aria2_events import Aria2EventListener
+from .aria2_rpc import Aria2RPCClient
+from .aria2_daemon import Aria2Daemon
+from .aria2_poller import Aria2StatusPoller
+from .bandwidth import BandwidthPolicy
+from .host_tuner import HostTuner
+from .fragments import FragmentJoiner
+from .aria2_progress import Aria2ProgressParser
 
 
 class Aria2Manager:
     """Manages aria2c downloads (RPC and CLI modes)"""
     
+    # Give up on a download whose status could not be read for this long
+    STALL_TIMEOUT = 60
+    
     def __init__(self, config):
         self.config = config
         self.use_rpc = config.get('aria2c_use_rpc', True)
+        self.manage_daemon = self.use_rpc and config.get('aria2c_manage_daemon', True)
+        
         self.rpc_url = config.get('aria2c_rpc_url', 'http://localhost:6800/jsonrpc')
-        self.rpc_secret = config.get('aria2c_rpc_secret', '')
         self.aria2c_path = config.get('aria2c_path', 'aria2c')
+        self.rpc = Aria2RPCClient.from_config(config)
+        self.daemon = None
+        self.events = None
+        self.poller = Aria2StatusPoller(
+            self._multicall,
+            interval=config.get('aria2c_poll_interval', 1.0)
+        )
+        
+        # Split/connections learned per host (None uses the fixed settings)
+        self.tuner = HostTuner.from_config(config)
+        if self.tuner:
+            config.subscribe(self._on_tuning_config_changed)
+        
+        # Bandwidth limits follow their schedule and config changes live
+        self.bandwidth = BandwidthPolicy(
+            config, self._rpc_call, self._multicall,
+            interval=config.get('bandwidth_check_interval', 30)
+        )
+        # CLI downloads read the limits when their aria2c starts, so reload in both modes
+        config.subscribe(self.bandwidth.on_config_changed)
+        if self.use_rpc:
+            self.bandwidth.start()
+        
+        if self.use_rpc and config.get('aria2c_use_websocket', True):
+            self.events = Aria2EventListener(self.rpc_url)
+            self.events.start()
+        
+        if self.manage_daemon:
+            self.daemon = Aria2Daemon(config, self.rpc, bandwidth=self.bandwidth)
+            self.daemon.start()
+    
+    def shutdown(self):
+        """Stop background threads and the managed daemon"""
+        self.poller.stop()
+        self.bandwidth.stop()
+        if self.tuner:
+            self.tuner.save()
+        if self.events:
+            self.events.stop()
+        if self.daemon:
+            self.daemon.stop()
+        self.rpc.close()
     
     def check_connection(self) -> Dict:
         """Check aria2c connection"""
@@ -86,32 +144,65 @@ class Aria2Manager:
             }
     
     def download(self, url: str, output_dir: str, filename: str, 
-                 progress_callback: Optional[Callable] = None) -> Dict:
-        """Download file"""
+                 progress_callback: Optional[Callable] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 on_gid: Optional[Callable[[str], None]] = None,
+                 speed_limit: Optional[int] = None,
+                 on_process: Optional[Callable[[subprocess.Popen], None]] = None) -> Dict:
+        """Download file
+        
+        on_gid is called as soon as aria2 accepts an RPC download, and
+        on_process with the aria2c process of a CLI download, so callers
+        can stop either right away.
+        """
         if self.use_rpc:
-            result = self._download_rpc(url, output_dir, filename, progress_callback)
+            # Give a (re)starting managed daemon a moment to come up
+            if self.daemon:
+                self.daemon.wait_ready(10)
+            
+            result = self._download_rpc(
+                url, output_dir, filename, progress_callback, headers, on_gid, speed_limit
+            )
             
-            # Fallback to CLI if RPC fails
-            if not result['success']:
-                self.use_rpc = False
-                return self._download_cli(url, output_dir, filename, progress_callback)
+            # Fallback to CLI for this download if the RPC server could not take it
+            if not result['success'] and 'gid' not in result:
+                return self._download_cli(
+                    url, output_dir, filename, progress_callback, headers, speed_limit, on_process
+                )
             
             return result
         else:
-            return self._download_cli(url, output_dir, filename, progress_callback)
+            return self._download_cli(
+                url, output_dir, filename, progress_callback, headers, speed_limit, on_process
+            )
+    
+    @staticmethod
+    def _header_lines(headers: Optional[Dict[str, str]]) -> List[str]:
+        """Format HTTP headers for aria2's header option"""
+        return [f'{key}: {value}' for key, value in (headers or {}).items()]
     
     def _download_rpc(self, url: str, output_dir: str, filename: str,
-                      progress_callback: Optional[Callable] = None) -> Dict:
+                      progress_callback: Optional[Callable] = None,
+                      headers: Optional[Dict[str, str]] = None,
+                      on_gid: Optional[Callable[[str], None]] = None,
+                      speed_limit: Optional[int] = None) -> Dict:
         """Download using RPC"""
         try:
+            split, connections = self._connection_settings(url)
+            
             # Prepare options
             options = {
                 'dir': output_dir,
                 'out': filename,
-                'max-connection-per-server': str(self.config.get('aria2c_max_connections', 16)),
-                'split': str(self.config.get('aria2c_split', 16)),
+                'max-connection-per-server': str(connections),
+                'split': str(split),
                 'continue': 'true'
             }
+            options.update(self.bandwidth.task_options(speed_limit))
+            
+            header_lines = self._header_lines(headers)
+            if header_lines:
+                options['header'] = header_lines
             
             # Add download
             response = self._rpc_call('aria2.addUri', [[url], options])
@@ -120,53 +211,396 @@ class Aria2Manager:
                 return {'success': False, 'error': 'ダウンロード追加失敗'}
             
             gid = response
+            if speed_limit is not None:
+                self.bandwidth.set_override(gid, speed_limit)
+            if on_gid:
+                on_gid(gid)
             
             # Monitor progress
             if progress_callback:
-                self._monitor_rpc_progress(gid, progress_callback)
+                try:
+                    result = self._monitor_rpc_progress(gid, progress_callback)
+                finally:
+                    self.bandwidth.forget(gid)
+                
+                if self.tuner and 'avg_speed' in result:
+                    self.tuner.record(
+                        url, connections, result['avg_speed'], result['total'],
+                        failed=not result['success']
+                    )
+                return result
             
             return {'success': True, 'gid': gid}
         
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
+    def attach(self, gid: str, progress_callback: Callable) -> Optional[Dict]:
+        """Follow a download added in an earlier session
+        
+        Returns the download result, or None if aria2 no longer knows the
+        GID (or it failed) and the download has to be added again.
+        """
+        if not self.use_rpc:
+            return None
+        
+        if self.daemon:
+            self.daemon.wait_ready(10)
+        
+        status = self._rpc_call('aria2.tellStatus', [gid, ['gid', 'status']])
+        if not status:
+            return None
+        
+        state = status.get('status')
+        if state == 'complete':
+            progress_callback(100)
+            return {'success': True, 'gid': gid}
+        if state in ('error', 'removed'):
+            return None
+        if state == 'paused':
+            self._rpc_call('aria2.unpause', [gid])
+        
+        return self._monitor_rpc_progress(gid, progress_callback)
+    
+    def outputs(self, gids: List[str]) -> Dict[str, str]:
+        """Output file -> GID of the given downloads that aria2 still has (not failed or removed)"""
+        if not self.use_rpc or not gids:
+            return {}
+        
+        if self.daemon:
+            self.daemon.wait_ready(10)
+        results = self._multicall([
+            ('aria2.tellStatus', [gid, ['gid', 'status', 'files']]) for gid in gids
+        ]) or []
+        
+        found = {}
+        for result in results:
+            status = result[0] if isinstance(result, list) and result else None
+            if not status or status.get('status') in ('error', 'removed') or not status.get('files'):
+                continue
+            found[os.path.normpath(status['files'][0]['path'])] = status['gid']
+        return found
+    
+    def _connection_settings(self, url: str) -> Tuple[int, int]:
+        """(split, max-connection-per-server) for a URL"""
+        if self.tuner:
+            return self.tuner.choose(url)
+        
+        return self.config.get('aria2c_split', 16), self.config.get('aria2c_max_connections', 16)
+    
+    def _on_tuning_config_changed(self, changed: Dict):
+        """Keep the tuner within the user's connection and split settings"""
+        keys = ('aria2c_split', 'aria2c_max_connections', 'host_tuning_max_connections')
+        if any(key in changed for key in keys):
+            self.tuner.set_bounds(
+                HostTuner.connection_bound(self.config), self.config.get('aria2c_split', 16)
+            )
+    
+    def pause(self, gid: str) -> bool:
+        """Pause an RPC download"""
+        return self.use_rpc and self._rpc_call('aria2.pause', [gid]) is not None
+    
+    def unpause(self, gid: str) -> bool:
+        """Resume a paused RPC download"""
+        return self.use_rpc and self._rpc_call('aria2.unpause', [gid]) is not None
+    
+    def set_speed_limit(self, gid: str, limit: int) -> bool:
+        """Change the download limit of a live RPC download"""
+        return self.use_rpc and self.bandwidth.set_task_limit(gid, limit)
+    
+    def fragment_limit(self, speed_limit: Optional[int], concurrency: int) -> Tuple[int, bool]:
+        """(per-fragment limit, whether it is the task's own) for a window of fragments
+        
+        A per-task limit is shared by the fragments running at the same time.
+        """
+        if speed_limit is None:
+            return self.bandwidth.shared_limit(concurrency), False
+        return (max(1, speed_limit // max(1, concurrency)) if speed_limit else 0), True
+    
+    def set_fragment_limit(self, gids: List[str], limit: int, concurrency: int) -> bool:
+        """Give live fragment downloads their share of a new per-task limit"""
+        share, _ = self.fragment_limit(limit, concurrency)
+        return all([self.set_speed_limit(gid, share) for gid in gids])
+    
+    def remove(self, gid: str) -> bool:
+        """Stop an RPC download immediately"""
+        return self.use_rpc and self._rpc_call('aria2.forceRemove', [gid]) is not None
+    
+    def discard(self, gids: List[str]):
+        """Remove downloads an earlier session left behind (e.g. restored from the aria2 session)"""
+        if not self.use_rpc or not gids:
+            return
+        
+        if self.daemon:
+            self.daemon.wait_ready(10)
+        self._multicall([('aria2.forceRemove', [gid]) for gid in gids])
+    
+    def download_fragments(self, urls: List[str], output_dir: str, filename: str,
+                           progress_callback: Optional[Callable] = None,
+                           headers: Optional[Dict[str, str]] = None,
+                           concurrency: int = 8, retries: int = 10,
+                           speed_limit: Optional[int] = None,
+                           size_hint: Optional[int] = None,
+                           cancelled: Optional[threading.Event] = None,
+                           on_process: Optional[Callable[[subprocess.Popen], None]] = None,
+                           on_gids: Optional[Callable[[List[str]], None]] = None,
+                           limit_source: Optional[Callable[[], Optional[int]]] = None) -> Dict:
+        """Download HLS/DASH fragments as one aria2 batch and join them in order
+        
+        Fragments are separate aria2 downloads (one connection each, aria2
+        retries each one up to ``retries`` times); at most ``concurrency``
+        run at once. Finished fragments are appended to the output as soon
+        as every earlier one is in. Setting ``cancelled`` stops the batch
+        (RPC); killing the process passed to ``on_process`` stops it (CLI).
+        ``on_gids`` receives the GIDs in flight after each batch is added.
+        ``limit_source``, if given, is read for each new batch instead of
+        ``speed_limit``, so a limit changed mid-download reaches the
+        fragments added after the change (see ``set_fragment_limit``).
+        
+        A stopped batch keeps its part file and work directory, and the
+        next call for the same output skips the fragments already joined;
+        deleting them on cancel is up to the caller.
+        """
+        joiner = FragmentJoiner(os.path.join(output_dir, filename), len(urls))
+        
+        def batch_limit():
+            return self.fragment_limit(limit_source() if limit_source else speed_limit, concurrency)
+        
+        limit, _ = batch_limit()
+        
+        options = {
+            'dir': joiner.workdir,
+            'split': '1',
+            'max-connection-per-server': '1',
+            'max-tries': str(retries),
+            'retry-wait': '1',
+            'continue': 'true',
+            'allow-overwrite': 'true',
+        }
+        
+        def report():
+            if progress_callback:
+                count = joiner.completed_count
+                progress_callback(
+                    int(count * 100 / len(urls)), joiner.done_bytes, size_hint or 0, 0
+                )
+        
+        try:
+            if self.use_rpc:
+                if self.daemon:
+                    self.daemon.wait_ready(10)
+                result = self._fragments_rpc(
+                    urls, joiner, options, headers, concurrency, batch_limit, report, cancelled, on_gids
+                )
+                if (not result['success'] and 'gid' not in result
+                        and joiner.completed_count == joiner.resumed
+                        and not (cancelled and cancelled.is_set())):
+                    result = self._fragments_cli(
+                        urls, joiner, options, headers, concurrency, limit, report, on_process
+                    )
+            else:
+                result = self._fragments_cli(
+                    urls, joiner, options, headers, concurrency, limit, report, on_process
+                )
+            
+            if result['success'] and not joiner.finish():
+                result = {'success': False, 'error': 'フラグメントが不足しています'}
+        
+        except Exception as e:
+            result = {'success': False, 'error': str(e)}
+        
+        if not result['success']:
+            if cancelled and cancelled.is_set():
+                joiner.close()
+            else:
+                joiner.abort()
+        elif progress_callback:
+            progress_callback(100)
+        return result
+    
+    def _fragments_rpc(self, urls: List[str], joiner: FragmentJoiner, options: Dict,
+                       headers: Optional[Dict[str, str]], concurrency: int,
+                       batch_limit: Callable[[], Tuple[int, bool]], report: Callable,
+                       cancelled: Optional[threading.Event] = None,
+                       on_gids: Optional[Callable[[List[str]], None]] = None) -> Dict:
+        """Feed fragments to the RPC daemon with a bounded window
+
+        ``batch_limit`` gives the per-fragment limit for each new batch and
+        whether it is the task's own; fragments with their own limit keep it
+        when the default task limit changes, the others follow it.
+        """
+        options = dict(options)
+        header_lines = self._header_lines(headers)
+        if header_lines:
+            options['header'] = header_lines
+        
+        pending = deque(range(joiner.resumed, len(urls)))
+        active = {}  # gid -> fragment index
+        finished = queue.Queue()  # (gid, final status) from the poller thread
+        last_seen = [time.monotonic()]
+        
+        def watch(gid):
+            def on_status(status):
+                last_seen[0] = time.monotonic()
+                if status.get('status') in ('complete', 'error', 'removed'):
+                    finished.put((gid, status))
+            return on_status
+        
+        def on_event(event, _gid):
+            if event in ('complete', 'error', 'stop'):
+                self.poller.poll_now()
+        
+        try:
+            while pending or active:
+                if cancelled and cancelled.is_set():
+                    return {'success': False, 'gid': None, 'error': 'ダウンロードが中止されました'}
+                
+                batch = [pending.popleft() for _ in range(min(len(pending), concurrency - len(active)))]
+                if batch:
+                    limit, own_limit = batch_limit()
+                    batch_options = dict(options, **({'max-download-limit': str(limit)} if limit else {}))
+                    gids = self.add_uris([
+                        ([urls[index]], dict(batch_options, out=FragmentJoiner.name(index)))
+                        for index in batch
+                    ])
+                    for index, gid in zip(batch, gids):
+                        if gid is None:
+                            return {'success': False, 'error': 'フラグメントの追加に失敗しました'}
+                        active[gid] = index
+                        if own_limit:
+                            self.bandwidth.set_override(gid, limit)
+                        else:
+                            self.bandwidth.share_task_limit(gid, concurrency)
+                        self.poller.subscribe(gid, watch(gid))
+                        if self.events:
+                            self.events.subscribe(gid, on_event)
+                    if on_gids:
+                        on_gids(list(active))
+                
+                try:
+                    gid, status = finished.get(timeout=1)
+                except queue.Empty:
+                    if time.monotonic() - last_seen[0] > self.STALL_TIMEOUT:
+                        return {'success': False, 'gid': None, 'error': 'ステータス取得失敗'}
+                    continue
+                
+                index = active.pop(gid, None)
+                self.bandwidth.forget(gid)
+                self.poller.unsubscribe(gid)
+                if self.events:
+                    self.events.unsubscribe(gid)
+                if index is None:
+                    continue
+                
+                if status.get('status') != 'complete':
+                    return {
+                        'success': False,
+                        'gid': gid,
+                        'error': status.get('errorMessage') or 'フラグメントのダウンロードに失敗しました'
+                    }
+                
+                joiner.completed(index)
+                report()
+            
+            return {'success': True}
+        
+        finally:
+            # Stop fragments still running after a failure
+            if active:
+                self._multicall([('aria2.forceRemove', [gid]) for gid in active])
+            for gid in active:
+                self.bandwidth.forget(gid)
+                self.poller.unsubscribe(gid)
+                if self.events:
+                    self.events.unsubscribe(gid)
+    
+    def _fragments_cli(self, urls: List[str], joiner: FragmentJoiner, options: Dict,
+                       headers: Optional[Dict[str, str]], concurrency: int,
+                       limit: int, report: Callable,
+                       on_process: Optional[Callable[[subprocess.Popen], None]] = None) -> Dict:
+        """Download every fragment with one aria2c process and an input file"""
+        input_path = os.path.join(joiner.workdir, 'fragments.txt')
+        with open(input_path, 'w', encoding='utf-8') as f:
+            for index, url in enumerate(urls[joiner.resumed:], joiner.resumed):
+                f.write(f'{url}\n  out={FragmentJoiner.name(index)}\n')
+        
+        cmd = [
+            self.aria2c_path,
+            f'--input-file={input_path}',
+            f'-j{concurrency}',
+            '--console-log-level=notice',
+            '--summary-interval=0',
+        ]
+        cmd.extend(f'--{key}={value}' for key, value in options.items())
+        cmd.extend(f'--header={line}' for line in self._header_lines(headers))
+        cmd.extend(self.bandwidth.cli_args(limit))
+        
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1
+        )
+        if on_process:
+            on_process(process)
+        
+        complete = re.compile(r'Download complete: (.+?)\s*$')
+        for line in process.stdout:
+            match = complete.search(line)
+            if match:
+                index = joiner.index_of(match.group(1))
+                if index is not None:
+                    joiner.completed(index)
+                    report()
+        
+        process.wait()
+        if process.returncode != 0:
+            return {'success': False, 'error': f'aria2c終了コード: {process.returncode}'}
+        return {'success': True}
+    
     def _download_cli(self, url: str, output_dir: str, filename: str,
-                      progress_callback: Optional[Callable] = None) -> Dict:
+                      progress_callback: Optional[Callable] = None,
+                      headers: Optional[Dict[str, str]] = None,
+                      speed_limit: Optional[int] = None,
+                      on_process: Optional[Callable[[subprocess.Popen], None]] = None) -> Dict:
         """Download using CLI"""
         try:
+            split, connections = self._connection_settings(url)
             cmd = [
                 self.aria2c_path,
-                f'-x{self.config.get("aria2c_max_connections", 16)}',
-                f'-s{self.config.get("aria2c_split", 16)}',
+                f'-x{connections}',
+                f'-s{split}',
                 f'-d{output_dir}',
                 f'-o{filename}',
                 '--continue=true',
-                url
+                '--enable-color=false',
+                f"--summary-interval={self.config.get('aria2c_summary_interval', 0)}"
             ]
+            cmd.extend(f'--header={line}' for line in self._header_lines(headers))
+            cmd.extend(self.bandwidth.cli_args(speed_limit))
+            cmd.append(url)
             
-            # Run aria2c
+            # Run aria2c (bytes: lines are only decoded when they carry an error)
             process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1
+                stderr=subprocess.STDOUT
             )
+            if on_process:
+                on_process(process)
             
             # Monitor progress
-            if progress_callback:
-                for line in process.stdout:
-                    # Parse progress from output
-                    if '%' in line:
-                        try:
-                            parts = line.split()
-                            for i, part in enumerate(parts):
-                                if '%' in part:
-                                    progress = int(part.replace('%', '').replace('(', ''))
-                                    progress_callback(progress)
-                                    break
-                        except:
-                            pass
+            def on_record(record):
+                if progress_callback:
+                    progress_callback(record.percent, record.done, record.total, record.speed)
+            
+            parser = Aria2ProgressParser(
+                on_record, min_interval=self.config.get('aria2c_progress_interval', 0.25)
+            )
+            for line in process.stdout:
+                parser.feed(line)
+            parser.flush()
             
             # Wait for completion
             process.wait()
@@ -176,69 +610,104 @@ class Aria2Manager:
                     progress_callback(100)
                 return {'success': True}
             else:
-                return {'success': False, 'error': f'aria2c終了コード: {process.returncode}'}
+                return {
+                    'success': False,
+                    'error': parser.error or f'aria2c終了コード: {process.returncode}'
+                }
         
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
     def _rpc_call(self, method: str, params: Optional[list] = None) -> Optional[any]:
         """Make RPC call"""
-        payload = {
-            'jsonrpc': '2.0',
-            'id': 'ytdlp-gui',
-            'method': method,
-            'params': []
-        }
+        return self.rpc.call(method, params)
+    
+    def _multicall(self, calls: List[Tuple[str, list]]) -> Optional[List]:
+        """Run several RPC methods in one request"""
+        return self.rpc.multicall(calls)
+    
+    def add_uris(self, jobs: List[Tuple[List[str], Dict]]) -> List[Optional[str]]:
+        """Enqueue several downloads with one system.multicall
+        
+        Each job is (uris, options); returns the GID for each job, or None
+        where aria2 rejected it.
+        """
+        if not jobs:
+            return []
+        
+        results = self._multicall([('aria2.addUri', [uris, options]) for uris, options in jobs])
+        if results is None:
+            return [None] * len(jobs)
+        
+        return [r[0] if isinstance(r, list) and r else None for r in results]
+    
+    def _monitor_rpc_progress(self, gid: str, progress_callback: Callable) -> Dict:
+        """Monitor RPC download until it finishes
+        
+        Progress comes from the shared status poller. Completion and errors
+        also arrive as WebSocket notifications, which trigger an immediate
+        poll instead of waiting for the next tick.
+        """
+        finished = threading.Event()
+        final = {}
+        last_seen = [time.monotonic()]
+        speeds = []  # downloadSpeed samples while active, for host tuning
         
-        # Add secret token if configured
-        if self.rpc_secret:
-            payload['params'].append(f'token:{self.rpc_secret}')
+        def on_status(status):
+            last_seen[0] = time.monotonic()
+            if status.get('status') == 'active':
+                speeds.append(int(status.get('downloadSpeed', 0)))
+            self._report_rpc_progress(status, progress_callback)
+            if status.get('status') in ('complete', 'error', 'removed'):
+                final['status'] = status
+                finished.set()
         
-        # Add method params
-        if params:
-            payload['params'].extend(params)
+        def on_event(event, _gid):
+            if event in ('complete', 'error', 'stop'):
+                self.poller.poll_now()
+        
+        self.poller.subscribe(gid, on_status)
+        if self.events:
+            self.events.subscribe(gid, on_event)
         
         try:
-            response = requests.post(
-                self.rpc_url,
-                json=payload,
-                timeout=10
-            )
+            while not finished.wait(5):
+                if time.monotonic() - last_seen[0] > self.STALL_TIMEOUT:
+                    return {'success': False, 'gid': gid, 'error': 'ステータス取得失敗'}
             
-            if response.status_code == 200:
-                result = response.json()
-                return result.get('result')
-            
-            return None
+            result = self._rpc_result(gid, final['status'], progress_callback)
+            if final['status'].get('status') != 'removed':
+                result['avg_speed'] = sum(speeds) / len(speeds) if speeds else 0
+                result['total'] = int(final['status'].get('totalLength', 0))
+            return result
         
-        except Exception:
-            return None
+        finally:
+            self.poller.unsubscribe(gid)
+            if self.events:
+                self.events.unsubscribe(gid)
     
-    def _monitor_rpc_progress(self, gid: str, progress_callback: Callable):
-        """Monitor RPC download progress"""
-        while True:
-            try:
-                status = self._rpc_call('aria2.tellStatus', [gid])
-                
-                if not status:
-                    break
-                
-                # Calculate progress
-                completed = int(status.get('completedLength', 0))
-                total = int(status.get('totalLength', 1))
-                
-                if total > 0:
-                    progress = int((completed / total) * 100)
-                    progress_callback(progress)
-                
-                # Check if completed
-                if status.get('status') == 'complete':
-                    progress_callback(100)
-                    break
-                elif status.get('status') == 'error':
-                    break
-                
-                time.sleep(1)
-            
-            except Exception:
-                break
+    @staticmethod
+    def _report_rpc_progress(status: Dict, progress_callback: Callable):
+        """Forward progress from a tellStatus result"""
+        completed = int(status.get('completedLength', 0))
+        total = int(status.get('totalLength', 0))
+        speed = int(status.get('downloadSpeed', 0))
+        
+        if total > 0:
+            progress_callback(int((completed / total) * 100), completed, total, speed)
+    
+    @staticmethod
+    def _rpc_result(gid: str, status: Dict, progress_callback: Callable) -> Dict:
+        """Build the download result from a final aria2 status"""
+        if status.get('status') == 'complete':
+            progress_callback(100)
+            return {'success': True, 'gid': gid}
+        
+        if status.get('status') == 'removed':
+            return {'success': False, 'gid': gid, 'error': 'ダウンロードが中止されました'}
+        
+        return {
+            'success': False,
+            'gid': gid,
+            'error': status.get('errorMessage') or 'aria2cエラー'
+        }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+aria2 Status Poller - one batched status request per tick for all downloads
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional
+
+
+class Aria2StatusPoller:
+    """Polls aria2 once per tick with system.multicall and fans results out by GID
+
+    Each tick asks for the active, waiting and stopped lists with an
+    explicit key list, so RPC traffic stays constant however many
+    downloads are being watched.
+    """
+
+    KEYS = [
+        'gid', 'status', 'totalLength', 'completedLength', 'downloadSpeed',
+        'connections', 'errorCode', 'errorMessage'
+    ]
+
+    def __init__(self, multicall: Callable[[List], Optional[List]],
+                 interval: float = 1.0, window: int = 1000):
+        self.multicall = multicall
+        self.interval = interval
+        self.window = window
+        self._handlers: Dict[str, Callable[[Dict], None]] = {}
+        self._missing = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+
+    def subscribe(self, gid: str, callback: Callable[[Dict], None]):
+        """Call callback(status) for gid on every tick"""
+        with self._lock:
+            self._handlers[gid] = callback
+
+        self._ensure_thread()
+
+    def unsubscribe(self, gid: str):
+        """Stop reporting gid"""
+        with self._lock:
+            self._handlers.pop(gid, None)
+            self._missing.discard(gid)
+
+    def poll_now(self):
+        """Run the next tick immediately"""
+        self._wakeup.set()
+
+    def stop(self):
+        """Stop the polling thread"""
+        self._stopping = True
+        self._wakeup.set()
+        self._thread = None
+
+    def _ensure_thread(self):
+        """Start the polling thread on first use"""
+        with self._lock:
+            if self._thread:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """Polling loop"""
+        while not self._stopping:
+            with self._lock:
+                watching = bool(self._handlers)
+
+            if watching:
+                self.poll_once()
+
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def poll_once(self):
+        """Fetch every status in one request and dispatch them"""
+        with self._lock:
+            missing = list(self._missing)
+
+        calls = [
+            ('aria2.tellActive', [self.KEYS]),
+            ('aria2.tellWaiting', [0, self.window, self.KEYS]),
+            ('aria2.tellStopped', [-1, self.window, self.KEYS]),
+        ]
+        # GIDs that fell out of the lists last tick are asked for directly
+        calls.extend(('aria2.tellStatus', [gid, self.KEYS]) for gid in missing)
+
+        results = self.multicall(calls)
+        if results is None:
+            return
+
+        statuses = {}
+        for result in results[:3]:
+            # multicall wraps each successful result in a one-element list
+            if isinstance(result, list) and result:
+                for status in result[0]:
+                    statuses[status['gid']] = status
+
+        for gid, result in zip(missing, results[3:]):
+            if isinstance(result, list) and result:
+                statuses[gid] = result[0]
+            else:
+                # Fault: aria2 no longer knows this GID
+                message = result.get('message') if isinstance(result, dict) else None
+                statuses[gid] = {'gid': gid, 'status': 'removed', 'errorMessage': message}
+
+        with self._lock:
+            handlers = list(self._handlers.items())
+            self._missing = {gid for gid, _ in handlers if gid not in statuses}
+
+        for gid, callback in handlers:
+            status = statuses.get(gid)
+            if status is None:
+                continue
+            try:
+                callback(status)
+            except Exception:
+                pass
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+aria2 Progress Parser - structured progress from aria2c console output
+"""
+
+import re
+import time
+from typing import Callable, NamedTuple, Optional
+
+
+UNITS = {b'B': 1, b'KiB': 1024, b'MiB': 1024 ** 2, b'GiB': 1024 ** 3, b'TiB': 1024 ** 4}
+
+# [#2089b0 400.0KiB/33.2MiB(1%) CN:1 DL:115.7KiB ETA:4m51s]
+READOUT = re.compile(
+    rb'\[#[0-9a-f]+ '
+    rb'(?P<done>[\d.]+)(?P<done_unit>[KMGT]?i?B)/(?P<total>[\d.]+)(?P<total_unit>[KMGT]?i?B)'
+    rb'(?:\((?P<percent>\d+)%\))?'
+    rb'(?: CN:(?P<connections>\d+))?'
+    rb'(?: SD:\d+)?'
+    rb'(?: DL:(?P<speed>[\d.]+)(?P<speed_unit>[KMGT]?i?B))?'
+    rb'(?: UL:[\d.]+[KMGT]?i?B\([^)]*\))?'
+    rb'(?: ETA:(?:(?P<hours>\d+)h)?(?:(?P<minutes>\d+)m)?(?:(?P<seconds>\d+)s)?)?'
+    rb'\]'
+)
+
+
+class Aria2Progress(NamedTuple):
+    """One progress record"""
+    percent: int
+    done: int
+    total: int
+    speed: int
+    eta: Optional[int]  # seconds, None if aria2 did not estimate
+    connections: int
+
+
+def _size(value: bytes, unit: bytes) -> int:
+    return int(float(value) * UNITS[unit])
+
+
+def parse_line(line: bytes) -> Optional[Aria2Progress]:
+    """Progress record from one line of aria2c output, or None"""
+    start = line.find(b'[#')
+    if start < 0:
+        return None
+
+    match = READOUT.match(line, start)
+    if match is None:
+        return None
+
+    (done, done_unit, total, total_unit, percent, connections,
+     speed, speed_unit, hours, minutes, seconds) = match.groups()
+    done = _size(done, done_unit)
+    total = _size(total, total_unit)
+    if percent is not None:
+        percent = int(percent)
+    else:
+        percent = done * 100 // total if total else 0
+
+    eta = None
+    if hours or minutes or seconds:
+        eta = int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds or 0)
+
+    return Aria2Progress(
+        percent,
+        done,
+        total,
+        _size(speed, speed_unit) if speed else 0,
+        eta,
+        int(connections) if connections else 0,
+    )
+
+
+class Aria2ProgressParser:
+    """Turns aria2c output lines into rate-limited progress records
+
+    Lines are read as bytes; anything that is not a readout is rejected by
+    a substring test. At most one record per ``min_interval`` seconds
+    reaches the callback, except that a change to 100% is always
+    delivered. Readouts inside the interval are only remembered, not
+    parsed; ``flush()`` parses the last one. Error lines are kept for the
+    final message.
+    """
+
+    def __init__(self, callback: Callable[[Aria2Progress], None], min_interval: float = 0.25):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.error: Optional[str] = None
+        self._last_line: Optional[bytes] = None
+        self._pending: Optional[bytes] = None
+        self._emitted = 0.0
+        self._emitted_percent = -1
+
+    @property
+    def last(self) -> Optional[Aria2Progress]:
+        """Most recent readout seen"""
+        return parse_line(self._last_line) if self._last_line is not None else None
+
+    def feed(self, line: bytes):
+        """Handle one output line"""
+        if b'[#' not in line:
+            if b'errorCode=' in line or b'[ERROR]' in line:
+                self.error = line.decode('utf-8', 'replace').strip()
+            return
+
+        self._last_line = line
+        now = time.monotonic()
+        if now - self._emitted >= self.min_interval or (
+                self._emitted_percent != 100 and b'(100%)' in line):
+            record = parse_line(line)
+            if record is not None:
+                self._emit(record, now)
+        else:
+            self._pending = line
+
+    def flush(self):
+        """Deliver the last readout held back by the rate limit"""
+        if self._pending is not None:
+            record = parse_line(self._pending)
+            self._pending = None
+            if record is not None:
+                self._emit(record, time.monotonic())
+
+    def _emit(self, record: Aria2Progress, now: float):
+        self._emitted = now
+        self._emitted_percent = record.percent
+        self._pending = None
+        self.callback(record)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+aria2 JSON-RPC client - pooled keep-alive connections
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Aria2RPCClient:
+    """Thread-safe aria2 JSON-RPC client over a shared keep-alive connection pool
+
+    Every thread gets its own lightweight requests.Session, but all of
+    them share one HTTPAdapter, so TCP connections are reused across the
+    poller, the download threads and the UI.
+    """
+
+    def __init__(self, url: str, secret: str = '', pool_size: int = 10,
+                 connect_timeout: float = 3.0, read_timeout: float = 10.0):
+        self.url = url
+        self.secret = secret
+        self.timeout = (connect_timeout, read_timeout)
+        self._adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=512)
+        self._requests = 0
+        self._errors = 0
+
+    @classmethod
+    def from_config(cls, config, url_key: str = 'aria2c_rpc_url',
+                    secret_key: str = 'aria2c_rpc_secret') -> 'Aria2RPCClient':
+        """Create a client from configuration"""
+        return cls(
+            config.get(url_key, 'http://localhost:6800/jsonrpc'),
+            config.get(secret_key, ''),
+            pool_size=config.get('aria2c_rpc_pool_size', 10),
+            connect_timeout=config.get('aria2c_rpc_connect_timeout', 3.0),
+            read_timeout=config.get('aria2c_rpc_timeout', 10.0)
+        )
+
+    def _session(self) -> requests.Session:
+        """Per-thread session bound to the shared pool"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self._adapter)
+            session.mount('https://', self._adapter)
+            session.headers['Content-Type'] = 'application/json'
+            self._local.session = session
+        return session
+
+    def params(self, params: Optional[list] = None) -> list:
+        """Method params with the secret token prepended"""
+        rpc_params = [f'token:{self.secret}'] if self.secret else []
+        if params:
+            rpc_params.extend(params)
+        return rpc_params
+
+    def call(self, method: str, params: Optional[list] = None) -> Optional[any]:
+        """Make an RPC call; returns the result or None on any failure"""
+        payload = {
+            'jsonrpc': '2.0',
+            'id': 'ytdlp-gui',
+            'method': method,
+            # system.* methods take no token; multicall carries it per method
+            'params': (params or []) if method.startswith('system.') else self.params(params)
+        }
+        body = json.dumps(payload, separators=(',', ':'))
+
+        start = time.perf_counter()
+        try:
+            response = self._session().post(self.url, data=body, timeout=self.timeout)
+            ok = response.status_code == 200
+            result = response.json().get('result') if ok else None
+        except Exception:
+            ok = False
+            result = None
+
+        self._record(time.perf_counter() - start, ok)
+        return result
+
+    def multicall(self, calls: List[Tuple[str, list]]) -> Optional[List]:
+        """Run several RPC methods in one request"""
+        methods = [
+            {'methodName': method, 'params': self.params(params)}
+            for method, params in calls
+        ]
+        return self.call('system.multicall', [methods])
+
+    def _record(self, latency: float, ok: bool):
+        """Update latency metrics"""
+        with self._stats_lock:
+            self._requests += 1
+            if not ok:
+                self._errors += 1
+            self._latencies.append(latency)
+
+    def stats(self) -> Dict:
+        """Request count, error count and latency (ms) over recent calls"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            requests_made = self._requests
+            errors = self._errors
+
+        if not latencies:
+            return {'requests': requests_made, 'errors': errors}
+
+        return {
+            'requests': requests_made,
+            'errors': errors,
+            'avg_ms': sum(latencies) / len(latencies) * 1000,
+            'p95_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000,
+            'max_ms': latencies[-1] * 1000
+        }
+
+    def close(self):
+        """Close pooled connections"""
+        self._adapter.close()
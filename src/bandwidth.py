@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bandwidth Policy - global and per-task download limits with schedules
+"""
+
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_rate(value) -> int:
+    """Bytes per second from 0, 500K, 2M, 1.5M or 'unlimited' (0 means no limit)"""
+    if value is None or value == '':
+        return 0
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+
+    text = str(value).strip().upper()
+    if text in ('0', 'UNLIMITED', 'NONE', 'OFF'):
+        return 0
+
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([KMG]?)(?:I?B)?(?:/S)?', text)
+    if not match:
+        raise ValueError(f'invalid rate: {value}')
+    return int(float(match.group(1)) * UNITS[match.group(2)])
+
+
+class BandwidthSchedule:
+    """Time-of-day rules for the global limit
+
+    Rules read ``<rate> HH:MM-HH:MM``, e.g. ``unlimited 01:00-07:00`` or
+    ``2M 09:00-18:00``. Ranges may wrap past midnight; the first matching
+    rule wins and the default applies outside every rule.
+    """
+
+    RULE = re.compile(r'^\s*(\S+)\s+(\d{1,2}):(\d{2})\s*[-–~]\s*(\d{1,2}):(\d{2})\s*$')
+
+    def __init__(self, default_limit: int = 0, rules: Optional[List[str]] = None):
+        self.default_limit = default_limit
+        self.rules: List[Tuple[int, int, int]] = [self.parse_rule(rule) for rule in rules or []]
+
+    @classmethod
+    def parse_rule(cls, rule: str) -> Tuple[int, int, int]:
+        """(start minute, end minute, limit) from a rule string"""
+        match = cls.RULE.match(rule)
+        if not match:
+            raise ValueError(f'invalid schedule rule: {rule}')
+
+        rate, h1, m1, h2, m2 = match.groups()
+        for hour, minute in ((h1, m1), (h2, m2)):
+            if not (0 <= int(hour) < 24 and 0 <= int(minute) < 60):
+                raise ValueError(f'invalid time {hour}:{minute} in schedule rule: {rule}')
+        return int(h1) * 60 + int(m1), int(h2) * 60 + int(m2), parse_rate(rate)
+
+    def limit_at(self, when: datetime) -> int:
+        """Global limit in force at a given time"""
+        minute = when.hour * 60 + when.minute
+
+        for start, end, limit in self.rules:
+            if start <= end:
+                if start <= minute < end:
+                    return limit
+            elif minute >= start or minute < end:
+                return limit
+
+        return self.default_limit
+
+
+class BandwidthPolicy:
+    """Applies bandwidth limits to aria2 and keeps them current
+
+    The global limit (``max-overall-download-limit``) follows the schedule
+    and is re-applied with ``aria2.changeGlobalOption`` on every check, so
+    a restarted daemon picks it up too. Per-task limits
+    (``max-download-limit``) are set on new downloads and changed on live
+    ones with ``aria2.changeOption``; neither needs a restart.
+    """
+
+    CONFIG_KEYS = ('bandwidth_global_limit', 'bandwidth_task_limit', 'bandwidth_schedule')
+    RETRY_INTERVAL = 1.0  # seconds between attempts while aria2 is unreachable
+
+    def __init__(self, config, rpc_call: Callable, multicall: Callable,
+                 interval: float = 30):
+        self.config = config
+        self.rpc_call = rpc_call
+        self.multicall = multicall
+        self.interval = interval
+        self.schedule = BandwidthSchedule()
+        self.task_limit = 0
+        self.applied: Optional[int] = None
+        self._overrides: Dict[str, int] = {}  # gid -> limit set for that task
+        self._shares: Dict[str, int] = {}  # gid -> downloads splitting the default task limit
+        self._task_limit_changed = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reload()
+
+    def reload(self):
+        """Read limits and schedule from configuration (bad values are ignored)"""
+        try:
+            self.schedule = BandwidthSchedule(
+                parse_rate(self.config.get('bandwidth_global_limit', 0)),
+                self.config.get('bandwidth_schedule', [])
+            )
+        except ValueError as e:
+            print(f'Bandwidth schedule error: {e}', file=sys.stderr)
+
+        try:
+            self.task_limit = parse_rate(self.config.get('bandwidth_task_limit', 0))
+        except ValueError as e:
+            print(f'Bandwidth limit error: {e}', file=sys.stderr)
+
+    def global_limit(self, now: Optional[datetime] = None) -> int:
+        """Global limit in force now"""
+        return self.schedule.limit_at(now or datetime.now())
+
+    def task_options(self, limit: Optional[int] = None) -> Dict[str, str]:
+        """addUri options for a new download"""
+        limit = self.task_limit if limit is None else limit
+        return {'max-download-limit': str(limit)} if limit else {}
+
+    def direct_limit(self, limit: Optional[int] = None) -> int:
+        """Limit for a transfer that bypasses aria2: the task limit, capped by the global limit in force"""
+        limit = self.task_limit if limit is None else limit
+        overall = self.global_limit()
+        if overall and (not limit or overall < limit):
+            return overall
+        return limit
+
+    def cli_args(self, limit: Optional[int] = None) -> List[str]:
+        """aria2c arguments for a CLI download (fixed for the life of the process)"""
+        args = []
+        overall = self.global_limit()
+        if overall:
+            args.append(f'--max-overall-download-limit={overall}')
+
+        limit = self.task_limit if limit is None else limit
+        if limit:
+            args.append(f'--max-download-limit={limit}')
+        return args
+
+    def apply(self) -> bool:
+        """Push the current global limit to aria2"""
+        limit = self.global_limit()
+        result = self.rpc_call('aria2.changeGlobalOption', [{'max-overall-download-limit': str(limit)}])
+        if result is None:
+            return False
+
+        self.applied = limit
+        return True
+
+    def set_override(self, gid: str, limit: int):
+        """Record a download started with its own limit; default limit changes leave it alone"""
+        self._overrides[gid] = limit
+
+    def share_task_limit(self, gid: str, shares: int):
+        """Record a download that gets 1/shares of the default task limit (a fragment)"""
+        self._shares[gid] = max(1, shares)
+
+    def shared_limit(self, shares: int) -> int:
+        """One share of the default task limit"""
+        return max(1, self.task_limit // max(1, shares)) if self.task_limit else 0
+
+    def set_task_limit(self, gid: str, limit: int) -> bool:
+        """Change the limit of one live download"""
+        self.set_override(gid, limit)
+        result = self.rpc_call('aria2.changeOption', [gid, {'max-download-limit': str(limit)}])
+        return result is not None
+
+    def forget(self, gid: str):
+        """Drop the per-task override of a finished download"""
+        self._overrides.pop(gid, None)
+        self._shares.pop(gid, None)
+
+    def apply_task_limit(self):
+        """Apply the default per-task limit to live downloads without an override"""
+        results = self.multicall([
+            ('aria2.tellActive', [['gid']]),
+            ('aria2.tellWaiting', [0, 1000, ['gid']]),
+        ])
+        if not results:
+            return
+
+        gids = [
+            status['gid']
+            for result in results if isinstance(result, list) and result
+            for status in result[0]
+            if status['gid'] not in self._overrides
+        ]
+        if gids:
+            self.multicall([
+                ('aria2.changeOption', [gid, {'max-download-limit': str(self._default_limit(gid))}])
+                for gid in gids
+            ])
+
+    def _default_limit(self, gid: str) -> int:
+        """Default per-task limit for a live download, divided for fragments"""
+        shares = self._shares.get(gid)
+        return self.shared_limit(shares) if shares else self.task_limit
+
+    def on_config_changed(self, changed: Dict):
+        """Re-apply limits when bandwidth settings change
+
+        Only the configuration is read here; the RPC calls run on the
+        policy thread (RPC mode) so the caller (usually the UI) never waits
+        on aria2. In CLI mode the reload is all there is: new aria2c
+        processes pick the limits up through ``cli_args``.
+        """
+        if not any(key in changed for key in self.CONFIG_KEYS):
+            return
+
+        self.reload()
+        if 'bandwidth_task_limit' in changed:
+            self._task_limit_changed = True
+        self._wake.set()
+
+    def start(self):
+        """Apply limits now and keep following the schedule"""
+        if self._thread:
+            return
+
+        self._stop.clear()
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop following the schedule"""
+        self._stop.set()
+        self._wake.set()
+        self._thread = None
+
+    def _run(self):
+        """Apply the scheduled limit every interval, or at once after a settings change
+
+        While aria2 does not answer (a daemon still starting or restarting)
+        the limit is retried every RETRY_INTERVAL instead.
+        """
+        while True:
+            applied = self.apply()
+            if self._task_limit_changed and applied:
+                self._task_limit_changed = False
+                self.apply_task_limit()
+
+            self._wake.wait(self.interval if applied else min(self.interval, self.RETRY_INTERVAL))
+            self._wake.clear()
+            if self._stop.is_set():
+                return
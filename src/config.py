@@ -4,9 +4,15 @@
 Configuration manager
 """
 
+import atexit
+import copy
 import json
 import os
-from typing import Any, Optional
+import sys
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from .write_behind import WriteBehind
 
 
 class ConfigManager:
@@ -19,8 +25,47 @@ class ConfigManager:
         "aria2c_rpc_url": "http://localhost:6800/jsonrpc",
         "aria2c_rpc_secret": "",
         "aria2c_use_rpc": True,
+        "aria2c_use_websocket": True,
+        "aria2c_manage_daemon": True,
+        "aria2c_session_file": "aria2.session",
+        "aria2c_save_session_interval": 30,
+        "aria2c_health_interval": 5,
+        "aria2c_max_concurrent": 16,
+        "aria2c_poll_interval": 1.0,
+        "aria2c_summary_interval": 0,
+        "aria2c_progress_interval": 0.25,
+        "aria2c_rpc_pool_size": 10,
+        "aria2c_rpc_connect_timeout": 3.0,
+        "aria2c_rpc_timeout": 10.0,
         "aria2c_max_connections": 16,
         "aria2c_split": 16,
+        "host_tuning_enabled": True,
+        "host_tuning_path": "cache/host_profiles.json",
+        "host_tuning_min_connections": 1,
+        "host_tuning_max_connections": 16,
+        "host_tuning_initial_connections": 4,
+        "host_tuning_max_error_rate": 0.2,
+        "host_tuning_max_hosts": 500,
+        "max_concurrent_downloads": 3,
+        "max_downloads_per_host": 2,
+        "max_downloads_per_extractor": 0,
+        "host_concurrency_limits": {},
+        "progress_refresh_hz": 8,
+        "postprocess_workers": 0,
+        "concurrent_fragment_downloads": 8,
+        "fragment_retries": 10,
+        "bandwidth_global_limit": "0",
+        "bandwidth_task_limit": "0",
+        "bandwidth_schedule": [],
+        "bandwidth_check_interval": 30,
+        "playlist_lookahead": 20,
+        "hook_queue_size": 1000,
+        "hook_workers": 2,
+        "hook_progress_policy": "coalesce",
+        "hook_time_budget": 1.0,
+        "hook_max_overruns": 5,
+        "log_max_lines": 5000,
+        "log_flush_interval_ms": 200,
         "auto_check_updates": True,
         "auto_update": False,
         "update_manifest_url": "https://raw.githubusercontent.com/yunfie-twitter/ytdlp-gui/main/manifest.json",
@@ -30,12 +75,35 @@ class ConfigManager:
         "audio_format": "mp3",
         "embed_thumbnail": True,
         "embed_metadata": True,
+        "extraction_cache_enabled": True,
+        "extraction_cache_path": "cache/extraction.sqlite3",
+        "extraction_cache_metadata_ttl": 604800,
+        "extraction_cache_media_ttl": 1800,
+        "extraction_cache_max_entries": 5000,
+        "download_archive_enabled": True,
+        "download_archive_path": "cache/archive.sqlite3",
+        "queue_store_enabled": True,
+        "queue_store_path": "cache/queue.sqlite3",
+        "control_api_enabled": False,
+        "control_api_host": "127.0.0.1",
+        "control_api_port": 9780,
+        "control_api_token": "",
     }
     
-    def __init__(self, config_path="config.json"):
+    def __init__(self, config_path="config.json", flush_delay=0.5):
         self.config_path = config_path
+        self.flush_delay = flush_delay
         self.data = {}
+        self._lock = threading.RLock()
+        self._writer = WriteBehind(
+            config_path, lambda: json.dumps(self.data, indent=2, ensure_ascii=False),
+            self._lock, flush_delay, name='config', fsync=True
+        )
+        self._listeners = []
         self.load()
+        
+        # Write pending changes on interpreter exit
+        atexit.register(self.flush)
     
     def load(self):
         """Load configuration from file"""
@@ -44,35 +112,75 @@ class ConfigManager:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
                     self.data = json.load(f)
                 # Merge with defaults for new keys
-                for key, value in self.DEFAULT_CONFIG.items():
-                    if key not in self.data:
-                        self.data[key] = value
-                self.save()  # Save merged config
+                missing = [key for key in self.DEFAULT_CONFIG if key not in self.data]
+                for key in missing:
+                    self.data[key] = self.DEFAULT_CONFIG[key]
+                if missing:
+                    self._schedule_flush()  # Save merged config
             except Exception as e:
-                print(f"Failed to load config: {e}")
+                print(f"Failed to load config: {e}", file=sys.stderr)
                 self.data = self.DEFAULT_CONFIG.copy()
-                self.save()
+                self._schedule_flush()
         else:
             self.data = self.DEFAULT_CONFIG.copy()
-            self.save()
+            self._schedule_flush()
     
     def save(self):
-        """Save configuration to file"""
-        try:
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"Failed to save config: {e}")
+        """Save configuration to file now"""
+        self.flush()
+    
+    def flush(self):
+        """Write pending changes atomically (temp file + rename); no-op if clean"""
+        self._writer.flush()
+    
+    def _schedule_flush(self):
+        """Write behind: coalesce changes made within flush_delay into one write"""
+        self._writer.schedule()
     
     def get(self, key: str, default: Any = None) -> Any:
-        """Get configuration value"""
-        return self.data.get(key, default)
+        """Get configuration value (lists and dicts are copies; pass changes back with set)"""
+        value = self.data.get(key, default)
+        if isinstance(value, (list, dict)):
+            return copy.deepcopy(value)
+        return value
     
     def set(self, key: str, value: Any):
         """Set configuration value"""
-        self.data[key] = value
-        self.save()
+        self.update({key: value})
+    
+    def update(self, values: Dict[str, Any]):
+        """Set several values with one notification and one write"""
+        with self._lock:
+            changed = {
+                key: value for key, value in values.items()
+                if key not in self.data or self.data[key] != value
+            }
+            if not changed:
+                return
+            # Keep our own copies so later changes by the caller are not aliased
+            self.data.update(copy.deepcopy(changed))
+            self._schedule_flush()
+        
+        self._notify(changed)
+    
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call callback(changed_values) after every change"""
+        self._listeners.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Stop change notifications"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify(self, changed: Dict[str, Any]):
+        """Tell listeners which keys changed"""
+        for callback in list(self._listeners):
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"Config listener error: {e}", file=sys.stderr)
     
     def get_all(self) -> dict:
         """Get all configuration"""
-        return self.data.copy()
+        with self._lock:
+            return copy.deepcopy(self.data)
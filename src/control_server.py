@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Control Server - local HTTP/JSON API for enqueueing and status
+"""
+
+import hmac
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+
+class ControlServer:
+    """Embedded HTTP server exposing the AppAPI queue operations
+
+    Every request needs the token, either as ``Authorization: Bearer``
+    or as a ``token`` query parameter (for EventSource clients).
+
+    Endpoints:
+        GET  /api/tasks?state=downloading,queued&q=text  list tasks
+        POST /api/tasks           {"urls": [...], "output_dir", "priority", "playlist"}
+        POST /api/tasks/pause     {"ids": [...]}
+        POST /api/tasks/resume    {"ids": [...]}
+        POST /api/tasks/cancel    {"ids": [...]}
+        POST /api/tasks/limit     {"ids": [...], "limit": "2M"}
+        POST /api/tasks/priority  {"ids": [...], "priority": 10}
+        GET  /api/events?interval=1&format=sse|jsonl  stream of changed tasks
+    """
+
+    def __init__(self, api, host: str = '127.0.0.1', port: int = 9780, token: str = ''):
+        self.api = api
+        self.host = host
+        self.port = port
+        self.token = token
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    @classmethod
+    def from_config(cls, config, api) -> Optional['ControlServer']:
+        """Create the server from configuration, or None if disabled"""
+        if not config.get('control_api_enabled', False):
+            return None
+
+        return cls(
+            api,
+            host=config.get('control_api_host', '127.0.0.1'),
+            port=config.get('control_api_port', 9780),
+            token=cls.ensure_token(config)
+        )
+
+    @staticmethod
+    def ensure_token(config) -> str:
+        """Generate and persist an access token if none is configured"""
+        token = config.get('control_api_token', '')
+        if not token:
+            token = secrets.token_urlsafe(24)
+            config.set('control_api_token', token)
+        return token
+
+    def start(self) -> bool:
+        """Start serving in a background thread"""
+        if self._server:
+            return True
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        except OSError as e:
+            self.api.log(f'制御APIを起動できません ({self.host}:{self.port}): {e}', 'ERROR')
+            return False
+
+        self._server.daemon_threads = True
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        self.api.log(f'制御API: http://{self.host}:{self.port}/api/')
+        return True
+
+    def stop(self):
+        """Stop serving and end open event streams"""
+        self._stopping.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _authorized(self, handler, query) -> bool:
+        """Check the bearer token or token query parameter"""
+        header = handler.headers.get('Authorization', '')
+        supplied = header[7:] if header.startswith('Bearer ') else query.get('token', [''])[0]
+        return bool(self.token) and hmac.compare_digest(supplied, self.token)
+
+    def _handler_class(self):
+        """Request handler bound to this server"""
+        control = self
+
+        class Handler(BaseHTTPRequestHandler):
+            server_version = 'ytdlp-gui-control/1.0'
+
+            def log_message(self, format, *args):
+                pass  # requests are not worth a log line each
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b''
+                if not raw:
+                    return {}
+
+                if self.headers.get('Content-Type', '').startswith('text/plain'):
+                    # One URL per line
+                    return {'urls': [line.strip() for line in raw.decode('utf-8').splitlines() if line.strip()]}
+
+                return json.loads(raw)
+
+            def _route(self, method):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+
+                if not control._authorized(self, query):
+                    self._send_json(401, {'success': False, 'error': 'unauthorized'})
+                    return
+
+                try:
+                    if method == 'GET' and parsed.path == '/api/tasks':
+                        tasks = control.api.list_tasks(
+                            state=query.get('state', [None])[0],
+                            query=query.get('q', [None])[0]
+                        )
+                        self._send_json(200, {'success': True, 'tasks': tasks})
+
+                    elif method == 'GET' and parsed.path == '/api/events':
+                        control._stream(self, query)
+
+                    elif method == 'POST' and parsed.path == '/api/tasks':
+                        body = self._read_body()
+                        urls = body.get('urls') or ([body['url']] if body.get('url') else [])
+                        if not urls:
+                            self._send_json(400, {'success': False, 'error': 'urls is required'})
+                            return
+                        self._send_json(200, control.api.add_downloads(
+                            urls,
+                            output_dir=body.get('output_dir'),
+                            priority=int(body.get('priority', 0)),
+                            playlist=bool(body.get('playlist', False))
+                        ))
+
+                    elif method == 'POST' and parsed.path == '/api/tasks/limit':
+                        body = self._read_body()
+                        count = control.api.set_speed_limit(body.get('ids') or [], body.get('limit', 0))
+                        self._send_json(200, {'success': True, 'count': count})
+
+                    elif method == 'POST' and parsed.path == '/api/tasks/priority':
+                        body = self._read_body()
+                        count = control.api.set_priority(body.get('ids') or [], int(body.get('priority', 0)))
+                        self._send_json(200, {'success': True, 'count': count})
+
+                    elif method == 'POST' and parsed.path in (
+                            '/api/tasks/pause', '/api/tasks/resume', '/api/tasks/cancel'):
+                        ids = self._read_body().get('ids') or []
+                        action = {
+                            'pause': control.api.pause_downloads,
+                            'resume': control.api.resume_downloads,
+                            'cancel': control.api.cancel_downloads,
+                        }[parsed.path.rsplit('/', 1)[1]]
+                        self._send_json(200, {'success': True, 'count': action(ids)})
+
+                    else:
+                        self._send_json(404, {'success': False, 'error': 'not found'})
+
+                except (ValueError, KeyError) as e:
+                    self._send_json(400, {'success': False, 'error': str(e)})
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                except Exception as e:
+                    control.api.log(f'制御APIエラー: {e}', 'ERROR')
+                    self._send_json(500, {'success': False, 'error': str(e)})
+
+            def do_GET(self):
+                self._route('GET')
+
+            def do_POST(self):
+                self._route('POST')
+
+        return Handler
+
+    def _stream(self, handler, query):
+        """Send tasks whose state or progress changed, until the client leaves"""
+        interval = max(0.2, float(query.get('interval', ['1'])[0]))
+        sse = query.get('format', ['sse'])[0] != 'jsonl'
+
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream' if sse else 'application/x-ndjson')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.end_headers()
+
+        last = {}  # id -> (state, percent, done)
+        last_write = time.monotonic()
+        while not self._stopping.is_set():
+            current = {}
+            lines = []
+            for task in self.api.list_tasks():
+                key = (task['state'], task['percent'], task['done'])
+                current[task['id']] = key
+                if last.get(task['id']) != key:
+                    lines.append(json.dumps(task, ensure_ascii=False))
+
+            for task_id in last.keys() - current.keys():
+                lines.append(json.dumps({'id': task_id, 'state': 'removed'}))
+            last = current
+
+            if lines:
+                last_write = time.monotonic()
+                if sse:
+                    payload = ''.join(f'data: {line}\n\n' for line in lines)
+                else:
+                    payload = ''.join(f'{line}\n' for line in lines)
+                handler.wfile.write(payload.encode('utf-8'))
+                handler.wfile.flush()
+            elif sse and time.monotonic() - last_write > 15:
+                last_write = time.monotonic()
+                handler.wfile.write(b': keepalive\n\n')
+                handler.wfile.flush()
+
+            time.sleep(interval)
@@ -4,17 +4,29 @@ aria2c統合モジュール
 """
 
 import json
-import requests
 import subprocess
 import shutil
-from typing import Dict, Any, Optional, List
+import threading
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 
+from ..aria2_rpc import Aria2RPCClient
+from ..aria2_poller import Aria2StatusPoller
+
 class Aria2cManager:
     """
 aria2c管理クラス
     """
     
+    # ステータス取得時に要求するフィールド
+    STATUS_KEYS = [
+        "gid", "status", "totalLength", "completedLength",
+        "downloadSpeed", "connections", "errorCode", "errorMessage"
+    ]
+    
+    # ステータスが一度も届かないままこの秒数が過ぎたら失敗とみなす
+    STALL_TIMEOUT = 60
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.mode = config.get("aria2c_mode", "rpc")
@@ -22,6 +34,21 @@ aria2c管理クラス
         self.token = config.get("aria2c_rpc_token", "")
         self.max_connection = config.get("aria2c_max_connection_per_server", 16)
         self.split = config.get("aria2c_split", 16)
+        self.rpc = Aria2RPCClient.from_config(config, secret_key="aria2c_rpc_token")
+        self._poller = None
+        self._poller_lock = threading.Lock()
+    
+    @property
+    def poller(self) -> Aria2StatusPoller:
+        """
+全タスクで共有するステータスポーラー（初回利用時に生成）
+        """
+        with self._poller_lock:
+            if self._poller is None:
+                self._poller = Aria2StatusPoller(
+                    self._multicall, interval=self.config.get("aria2c_poll_interval", 1.0)
+                )
+            return self._poller
     
     def is_available(self) -> bool:
         """
@@ -40,29 +67,15 @@ aria2cが利用可能か確認
     
     def _rpc_call(self, method: str, params: Optional[List] = None) -> Optional[Dict]:
         """
-RPCコールを実行
+RPCコールを実行（接続プールを共有するクライアント経由）
         """
-        if params is None:
-            params = []
-        
-        # トークンを追加
-        if self.token:
-            params.insert(0, f"token:{self.token}")
-        
-        payload = {
-            "jsonrpc": "2.0",
-            "id": "ytdlp_gui",
-            "method": method,
-            "params": params
-        }
-        
-        try:
-            response = requests.post(self.rpc_url, json=payload, timeout=5)
-            result = response.json()
-            return result.get("result")
-        except Exception as e:
-            print(f"RPCコールエラー: {e}")
-            return None
+        return self.rpc.call(method, params)
+    
+    def _multicall(self, calls: List[Tuple[str, List]]) -> Optional[List]:
+        """
+複数のRPCメソッドを1リクエストで実行
+        """
+        return self.rpc.multicall(calls)
     
     def add_download(self, url: str, output_dir: str, filename: str, 
                      options: Optional[Dict] = None) -> Optional[str]:
@@ -74,10 +87,10 @@ RPCコールを実行
         else:
             return self._add_download_cli(url, output_dir, filename, options)
     
-    def _add_download_rpc(self, url: str, output_dir: str, filename: str,
-                          options: Optional[Dict] = None) -> Optional[str]:
+    def _rpc_options(self, output_dir: str, filename: str,
+                     options: Optional[Dict] = None) -> Dict:
         """
-RPCモードでダウンロードを追加
+RPC用のダウンロードオプションを作成
         """
         aria2_options = {
             "dir": output_dir,
@@ -92,8 +105,31 @@ RPCモードでダウンロードを追加
         if options:
             aria2_options.update(options)
         
-        gid = self._rpc_call("aria2.addUri", [[url], aria2_options])
-        return gid
+        return aria2_options
+    
+    def _add_download_rpc(self, url: str, output_dir: str, filename: str,
+                          options: Optional[Dict] = None) -> Optional[str]:
+        """
+RPCモードでダウンロードを追加
+        """
+        aria2_options = self._rpc_options(output_dir, filename, options)
+        return self._rpc_call("aria2.addUri", [[url], aria2_options])
+    
+    def add_downloads(self, items: List[Tuple[str, str, str]],
+                      options: Optional[Dict] = None) -> List[Optional[str]]:
+        """
+複数のダウンロードをsystem.multicallでまとめて追加（RPCモードのみ）
+items: (url, output_dir, filename) のリスト
+        """
+        if self.mode != "rpc":
+            return [self._add_download_cli(url, d, f, options) for url, d, f in items]
+        
+        calls = [
+            ("aria2.addUri", [[url], self._rpc_options(d, f, options)])
+            for url, d, f in items
+        ]
+        results = self._multicall(calls) or [None] * len(items)
+        return [r[0] if isinstance(r, list) and r else None for r in results]
     
     def _add_download_cli(self, url: str, output_dir: str, filename: str,
                           options: Optional[Dict] = None) -> Optional[str]:
@@ -124,16 +160,40 @@ CLIモードでダウンロードを追加
             print(f"CLIダウンロードエラー: {e}")
             return None
     
-    def get_status(self, gid: str) -> Optional[Dict]:
+    def get_status(self, gid: str, keys: Optional[List[str]] = None) -> Optional[Dict]:
         """
 ダウンロードステータスを取得
         """
         if self.mode == "rpc":
-            return self._rpc_call("aria2.tellStatus", [gid])
+            return self._rpc_call("aria2.tellStatus", [gid, keys or self.STATUS_KEYS])
         else:
             # CLIモードではステータス取得が困難
             return None
     
+    def get_statuses(self, gids: List[str], keys: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """
+複数ダウンロードのステータスを1リクエストで取得
+tellActive/tellWaiting/tellStoppedをsystem.multicallでまとめて呼び出す
+        """
+        if self.mode != "rpc" or not gids:
+            return {}
+        
+        keys = keys or self.STATUS_KEYS
+        results = self._multicall([
+            ("aria2.tellActive", [keys]),
+            ("aria2.tellWaiting", [0, 1000, keys]),
+            ("aria2.tellStopped", [-1, 1000, keys]),
+        ]) or []
+        
+        wanted = set(gids)
+        statuses = {}
+        for result in results:
+            if isinstance(result, list) and result:
+                for status in result[0]:
+                    if status.get("gid") in wanted:
+                        statuses[status["gid"]] = status
+        return statuses
+    
     def pause(self, gid: str) -> bool:
         """
 ダウンロードを一時停止
@@ -152,11 +212,12 @@ CLIモードでダウンロードを追加
             return result == gid
         return False
     
-    def remove(self, gid: str) -> bool:
+    def remove(self, gid: str, force: bool = True) -> bool:
         """
-ダウンロードを中止
+ダウンロードを中止（force=Trueなら後処理を待たずに即座に停止）
         """
         if self.mode == "rpc":
-            result = self._rpc_call("aria2.remove", [gid])
+            method = "aria2.forceRemove" if force else "aria2.remove"
+            result = self._rpc_call(method, [gid])
             return result == gid
         return False
@@ -21,6 +21,8 @@ class ConfigManager:
         "aria2c_max_connection_per_server": 16,
         "aria2c_split": 16,
         "max_concurrent_downloads": 3,
+        "concurrent_fragment_downloads": 8,  # HLS/DASHフラグメントの同時ダウンロード数
+        "bandwidth_task_limit": "0",  # バイト/秒 (例: "2M")、"0" は無制限
         "auto_update": True,
         "update_check_url": "https://api.github.com/repos/yunfie-twitter/ytdlp-gui/releases/latest",
         "theme": "light",
@@ -4,12 +4,17 @@
 """
 
 import os
+import threading
 import time
 from pathlib import Path
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, Callable, Union
 from PyQt5.QtCore import QObject, QRunnable, pyqtSignal, pyqtSlot
 import yt_dlp
+from yt_dlp.utils import DownloadCancelled
 from .aria2c import Aria2cManager
+from ..progress_table import ProgressTable
+from ..hook_bus import HookBus
+from ..bandwidth import parse_rate
 
 class DownloadSignals(QObject):
     """ダウンロードシグナル"""
@@ -23,7 +28,8 @@ class DownloadTask(QRunnable):
     
     def __init__(self, url: str, config: Dict[str, Any], 
                  aria2c_manager: Optional[Aria2cManager] = None,
-                 hooks: Optional[Dict[str, list]] = None):
+                 hooks: Optional[Union[Dict[str, list], HookBus]] = None,
+                 progress_table: Optional[ProgressTable] = None):
         super().__init__()
         self.url = url
         self.config = config
@@ -31,9 +37,19 @@ class DownloadTask(QRunnable):
         self.signals = DownloadSignals()
         self.hooks = hooks or {}
         self.is_cancelled = False
+        self.gids = []  # aria2c RPCへ直接渡したダウンロードのGID
+        
+        # 共有進捗テーブルがあればシグナルの代わりにそこへ書き込む
+        self.progress_table = progress_table
+        self.slot = progress_table.allocate() if progress_table else None
     
     def _call_hook(self, hook_name: str, info: Dict[str, Any]):
         """フックを呼び出す"""
+        # HookBusならワーカースレッドへ委譲し、ダウンロードスレッドを止めない
+        if isinstance(self.hooks, HookBus):
+            self.hooks.emit(hook_name, info)
+            return
+        
         if hook_name in self.hooks:
             for callback in self.hooks[hook_name]:
                 try:
@@ -55,6 +71,8 @@ class DownloadTask(QRunnable):
                 'progress_hooks': [self._progress_hook],
                 'quiet': True,
                 'no_warnings': True,
+                # HLS/DASHのフラグメントを並列取得
+                'concurrent_fragment_downloads': self.config.get("concurrent_fragment_downloads", 8),
             }
             
             # ffmpegパスを設定
@@ -62,6 +80,11 @@ class DownloadTask(QRunnable):
             if ffmpeg_path and os.path.exists(ffmpeg_path):
                 ydl_opts['ffmpeg_location'] = ffmpeg_path
             
+            # 帯域制限（タスクごと、バイト/秒）
+            rate_limit = parse_rate(self.config.get("bandwidth_task_limit", 0))
+            if rate_limit:
+                ydl_opts['ratelimit'] = rate_limit
+            
             # aria2cを使用する場合
             if self.config.get("aria2c_enabled", False) and self.aria2c_manager:
                 if self.aria2c_manager.is_available():
@@ -71,6 +94,8 @@ class DownloadTask(QRunnable):
                         f'-s {self.aria2c_manager.split}',
                         '--continue=true'
                     ]
+                    if rate_limit:
+                        ydl_opts['external_downloader_args'].append(f'--max-download-limit={rate_limit}')
             
             # ダウンロード開始
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
@@ -86,32 +111,126 @@ class DownloadTask(QRunnable):
                 self.signals.started.emit(start_info)
                 self._call_hook('on_download_start', start_info)
                 
-                # ダウンロード実行
+                # ダウンロード実行（取得済みの情報を再利用し、再抽出しない）
                 if not self.is_cancelled:
-                    ydl.download([self.url])
+                    if self._can_use_rpc(info):
+                        # GIDを保持するため、aria2c RPCへ直接渡す
+                        filename = self._download_rpc(ydl, info, rate_limit)
+                    else:
+                        info = ydl.process_ie_result(info, download=True)
+                        filename = ydl.prepare_filename(info)
                     
                     # 完了情報
                     complete_info = {
                         'url': self.url,
                         'title': info.get('title', 'Unknown'),
-                        'filename': ydl.prepare_filename(info),
-                        'filesize': info.get('filesize', 0)
+                        'filename': filename,
+                        'filesize': info.get('filesize') or info.get('filesize_approx', 0)
                     }
                     self.signals.completed.emit(complete_info)
                     self._call_hook('on_complete', complete_info)
                     
+        except DownloadCancelled:
+            if self.progress_table is not None:
+                self.progress_table.update(self.slot, speed=0, state=ProgressTable.CANCELLED)
+            self.signals.error.emit("ダウンロードがキャンセルされました")
+        
         except Exception as e:
             error_msg = f"ダウンロードエラー: {str(e)}"
             self.signals.error.emit(error_msg)
             self._call_hook('on_error', {'url': self.url, 'error': str(e)})
     
+    def _can_use_rpc(self, info: Dict[str, Any]) -> bool:
+        """aria2c RPCへ直接渡せるか（結合不要の単一HTTP(S)フォーマットのみ）"""
+        return (
+            self.config.get("aria2c_enabled", False)
+            and self.aria2c_manager is not None
+            and self.aria2c_manager.mode == "rpc"
+            and not info.get('requested_formats')
+            and info.get('protocol') in ('http', 'https')
+            and self.aria2c_manager.is_available()
+        )
+    
+    def _download_rpc(self, ydl, info: Dict[str, Any], rate_limit: int) -> str:
+        """aria2c RPCでダウンロード（一時停止・中止はGIDに対して即座に反映）"""
+        path = ydl.prepare_filename(info)
+        options = {}
+        headers = [f'{key}: {value}' for key, value in (info.get('http_headers') or {}).items()]
+        if headers:
+            options['header'] = headers
+        if rate_limit:
+            options['max-download-limit'] = str(rate_limit)
+        
+        gid = self.aria2c_manager.add_download(
+            info['url'], os.path.dirname(path) or '.', os.path.basename(path), options
+        )
+        if not gid:
+            raise Exception("aria2cへの追加に失敗しました")
+        self.gids = [gid]
+        
+        return self._follow_rpc(gid, path)
+    
+    def _follow_rpc(self, gid: str, path: str) -> str:
+        """共有ポーラーでGIDの状態を追跡し、完了までブロックする"""
+        finished = threading.Event()
+        final = {}
+        last_seen = [time.monotonic()]
+        
+        def on_status(status):
+            last_seen[0] = time.monotonic()
+            if status.get('status') in ('complete', 'error', 'removed'):
+                final['status'] = status
+                finished.set()
+            elif status.get('status') == 'active':
+                try:
+                    self._progress_hook({
+                        'status': 'downloading',
+                        'downloaded_bytes': int(status.get('completedLength', 0)),
+                        'total_bytes': int(status.get('totalLength', 0)),
+                        'speed': int(status.get('downloadSpeed', 0)),
+                    })
+                except DownloadCancelled:
+                    finished.set()
+        
+        poller = self.aria2c_manager.poller
+        stall_timeout = self.config.get("aria2c_stall_timeout", self.aria2c_manager.STALL_TIMEOUT)
+        poller.subscribe(gid, on_status)
+        try:
+            while not finished.wait(0.5):
+                if self.is_cancelled:
+                    break
+                if time.monotonic() - last_seen[0] > stall_timeout:
+                    raise Exception("aria2cからステータスを取得できません")
+        finally:
+            poller.unsubscribe(gid)
+        
+        if self.is_cancelled:
+            raise DownloadCancelled()
+        status = final.get('status', {})
+        if status.get('status') == 'complete':
+            return path
+        raise Exception(status.get('errorMessage') or 'aria2cエラー')
+    
     def _progress_hook(self, d: Dict[str, Any]):
         """進捗フック"""
         if self.is_cancelled:
-            raise Exception("ダウンロードがキャンセルされました")
+            raise DownloadCancelled()
         
         if d['status'] == 'downloading':
+            if self.progress_table is not None:
+                total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+                done = d.get('downloaded_bytes') or 0
+                self.progress_table.update(
+                    self.slot,
+                    percent=int(done * 100 / total) if total else None,
+                    done=done,
+                    total=int(total),
+                    speed=int(d.get('speed') or 0),
+                    state=ProgressTable.DOWNLOADING
+                )
+            
             progress_info = {
+                'url': self.url,
                 'status': 'downloading',
                 'downloaded_bytes': d.get('downloaded_bytes', 0),
                 'total_bytes': d.get('total_bytes', 0) or d.get('total_bytes_estimate', 0),
@@ -119,9 +238,21 @@ class DownloadTask(QRunnable):
                 'eta': d.get('eta', 0),
                 'percent': d.get('_percent_str', '0%').strip()
             }
-            self.signals.progress.emit(progress_info)
+            if self.progress_table is None:
+                self.signals.progress.emit(progress_info)
             self._call_hook('on_progress', progress_info)
     
     def cancel(self):
-        """ダウンロードをキャンセル"""
+        """ダウンロードをキャンセル（aria2c RPCのダウンロードは即座に中止）"""
         self.is_cancelled = True
+        if self.aria2c_manager:
+            for gid in self.gids:
+                self.aria2c_manager.remove(gid)
+    
+    def pause(self) -> bool:
+        """一時停止（aria2c RPCのダウンロードのみ）"""
+        return bool(self.gids) and all([self.aria2c_manager.pause(gid) for gid in self.gids])
+    
+    def resume(self) -> bool:
+        """一時停止したダウンロードを再開"""
+        return bool(self.gids) and all([self.aria2c_manager.unpause(gid) for gid in self.gids])
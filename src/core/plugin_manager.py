@@ -9,27 +9,25 @@ import sys
 from pathlib import Path
 from typing import Dict, List, Any, Callable, Optional
 
+from ..hook_bus import HookBus
+
 class PluginAPI:
     """プラグインAPIクラス"""
     
     def __init__(self, app):
         self.app = app
-        self.hooks: Dict[str, List[Callable]] = {
-            'on_download_start': [],
-            'on_progress': [],
-            'on_complete': [],
-            'on_error': []
-        }
+        config = app.config_manager if hasattr(app, 'config_manager') else {}
+        self.hook_bus = HookBus.from_config(config, log=self.log)
+        self.hooks: Dict[str, List[Callable]] = self.hook_bus.hooks
     
     def register_hook(self, name: str, callback: Callable):
         """フックを登録"""
-        if name in self.hooks:
-            self.hooks[name].append(callback)
+        if self.hook_bus.register(name, callback):
             self.log(f"フック登録: {name}")
         else:
             self.log(f"未対応のフック: {name}")
     
-    def log(self, message: str):
+    def log(self, message: str, level: str = 'INFO'):
         """ログ出力"""
         if hasattr(self.app, 'log'):
             self.app.log(message)
@@ -122,3 +120,7 @@ class PluginManager:
     def get_hooks(self) -> Dict[str, List[Callable]]:
         """登録されたフックを取得"""
         return self.api.hooks
+    
+    def get_hook_bus(self) -> HookBus:
+        """非同期フックバスを取得（DownloadTaskのhooksに渡す）"""
+        return self.api.hook_bus
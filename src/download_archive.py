@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Download Archive - indexed record of videos that were already downloaded
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+
+class DownloadArchive:
+    """SQLite-backed set of (extractor, video_id) pairs
+
+    Keys follow yt-dlp's ``--download-archive`` convention (lower-case
+    extractor key plus video id), so archive files can be imported and
+    exported line for line. Lookups are a primary-key probe and need no
+    network access, so they run before any extraction.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS archive (
+                extractor TEXT NOT NULL,
+                video_id TEXT NOT NULL,
+                PRIMARY KEY (extractor, video_id)
+            ) WITHOUT ROWID
+        ''')
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['DownloadArchive']:
+        """Create the archive from configuration, or None if disabled"""
+        if not config.get('download_archive_enabled', True):
+            return None
+
+        return cls(config.get('download_archive_path', 'cache/archive.sqlite3'))
+
+    @staticmethod
+    def _key(extractor: str, video_id: str) -> Tuple[str, str]:
+        """Normalize to yt-dlp's archive id form"""
+        return extractor.lower(), str(video_id)
+
+    def contains(self, extractor: str, video_id: str) -> bool:
+        """Whether a video has been downloaded before"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT 1 FROM archive WHERE extractor = ? AND video_id = ?',
+                self._key(extractor, video_id)
+            ).fetchone()
+        return row is not None
+
+    def add(self, extractor: str, video_id: str):
+        """Record a finished download"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO archive (extractor, video_id) VALUES (?, ?)',
+                self._key(extractor, video_id)
+            )
+            self._conn.commit()
+
+    def remove(self, extractor: str, video_id: str):
+        """Forget a video so it can be downloaded again"""
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM archive WHERE extractor = ? AND video_id = ?',
+                self._key(extractor, video_id)
+            )
+            self._conn.commit()
+
+    def import_file(self, path: str) -> int:
+        """Merge a yt-dlp archive file ("extractor id" per line); returns lines read"""
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.strip().split(' ', 1)
+                if len(parts) == 2:
+                    rows.append(self._key(*parts))
+
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO archive (extractor, video_id) VALUES (?, ?)', rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def export_file(self, path: str) -> int:
+        """Write the archive in yt-dlp format; returns the number of entries"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT extractor, video_id FROM archive ORDER BY extractor, video_id'
+            ).fetchall()
+
+        with open(path, 'w', encoding='utf-8') as f:
+            for extractor, video_id in rows:
+                f.write(f'{extractor} {video_id}\n')
+        return len(rows)
+
+    def count(self) -> int:
+        """Number of archived videos"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM archive').fetchone()[0]
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
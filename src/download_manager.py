@@ -5,35 +5,190 @@ Download Manager
 """
 
 import os
-import subprocess
 import threading
-from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QProgressBar
-)
-from PyQt5.QtCore import QObject, pyqtSignal, QThread, QTimer
+import uuid
+from urllib.parse import urlparse
+from PyQt5.QtCore import QObject, pyqtSignal
 from .aria2_manager import Aria2Manager
+from .resolver import MediaResolver, canonical_id
+from .extraction_cache import ExtractionCache
+from .scheduler import DownloadScheduler
+from .progress_table import ProgressTable
+from .playlist import PlaylistFeeder
+from .download_archive import DownloadArchive
+from .queue_store import QueueStore
+from .bandwidth import parse_rate
+from .host_tuner import HostTuner
+from . import fragments, postprocess
 
 
 class DownloadTask(QObject):
     """Single download task"""
     
-    progress_updated = pyqtSignal(int, str)  # progress, status
     completed = pyqtSignal(bool, str)  # success, message
     
-    def __init__(self, url, output_dir, config, aria2_manager, api):
+    def __init__(self, url, output_dir, config, aria2_manager, resolver, api,
+                 progress_table, on_finished=None, title=None, archive_key=None,
+                 store=None, task_id=None, gid=None, gids=None, filename=None, priority=0,
+                 postprocessor=None, on_slot_freed=None, paused=False):
         super().__init__()
+        self.id = task_id or uuid.uuid4().hex
         self.url = url
         self.output_dir = output_dir
+        self.priority = priority
         self.config = config
         self.aria2_manager = aria2_manager
+        self.resolver = resolver
         self.api = api
+        self.on_finished = on_finished
+        self.on_slot_freed = on_slot_freed  # download slot no longer needed, task not finished
+        self.postprocessor = postprocessor
         self.is_running = False
-        self.gid = None
+        self.is_finished = False
+        self.removed = False
+        self.paused = paused
+        self.speed_limit = None  # bytes/s; None uses the configured per-task limit
+        self.gids = [gid] if gid else []  # aria2 GIDs of the running download
+        self.fragment_gids = {}  # part file -> GIDs of its fragment batch in flight
+        self._restored_gids = [g for g in gids or [] if g != gid]  # journaled by an earlier session
+        self._reattach = {}  # output file -> restored GID still writing it
+        self.archive_key = archive_key  # (extractor, video_id)
+        self.filename = filename
+        self.filesize = None
+        self._media = None  # resolver result
+        self._plan = None  # ffmpeg work after the download, if any
+        self._parts = []
+        self._written = []  # files this run writes; deleted if it is cancelled
+        self._existing = set()  # of those, finished files that were already there
+        
+        # Stopping a running task: aria2 GIDs are removed and child processes killed
+        self.cancelled = threading.Event()
+        self.stop_reason = None  # 'cancel' or 'pause'
+        self.processes = []  # aria2c/ffmpeg processes of the current stage
+        self.fragmented = False  # HLS/DASH fragments (no aria2-level pause)
+        
+        # Journal of state transitions (None if persistence is disabled)
+        self.store = store
+        
+        # Progress lives in the shared table; the UI polls it at its own rate
+        self.progress_table = progress_table
+        self.slot = progress_table.allocate()
+        
+        # Display state, read by the list model
+        self.title = title
+        self.status = ''
+        self.success = None
+    
+    @property
+    def gid(self):
+        """GID of the (first) aria2 download"""
+        return self.gids[0] if self.gids else None
+    
+    @property
+    def progress(self):
+        """Current progress in percent"""
+        return self.progress_table.percent[self.slot] if self.slot is not None else 0
+    
+    def _set_progress(self, **values):
+        """Write to this task's progress slot (no-op once the slot is released)"""
+        slot = self.slot
+        if slot is not None:
+            self.progress_table.update(slot, **values)
+    
+    def snapshot(self):
+        """Plain-dict view of the task for APIs"""
+        slot = self.slot
+        if slot is None:
+            percent, done, total, speed, state = self.progress, 0, 0, 0, 'removed'
+        else:
+            percent, done, total, speed, state = self.progress_table.row(slot)
+            state = ProgressTable.STATE_NAMES.get(state, 'unknown')
+        
+        return {
+            'id': self.id,
+            'url': self.url,
+            'title': self.title,
+            'state': state,
+            'percent': percent,
+            'done': done,
+            'total': total,
+            'speed': speed,
+            'status': self.status,
+            'success': self.success,
+            'gid': self.gid,
+            'filename': self.filename,
+        }
+    
+    def set_paused(self, paused):
+        """Record a pause or resume in the progress table and the journal"""
+        self.paused = paused
+        if paused:
+            state = ProgressTable.PAUSED
+            self._journal(state=QueueStore.PAUSED)
+        else:
+            state = ProgressTable.DOWNLOADING if self.is_running else ProgressTable.QUEUED
+            self._journal(state=QueueStore.RUNNING if self.is_running else QueueStore.QUEUED)
+        self._update(state)
+    
+    def cancel(self):
+        """Stop the task now; it finishes as cancelled"""
+        self.stop_reason = 'cancel'
+        self._interrupt()
+    
+    def suspend(self):
+        """Stop the transfer but keep partial files; resuming queues the task again"""
+        self.stop_reason = 'pause'
+        self.set_paused(True)
+        self._interrupt()
+    
+    @property
+    def can_pause_in_aria2(self):
+        """Whether the transfer is only RPC downloads that aria2 can pause itself"""
+        return bool(self.gids) and not self.processes and not self.fragmented
+    
+    def _interrupt(self):
+        """Remove the task's aria2 downloads and kill its child processes"""
+        self.cancelled.set()
+        for gid in list(self.gids) + self._restored_gids:
+            self.aria2_manager.remove(gid)
+        for process in list(self.processes):
+            try:
+                if process.poll() is None:
+                    process.kill()
+            except OSError:
+                pass
+    
+    def _journal(self, **fields):
+        """Record a state transition in the queue store"""
+        if self.store:
+            self.store.update(self.id, **fields)
+    
+    def _update(self, state, percent=None):
+        """Record a state change in the progress table"""
+        self._set_progress(percent=percent, state=state)
+    
+    def _finish(self, success, message):
+        """Record and announce the final result"""
+        self.success = success
+        self.status = message
+        self._journal(
+            state=QueueStore.COMPLETED if success else QueueStore.ERROR,
+            error=None if success else message
+        )
+        self._set_progress(
+            percent=100 if success else None,
+            speed=0,
+            state=ProgressTable.COMPLETED if success else ProgressTable.ERROR
+        )
+        self.completed.emit(success, message)
     
     def start(self):
         """Start download"""
+        self.cancelled.clear()
+        self.stop_reason = None
+        self.processes = []
         self.is_running = True
+        self._journal(state=QueueStore.RUNNING)
         
         # Emit hook
         self.api.call_hook('on_download_start', {
@@ -48,120 +203,460 @@ class DownloadTask(QObject):
     
     def _download(self):
         """Download process"""
+        handed_over = False
         try:
-            # Get video info
-            self.progress_updated.emit(0, '情報取得中...')
-            info = self._get_video_info()
-            
-            if not info:
-                self.completed.emit(False, '動画情報の取得に失敗しました')
-                return
+            # A download from an earlier session continues under its old GID
+            result = None
+            self._written = []
+            self._existing = set()
+            if self.gid:
+                self._update(ProgressTable.DOWNLOADING)
+                if self.filename:
+                    self._claim(os.path.join(self.output_dir, self.filename))
+                result = self.aria2_manager.attach(self.gid, self._progress_callback)
             
-            # Download with aria2
-            self.progress_updated.emit(10, 'ダウンロード中...')
+            if result is None:
+                self.gids = []
+                self.fragment_gids = {}
+                result = self._resolve_and_download()
+                if result is None:
+                    return
             
-            # Get direct URL from yt-dlp
-            direct_url = self._get_direct_url()
-            
-            if not direct_url:
-                self.completed.emit(False, 'ダウンロードURLの取得に失敗しました')
+            # Cancelled or paused: the outcome is recorded below
+            if self.cancelled.is_set():
                 return
             
-            # Download with aria2
-            filename = info.get('title', 'video') + '.%(ext)s'
-            result = self.aria2_manager.download(
-                direct_url,
-                self.output_dir,
-                filename,
-                self._progress_callback
-            )
+            if result['success'] and self._plan:
+                if self.postprocessor:
+                    # Bytes are on disk: free the download slot, ffmpeg runs in the pool
+                    self._update(ProgressTable.POSTPROCESSING)
+                    self.postprocessor.submit(
+                        self._run_postprocess, self.priority, on_error=self._postprocess_failed
+                    )
+                    handed_over = True
+                    return
+                result = self._postprocess()
             
-            if result['success']:
-                self.progress_updated.emit(100, '完了')
-                self.completed.emit(True, 'ダウンロード完了')
-                
-                # Emit hook
-                self.api.call_hook('on_complete', {
-                    'url': self.url,
-                    'output_dir': self.output_dir,
-                    'filename': filename
-                })
-            else:
-                error_msg = result.get('error', '不明なエラー')
-                self.completed.emit(False, f'ダウンロード失敗: {error_msg}')
-                
-                # Emit hook
-                self.api.call_hook('on_error', {
-                    'url': self.url,
-                    'error': error_msg
-                })
+            self._complete(result)
         
         except Exception as e:
-            self.completed.emit(False, f'エラー: {str(e)}')
-            self.api.call_hook('on_error', {
-                'url': self.url,
-                'error': str(e)
-            })
+            if not self.cancelled.is_set():
+                self._fail(e)
         
         finally:
             self.is_running = False
+            if handed_over:
+                self._free_slot()
+            elif self.cancelled.is_set() and self.stop_reason == 'pause':
+                # Partial files stay; the next start continues them
+                self._journal(state=QueueStore.PAUSED)
+                self._update(ProgressTable.PAUSED)
+                self._free_slot()
+            else:
+                if self.cancelled.is_set():
+                    self._finish_cancelled()
+                self._done()
     
-    def _get_video_info(self):
-        """Get video information"""
+    def _run_postprocess(self):
+        """Post-processing pool job: ffmpeg, then the final result"""
         try:
-            cmd = [
-                'yt-dlp',
-                '--dump-json',
-                '--no-playlist',
-                self.url
-            ]
+            if not self.cancelled.is_set():
+                result = self._postprocess()
+                if not self.cancelled.is_set():
+                    self._complete(result)
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self._fail(e)
+        finally:
+            if self.cancelled.is_set():
+                self._finish_cancelled()
+            self._done()
+    
+    def _postprocess_failed(self, error):
+        """Pool callback for a job that raised past its own error handling"""
+        if self.success is None:
+            self._finish(False, f'後処理エラー: {error}')
+        if not self.is_finished:
+            self._done()
+    
+    def _free_slot(self):
+        """Give the download slot back while the task is not finished"""
+        if self.on_slot_freed:
+            self.on_slot_freed(self)
+    
+    def _claim(self, path):
+        """Record a file this run writes
+
+        A finished file of that name that predates the task (one without an
+        aria2 control file) is never deleted when the task is cancelled.
+        """
+        if path in self._written:
+            return
+        if os.path.exists(path) and not os.path.exists(path + '.aria2'):
+            self._existing.add(path)
+        self._written.append(path)
+    
+    def _finish_cancelled(self):
+        """Record a cancelled task and delete its partial files"""
+        for path in self._written:
+            if path not in self._existing:
+                for leftover in (path, path + '.aria2'):
+                    try:
+                        os.remove(leftover)
+                    except OSError:
+                        pass
+            # Fragment batches keep their part file and fragments for a resume
+            if self.fragmented:
+                fragments.FragmentJoiner.discard(path)
+        
+        self.success = False
+        self.status = 'キャンセルしました'
+        self._set_progress(speed=0, state=ProgressTable.CANCELLED)
+        self.completed.emit(False, self.status)
+    
+    def _complete(self, result):
+        """Record the result of the download and announce it to plugins"""
+        if result['success']:
+            self._finish(True, 'ダウンロード完了')
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            # Emit hook
+            self.api.call_hook('on_complete', {
+                'url': self.url,
+                'output_dir': self.output_dir,
+                'filename': self.filename,
+                'title': self.title,
+                'filesize': self.filesize
+            })
+        else:
+            # Signed URLs may have expired; re-extract on retry
+            self.resolver.expire(self.url)
             
-            if result.returncode == 0:
-                import json
-                return json.loads(result.stdout)
+            error_msg = result.get('error', '不明なエラー')
+            self._finish(False, f'ダウンロード失敗: {error_msg}')
             
+            # Emit hook
+            self.api.call_hook('on_error', {
+                'url': self.url,
+                'error': error_msg
+            })
+        
+    def _fail(self, error):
+        """Record an unexpected error"""
+        self._finish(False, f'エラー: {str(error)}')
+        self.api.call_hook('on_error', {
+            'url': self.url,
+            'error': str(error)
+        })
+    
+    def _done(self):
+        """Mark the task finished and free its slots"""
+        self.is_finished = True
+        if self.on_finished:
+            self.on_finished(self)
+    
+    def _resolve_and_download(self):
+        """Resolve the URL and hand the stream to aria2; None if resolving failed"""
+        # Resolve title, media URL and headers in one extraction
+        self._update(ProgressTable.RESOLVING, 0)
+        info = self.resolver.resolve(self.url)
+        
+        if not info['success']:
+            self._finish(False, info.get('error', '動画情報の取得に失敗しました'))
             return None
         
-        except Exception as e:
-            self.api.log(f'情報取得エラー: {e}')
+        self.title = info['title']
+        self.filename = info['filename']
+        self.filesize = info['filesize']
+        if info.get('extractor_key') and info.get('id'):
+            self.archive_key = (info['extractor_key'], info['id'])
+        self._media = info
+        
+        # yt-dlp extraction cannot be interrupted; stop before any transfer
+        if self.cancelled.is_set():
+            return {'success': False, 'error': 'ダウンロードが中止されました'}
+        
+        try:
+            self._plan = self._postprocess_plan(info)
+        except RuntimeError as e:
+            self._finish(False, str(e))
             return None
+        
+        self._journal(title=self.title, filename=self.filename)
+        
+        # Streams an earlier session was downloading continue under their old GIDs
+        if self._plan:
+            names = self._part_names(info['streams'])
+        else:
+            names = [self.filename]
+        self._reattach = self._match_restored(names)
+        
+        self._update(ProgressTable.DOWNLOADING)
+        if self._plan:
+            return self._download_streams(info['streams'])
+        
+        # Download with aria2 (--continue resumes a partial file of the same name)
+        return self._fetch(info['streams'][0], self.filename, self._progress_callback, self._on_gid)
     
-    def _get_direct_url(self):
-        """Get direct download URL"""
-        try:
-            cmd = [
-                'yt-dlp',
-                '-g',
-                '--no-playlist',
-                self.url
-            ]
+    def _fetch(self, stream, filename, callback, on_gid):
+        """Download one stream: a single aria2 job, or a batch of HLS/DASH fragments"""
+        self._claim(os.path.join(self.output_dir, filename))
+        
+        # A stop that landed after resolving must not start a transfer it can no longer reach
+        if self.cancelled.is_set():
+            return self._stopped()
+        
+        if not fragments.is_fragmented(stream):
+            gid = self._reattach.pop(filename, None)
+            if gid:
+                on_gid(gid)
+                result = self.aria2_manager.attach(gid, callback)
+                if result is not None:
+                    return result
+                self.gids.remove(gid)
+                if self.cancelled.is_set():
+                    return self._stopped()
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
+            return self.aria2_manager.download(
+                stream['url'],
+                self.output_dir,
+                filename,
+                callback,
+                headers=stream['http_headers'],
+                on_gid=on_gid,
+                speed_limit=self.speed_limit,
+                on_process=self._on_process
             )
-            
-            if result.returncode == 0:
-                return result.stdout.strip().split('\n')[0]
-            
+        
+        self.fragmented = True
+        concurrency = self.config.get('concurrent_fragment_downloads', 8)
+        urls = fragments.fragment_urls(stream)
+        if self.cancelled.is_set():
+            return self._stopped()
+        if urls:
+            return self.aria2_manager.download_fragments(
+                urls,
+                self.output_dir,
+                filename,
+                callback,
+                headers=stream['http_headers'],
+                concurrency=concurrency,
+                retries=self.config.get('fragment_retries', 10),
+                speed_limit=self.speed_limit,
+                size_hint=stream.get('filesize'),
+                cancelled=self.cancelled,
+                on_process=self._on_process,
+                on_gids=lambda gids: self._on_fragment_gids(filename, gids),
+                limit_source=lambda: self.speed_limit
+            )
+        
+        # Encrypted or live playlists: yt-dlp's own fragment downloader, outside aria2's limits
+        return fragments.download_native(
+            stream, os.path.join(self.output_dir, filename), callback,
+            concurrency=concurrency,
+            speed_limit=self.aria2_manager.bandwidth.direct_limit(self.speed_limit),
+            cancelled=self.cancelled
+        )
+    
+    def _postprocess_plan(self, info):
+        """ffmpeg work for the selected settings, or None to save the stream as is"""
+        streams = info['streams']
+        extract_audio = self.config.get('extract_audio', False)
+        embed_metadata = self.config.get('embed_metadata', True)
+        thumbnail = info.get('thumbnail') if self.config.get('embed_thumbnail', True) else None
+        
+        # Joined HLS fragments are MPEG-TS and need a remux into the target container
+        remux = any((s.get('protocol') or '').startswith('m3u8') for s in streams)
+        if len(streams) == 1 and not (extract_audio or embed_metadata or thumbnail or remux):
             return None
         
-        except Exception as e:
-            self.api.log(f'URL取得エラー: {e}')
+        ffmpeg = postprocess.find_ffmpeg(self.config)
+        if not ffmpeg:
+            if len(streams) > 1:
+                raise RuntimeError('映像と音声の結合にはffmpegが必要です')
+            self.api.log(f'ffmpegが見つからないため後処理を省略します: {self.title}', 'WARNING')
             return None
+        
+        base = os.path.splitext(info['filename'])[0]
+        if extract_audio:
+            audio_format = self.config.get('audio_format', 'mp3')
+            source_ext = next((s['ext'] for s in streams if s.get('audio', True)), None)
+            self.filename = f'{base}.{audio_format}'
+            codec = postprocess.audio_codec(audio_format, source_ext)
+        else:
+            codec = 'copy'
+        
+        container = os.path.splitext(self.filename)[1].lstrip('.').lower()
+        return {
+            'ffmpeg': ffmpeg,
+            'audio_only': extract_audio,
+            'codec': codec,
+            'metadata': info.get('metadata') if embed_metadata else None,
+            'thumbnail': thumbnail if container in postprocess.PICTURE_CONTAINERS else None,
+        }
+    
+    def _match_restored(self, names):
+        """Restored GIDs still writing one of these files; the others are removed from aria2"""
+        gids, self._restored_gids = self._restored_gids, []
+        if not gids:
+            return {}
+        
+        found = self.aria2_manager.outputs(gids)
+        matched = {}
+        for name in names:
+            gid = found.get(os.path.normpath(os.path.join(self.output_dir, name)))
+            if gid:
+                matched[name] = gid
+        
+        stale = [gid for gid in gids if gid not in matched.values()]
+        self.aria2_manager.discard(stale)
+        return matched
     
-    def _progress_callback(self, progress):
+    def _part_names(self, streams):
+        """File names of the separately downloaded streams"""
+        base = os.path.splitext(self._media['filename'])[0]
+        return [
+            f"{base}.f{(stream['format_id'] or str(index)).replace(os.sep, '_')}.{stream['ext'] or 'part'}"
+            for index, stream in enumerate(streams)
+        ]
+    
+    def _download_streams(self, streams):
+        """Fetch every stream of the selected formats at the same time"""
+        parts = self._part_names(streams)
+        progress = [(0, 0, stream['filesize'] or 0, 0) for stream in streams]
+        results = [None] * len(streams)
+        
+        def fetch(index, stream):
+            def callback(percent, completed=None, total=None, speed=None):
+                progress[index] = (
+                    percent, completed or 0, total or stream['filesize'] or 0, speed or 0
+                )
+                self._report_streams(progress)
+            
+            results[index] = self._fetch(stream, parts[index], callback, self._on_stream_gid)
+            
+            # One failed stream makes the others useless
+            if not results[index]['success']:
+                for gid in list(self.gids):
+                    self.aria2_manager.remove(gid)
+        
+        threads = [
+            threading.Thread(target=fetch, args=(index, stream), daemon=True)
+            for index, stream in enumerate(streams)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        failed = next((result for result in results if not result['success']), None)
+        if failed:
+            return failed
+        
+        self._parts = [
+            {
+                'path': os.path.join(self.output_dir, part),
+                'video': stream.get('video', True),
+                'audio': stream.get('audio', True),
+            }
+            for part, stream in zip(parts, streams)
+        ]
+        return {'success': True, 'gids': list(self.gids)}
+    
+    def _report_streams(self, progress):
+        """Combined progress of parallel stream downloads"""
+        done = sum(p[1] for p in progress)
+        total = sum(p[2] for p in progress)
+        if total and all(p[2] for p in progress):
+            percent = int(done * 100 / total)
+        else:
+            percent = int(sum(p[0] for p in progress) / len(progress))
+        self._progress_callback(percent, done, total, sum(p[3] for p in progress))
+    
+    def _postprocess(self):
+        """Merge, convert and tag the downloaded streams with one ffmpeg pass"""
+        plan = self._plan
+        self._update(ProgressTable.POSTPROCESSING)
+        
+        output = os.path.join(self.output_dir, self.filename)
+        self._claim(output)
+        thumbnail = None
+        if plan['thumbnail']:
+            ext = os.path.splitext(urlparse(plan['thumbnail']).path)[1] or '.jpg'
+            path = os.path.splitext(output)[0] + '.thumb' + ext
+            if postprocess.fetch_thumbnail(plan['thumbnail'], path):
+                thumbnail = path
+        
+        cmd = postprocess.build_command(
+            plan['ffmpeg'], self._parts, output,
+            audio_only=plan['audio_only'], codec=plan['codec'],
+            metadata=plan['metadata'], thumbnail=thumbnail
+        )
+        result = postprocess.run_ffmpeg(cmd, on_process=self._on_process)
+        
+        leftovers = [thumbnail] if thumbnail else []
+        if result['success']:
+            leftovers.extend(part['path'] for part in self._parts)
+        for path in leftovers:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        
+        if not result['success']:
+            return {'success': False, 'error': f"後処理失敗: {result['error']}"}
+        return result
+    
+    def _stopped(self):
+        """Result of a transfer skipped because the task is being cancelled or paused"""
+        return {'success': False, 'error': 'ダウンロードが中止されました'}
+    
+    def _on_gid(self, gid):
+        """Remember the aria2 GID so a restart can reattach to it"""
+        self.gids.append(gid)
+        self._journal(gid=gid, gids=self._owned_gids())
+        self._stop_if_cancelled([gid])
+    
+    def _on_stream_gid(self, gid):
+        """Record the GID of one of several streams (removed, not reattached, on restart)"""
+        self.gids.append(gid)
+        self._journal(gids=self._owned_gids())
+        self._stop_if_cancelled([gid])
+    
+    def _on_fragment_gids(self, filename, gids):
+        """Record the fragment downloads of a part file that are in flight"""
+        self.fragment_gids[filename] = gids
+        self._journal(gids=self._owned_gids())
+        self._stop_if_cancelled(gids)
+    
+    def _on_process(self, process):
+        """Track an aria2c/ffmpeg process; kill it if the task was stopped while it started"""
+        self.processes.append(process)
+        if self.cancelled.is_set():
+            try:
+                if process.poll() is None:
+                    process.kill()
+            except OSError:
+                pass
+    
+    def _stop_if_cancelled(self, gids):
+        """Remove downloads added after _interrupt already ran"""
+        if self.cancelled.is_set():
+            for gid in gids:
+                self.aria2_manager.remove(gid)
+    
+    def _owned_gids(self):
+        """Every aria2 GID of the task, for the journal"""
+        owned = list(self.gids)
+        for gids in list(self.fragment_gids.values()):
+            owned.extend(gids)
+        return ','.join(owned)
+    
+    def _progress_callback(self, progress, completed=None, total=None, speed=None):
         """Progress callback"""
-        self.progress_updated.emit(progress, 'ダウンロード中...')
+        self._set_progress(
+            percent=progress, done=completed, total=total, speed=speed,
+            state=ProgressTable.PAUSED if self.paused else ProgressTable.DOWNLOADING
+        )
         
         # Emit hook (throttled)
         self.api.call_hook('on_progress', {
@@ -170,124 +665,325 @@ class DownloadTask(QObject):
         })
 
 
-class DownloadWidget(QWidget):
-    """Widget for single download task"""
+class DownloadManager(QObject):
+    """Manages download tasks"""
     
-    remove_requested = pyqtSignal()
+    task_added = pyqtSignal(object)  # DownloadTask
+    tasks_removed = pyqtSignal(list)  # [DownloadTask]
     
-    def __init__(self, task):
+    def __init__(self, config, api):
         super().__init__()
-        self.task = task
-        self.init_ui()
+        self.config = config
+        self.api = api
+        self.aria2_manager = Aria2Manager(config)
+        self.resolver = MediaResolver(config, ExtractionCache.from_config(config))
+        self.scheduler = DownloadScheduler(
+            config.get('max_concurrent_downloads', 3),
+            groups=self._task_groups,
+            group_limit=self._group_limit
+        )
+        self.progress_table = ProgressTable()
+        self.archive = DownloadArchive.from_config(config)
+        self.store = QueueStore.from_config(config)
+        self.postprocessor = postprocess.PostProcessPool.from_config(config, log=api.log)
+        self.tasks = []
+        self.playlists = []
+        self._lock = threading.Lock()
+    
+    def add_download(self, url, output_dir, priority=0, title=None, archive_key=None):
+        """Add download task; returns None if the video is already archived"""
+        # Skip archived videos before any network access
+        archive_key = archive_key or canonical_id(url)
+        
+        # A re-queued video shows its cached title and name without re-extracting
+        filename = None
+        cached = self.resolver.peek(url)
+        if cached:
+            title = title or cached.get('title')
+            filename = cached.get('filename')
+            if not archive_key and cached.get('extractor_key') and cached.get('id'):
+                archive_key = (cached['extractor_key'], cached['id'])
         
-        # Connect signals
-        self.task.progress_updated.connect(self.update_progress)
-        self.task.completed.connect(self.on_completed)
+        if self.archive and archive_key and self.archive.contains(*archive_key):
+            self.api.log(f'ダウンロード済みのためスキップ: {title or url}', 'DEBUG')
+            return None
+        
+        task = self._create_task(
+            url, output_dir, title=title, archive_key=archive_key, filename=filename,
+            priority=priority
+        )
+        if self.store:
+            self.store.add(task.id, url, output_dir, priority, title, archive_key)
+        
+        # Queue download; it starts when a slot is free
+        self.scheduler.submit(task, priority)
+        return task
+    
+    def _create_task(self, url, output_dir, **kwargs):
+        """Create a task and show it in the list"""
+        task = DownloadTask(
+            url, output_dir, self.config, self.aria2_manager, self.resolver, self.api,
+            self.progress_table, on_finished=self._on_task_finished, store=self.store,
+            postprocessor=self.postprocessor, on_slot_freed=self._on_slot_freed,
+            **kwargs
+        )
+        
+        # Store task (playlist feeders add from their own threads)
+        with self._lock:
+            self.tasks.append(task)
+        self.task_added.emit(task)
+        return task
     
-    def init_ui(self):
-        """Initialize UI"""
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(5, 5, 5, 5)
+    def restore(self):
+        """Rebuild the queue left by an earlier session; returns the number of tasks"""
+        if not self.store:
+            return 0
         
-        # Title and remove button
-        title_layout = QHBoxLayout()
+        self.store.prune()
+        rows = self.store.unfinished()
+        
+        # In-flight downloads first, so they reattach before new ones start
+        rows.sort(key=lambda row: row['state'] != QueueStore.RUNNING)
+        
+        for row in rows:
+            archive_key = None
+            if row['archive_extractor'] and row['archive_id']:
+                archive_key = (row['archive_extractor'], row['archive_id'])
+            
+            task = self._create_task(
+                row['url'], row['output_dir'], title=row['title'], archive_key=archive_key,
+                task_id=row['id'], gid=row['gid'],
+                gids=[gid for gid in (row['gids'] or '').split(',') if gid],
+                filename=row['filename'], priority=row['priority'],
+                paused=row['state'] == QueueStore.PAUSED
+            )
+            if task.paused:
+                task.set_paused(True)
+            else:
+                self.scheduler.submit(task, row['priority'])
         
-        self.title_label = QLabel(self.task.url[:80] + '...' if len(self.task.url) > 80 else self.task.url)
-        title_layout.addWidget(self.title_label)
+        return len(rows)
+    
+    def add_playlist(self, url, output_dir, priority=0):
+        """Stream a playlist or channel into the queue"""
+        feeder = PlaylistFeeder(
+            url,
+            lambda entry_url, title, archive_key: self.add_download(
+                entry_url, output_dir, priority, title, archive_key
+            ),
+            self.scheduler.is_queued,
+            lookahead=self.config.get('playlist_lookahead', 20),
+            log=self.api.log
+        )
         
-        title_layout.addStretch()
+        with self._lock:
+            self.playlists = [p for p in self.playlists if not p.is_finished]
+            self.playlists.append(feeder)
         
-        self.remove_btn = QPushButton('削除')
-        self.remove_btn.setMaximumWidth(60)
-        self.remove_btn.clicked.connect(self.remove_requested.emit)
-        title_layout.addWidget(self.remove_btn)
+        feeder.start()
+        return feeder
+    
+    def stop_playlists(self):
+        """Stop every playlist that is still being enumerated"""
+        with self._lock:
+            playlists, self.playlists = self.playlists, []
         
-        layout.addLayout(title_layout)
+        for feeder in playlists:
+            feeder.stop()
+    
+    def _on_slot_freed(self, task):
+        """Free the download slot of a paused task or one waiting for post-processing"""
+        self.scheduler.release(task)
+    
+    def _on_task_finished(self, task):
+        """Free the scheduler slot (and the progress slot of removed tasks)"""
+        if task.success and task.archive_key and self.archive:
+            self.archive.add(*task.archive_key)
         
-        # Progress bar
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setMaximum(100)
-        self.progress_bar.setValue(0)
-        layout.addWidget(self.progress_bar)
+        self.scheduler.release(task)
         
-        # Status label
-        self.status_label = QLabel('準備中...')
-        layout.addWidget(self.status_label)
+        if task.removed:
+            self._release_slot(task)
+    
+    def _release_slot(self, task):
+        """Return a task's progress slot exactly once"""
+        with self._lock:
+            if task.slot is None:
+                return
+            slot, task.slot = task.slot, None
         
-        # Styling
-        self.setStyleSheet("""
-            DownloadWidget {
-                background-color: #f0f0f0;
-                border-radius: 5px;
-                margin-bottom: 5px;
-            }
-        """)
-    
-    def update_progress(self, progress, status):
-        """Update progress"""
-        self.progress_bar.setValue(progress)
-        self.status_label.setText(status)
-    
-    def on_completed(self, success, message):
-        """Handle completion"""
-        self.status_label.setText(message)
-        
-        if success:
-            self.progress_bar.setStyleSheet("""
-                QProgressBar::chunk {
-                    background-color: #4CAF50;
-                }
-            """)
-
-
-class DownloadManager:
-    """Manages download tasks"""
+        self.progress_table.release(slot)
     
-    def __init__(self, config, api):
-        self.config = config
-        self.api = api
-        self.aria2_manager = Aria2Manager(config)
-        self.tasks = []
+    def shutdown(self):
+        """Release background resources"""
+        self.stop_playlists()
+        self.postprocessor.shutdown()
+        self.aria2_manager.shutdown()
+    
+    def set_max_concurrent(self, max_slots):
+        """Apply a new concurrent download limit"""
+        self.scheduler.set_max_slots(max_slots)
+    
+    def _task_groups(self, task):
+        """Concurrency groups of a task: its site host and its extractor"""
+        groups = []
+        host = HostTuner.host_of(task.url)
+        if host:
+            groups.append(('host', host[4:] if host.startswith('www.') else host))
+        if task.archive_key:
+            groups.append(('extractor', task.archive_key[0].lower()))
+        return groups
+    
+    def _group_limit(self, group):
+        """Running-task limit of a group (0 means no limit)"""
+        kind, name = group
+        if kind == 'host':
+            overrides = self.config.get('host_concurrency_limits', {}) or {}
+            if name in overrides:
+                return int(overrides[name])
+            return int(self.config.get('max_downloads_per_host', 2))
+        return int(self.config.get('max_downloads_per_extractor', 0))
+    
+    def refresh_group_limits(self):
+        """Re-check tasks held back by per-host/extractor limits"""
+        self.scheduler.refresh_limits()
     
-    def add_download(self, url, output_dir, downloads_layout):
-        """Add download task"""
-        # Create task
-        task = DownloadTask(url, output_dir, self.config, self.aria2_manager, self.api)
+    def set_priority(self, tasks, priority):
+        """Change the priority of tasks; queued ones are reordered at once"""
+        for task in tasks:
+            task.priority = priority
+            self.scheduler.set_priority(task, priority)
+            if self.store:
+                self.store.update(task.id, priority=priority)
+        return len(tasks)
+    
+    def move_to_top(self, tasks):
+        """Move queued tasks to the front, keeping their relative order"""
+        for task in reversed(tasks):
+            self._store_priority(task, self.scheduler.move_to_top(task))
+    
+    def move_to_bottom(self, tasks):
+        """Move queued tasks to the back, keeping their relative order"""
+        for task in tasks:
+            self._store_priority(task, self.scheduler.move_to_bottom(task))
+    
+    def _store_priority(self, task, priority):
+        """Keep a moved task's priority for resume and restore"""
+        if priority is None:
+            return
+        task.priority = priority
+        if self.store:
+            self.store.update(task.id, priority=priority)
+    
+    def find_tasks(self, ids):
+        """Tasks with the given ids, in the same order (unknown ids are skipped)"""
+        with self._lock:
+            by_id = {task.id: task for task in self.tasks}
+        return [by_id[task_id] for task_id in ids if task_id in by_id]
+    
+    def pause_downloads(self, tasks):
+        """Hold queued tasks and pause running ones; returns the count
         
-        # Create widget
-        widget = DownloadWidget(task)
-        widget.remove_requested.connect(lambda: self.remove_download(task, widget, downloads_layout))
+        RPC downloads are paused inside aria2 and keep their slot. Anything
+        else (resolving, aria2c processes, fragment batches) is stopped with
+        its partial files kept and its slot freed; resuming queues it again
+        and aria2 continues the files.
+        """
+        count = 0
+        for task in tasks:
+            if task.paused or task.is_finished or task.stop_reason:
+                continue
+            
+            if self.scheduler.remove(task):
+                task.set_paused(True)
+                count += 1
+            elif not task.is_running:
+                continue  # post-processing cannot be paused
+            elif task.can_pause_in_aria2 and all(
+                    [self.aria2_manager.pause(gid) for gid in task.gids]):
+                task.set_paused(True)
+                count += 1
+            else:
+                task.suspend()
+                count += 1
         
-        # Add to layout
-        downloads_layout.addWidget(widget)
+        return count
+    
+    def resume_downloads(self, tasks):
+        """Resume paused tasks; returns the count"""
+        count = 0
+        for task in tasks:
+            if not task.paused or task.removed:
+                continue
+            
+            if task.is_running and task.stop_reason == 'pause':
+                continue  # still stopping; it can be resumed once it has
+            
+            if not task.is_running:
+                task.set_paused(False)
+                self.scheduler.submit(task, task.priority)
+                count += 1
+            elif task.gids and all([self.aria2_manager.unpause(gid) for gid in task.gids]):
+                task.set_paused(False)
+                count += 1
         
-        # Store task
-        self.tasks.append({'task': task, 'widget': widget})
+        return count
+    
+    def set_speed_limit(self, tasks, limit):
+        """Set a per-task limit ('2M', '500K', 0 for none); live downloads change immediately"""
+        limit = parse_rate(limit)
+        for task in tasks:
+            task.speed_limit = limit
+            if task.is_running:
+                for gid in task.gids:
+                    self.aria2_manager.set_speed_limit(gid, limit)
+                # Fragments in flight share the limit like the window that added them
+                concurrency = self.config.get('concurrent_fragment_downloads', 8)
+                for gids in list(task.fragment_gids.values()):
+                    self.aria2_manager.set_fragment_limit(gids, limit, concurrency)
+        return len(tasks)
+    
+    def cancel_downloads(self, tasks):
+        """Stop tasks at once and remove them
+        
+        aria2 downloads are force-removed, aria2c and ffmpeg processes are
+        killed and queued post-processing is skipped. The download slot is
+        freed right away so the next queued task starts without waiting for
+        the cancelled one to wind down.
+        """
+        for task in tasks:
+            if not task.is_finished:
+                task.cancel()
+                self.scheduler.release(task)
         
-        # Start download
-        task.start()
+        self.remove_downloads(tasks)
     
-    def remove_download(self, task, widget, downloads_layout):
-        """Remove download task"""
-        # Remove widget
-        downloads_layout.removeWidget(widget)
-        widget.deleteLater()
+    def remove_downloads(self, tasks):
+        """Remove download tasks"""
+        removed = set(tasks)
         
-        # Remove from tasks
-        self.tasks = [t for t in self.tasks if t['task'] != task]
+        for task in removed:
+            task.removed = True
+            
+            # Drop from queue if not started yet
+            self.scheduler.remove(task)
+            
+            # Running tasks give their progress slot back when they finish
+            if not task.is_running:
+                self._release_slot(task)
+        
+        with self._lock:
+            self.tasks = [t for t in self.tasks if t not in removed]
+        
+        if self.store:
+            self.store.remove([task.id for task in removed])
+        self.tasks_removed.emit(list(removed))
     
     def clear_completed(self):
         """Clear completed tasks"""
-        self.tasks = [t for t in self.tasks if t['task'].is_running]
-        
-        # Remove widgets
-        for t in self.tasks:
-            if not t['task'].is_running:
-                t['widget'].deleteLater()
+        self.remove_downloads([t for t in self.tasks if t.is_finished])
     
     def clear_all(self):
         """Clear all tasks"""
-        for t in self.tasks:
-            t['widget'].deleteLater()
-        
-        self.tasks.clear()
+        self.stop_playlists()
+        self.cancel_downloads(list(self.tasks))
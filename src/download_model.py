@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Download List Model - virtualized table of download tasks
+"""
+
+from PyQt5.QtWidgets import (
+    QApplication, QStyle, QStyledItemDelegate, QStyleOptionProgressBar
+)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer, pyqtSlot
+from PyQt5.QtGui import QColor, QPalette
+
+from .progress_table import ProgressTable
+
+
+def format_size(num_bytes):
+    """Human readable byte count"""
+    size = float(num_bytes)
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024:
+            return f'{size:.1f}{unit}'
+        size /= 1024
+    return f'{size:.1f}TiB'
+
+
+class DownloadListModel(QAbstractTableModel):
+    """Table model over DownloadManager tasks
+
+    Rows are painted on demand by the view, so only visible rows cost
+    anything. Progress is read from the manager's ProgressTable by one
+    timer at progress_refresh_hz; only the rows written since the last
+    tick are announced, as one dataChanged.
+    """
+
+    COLUMN_TITLE = 0
+    COLUMN_PROGRESS = 1
+    COLUMN_STATUS = 2
+    HEADERS = ['タイトル', '進捗', '状態']
+
+    STATE_TEXT = {
+        ProgressTable.QUEUED: '待機中...',
+        ProgressTable.RESOLVING: '情報取得中...',
+        ProgressTable.DOWNLOADING: 'ダウンロード中...',
+        ProgressTable.POSTPROCESSING: '後処理中...',
+        ProgressTable.PAUSED: '一時停止',
+        ProgressTable.CANCELLED: 'キャンセル',
+    }
+
+    # Role returning sortable values (progress as int, etc.)
+    SortRole = Qt.UserRole
+    # Role returning the DownloadTask itself
+    TaskRole = Qt.UserRole + 1
+
+    def __init__(self, download_manager, refresh_hz=8, parent=None):
+        super().__init__(parent)
+        self.manager = download_manager
+        self.table = download_manager.progress_table
+        self._tasks = []
+        self._rows = {}  # task -> row
+        self._slot_tasks = {}  # progress slot -> task
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.timeout.connect(self._flush)
+        self.set_refresh_rate(refresh_hz)
+
+        download_manager.task_added.connect(self._on_task_added)
+        download_manager.tasks_removed.connect(self._on_tasks_removed)
+
+        for task in download_manager.tasks:
+            self._on_task_added(task)
+
+    def set_refresh_rate(self, refresh_hz):
+        """Change how often progress is read from the table"""
+        self._flush_timer.start(int(1000 / max(1, refresh_hz)))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        task = self._tasks[index.row()]
+        column = index.column()
+
+        if role == self.TaskRole:
+            return task
+
+        if role == Qt.DisplayRole:
+            if column == self.COLUMN_TITLE:
+                return task.title or task.url
+            if column == self.COLUMN_PROGRESS:
+                return task.progress
+            if column == self.COLUMN_STATUS:
+                return self._status_text(task)
+
+        elif role == self.SortRole:
+            if column == self.COLUMN_TITLE:
+                return (task.title or task.url).lower()
+            if column == self.COLUMN_PROGRESS:
+                return task.progress
+            if column == self.COLUMN_STATUS:
+                return self._status_text(task)
+
+        elif role == Qt.ToolTipRole and column == self.COLUMN_TITLE:
+            return task.url
+
+        return None
+
+    def _status_text(self, task):
+        """Status column text from the progress table"""
+        if task.slot is None:
+            return task.status
+
+        _, done, total, speed, state = self.table.row(task.slot)
+
+        if state in (ProgressTable.COMPLETED, ProgressTable.ERROR):
+            return task.status
+
+        text = self.STATE_TEXT.get(state, '')
+        if state == ProgressTable.DOWNLOADING and total:
+            text = f'{text} {format_size(done)}/{format_size(total)}'
+            if speed:
+                text += f' ({format_size(speed)}/s)'
+        return text
+
+    def task_at(self, row):
+        """Task shown in a source row"""
+        return self._tasks[row]
+
+    @pyqtSlot(object)
+    def _on_task_added(self, task):
+        """Append a row for a new task"""
+        row = len(self._tasks)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._tasks.append(task)
+        self._rows[task] = row
+        self._slot_tasks[task.slot] = task
+        self.endInsertRows()
+
+    @pyqtSlot(list)
+    def _on_tasks_removed(self, tasks):
+        """Drop rows for removed tasks, keeping the selection and scroll position"""
+        rows = sorted(self._rows[task] for task in tasks if task in self._rows)
+        if not rows:
+            return
+
+        # One removal per contiguous run, bottom up so earlier rows keep their index
+        runs = []
+        start = previous = rows[0]
+        for row in rows[1:]:
+            if row != previous + 1:
+                runs.append((start, previous))
+                start = row
+            previous = row
+        runs.append((start, previous))
+
+        for first, last in reversed(runs):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._tasks[first:last + 1]
+            self.endRemoveRows()
+
+        # Slots may already be released (and reused), so match by task
+        removed = set(tasks)
+        self._rows = {task: row for row, task in enumerate(self._tasks)}
+        self._slot_tasks = {
+            slot: task for slot, task in self._slot_tasks.items() if task not in removed
+        }
+
+    def _flush(self):
+        """Emit one dataChanged covering the rows written since the last tick"""
+        rows = []
+        for slot in self.table.changed():
+            task = self._slot_tasks.get(slot)
+            if task is not None and task in self._rows:
+                rows.append(self._rows[task])
+
+        if not rows:
+            return
+
+        # One dataChanged per contiguous run of changed rows
+        rows.sort()
+        start = previous = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == previous + 1:
+                previous = row
+                continue
+            self.dataChanged.emit(
+                self.index(start, 0),
+                self.index(previous, self.columnCount() - 1),
+                [Qt.DisplayRole, self.SortRole]
+            )
+            if row is not None:
+                start = previous = row
+
+
+class ProgressDelegate(QStyledItemDelegate):
+    """Paints a progress bar for the progress column"""
+
+    COMPLETE_COLOR = QColor('#4CAF50')
+
+    def paint(self, painter, option, index):
+        progress = index.data(Qt.DisplayRole) or 0
+        task = index.data(DownloadListModel.TaskRole)
+
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = progress
+        bar.text = f'{progress}%'
+        bar.textVisible = True
+        bar.state = option.state
+
+        if task is not None and task.success:
+            bar.palette.setColor(QPalette.Highlight, self.COMPLETE_COLOR)
+
+        QApplication.style().drawControl(QStyle.CE_ProgressBar, bar, painter)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extraction Cache - persistent store of resolved info dicts
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+
+class ExtractionCache:
+    """SQLite-backed cache of resolver results with per-field TTL and LRU eviction
+
+    Entries are keyed by (extractor:video_id, format). Metadata such as the
+    title lives much longer than the signed stream URLs, so each part has
+    its own expiry.
+    """
+
+    def __init__(self, path: str, metadata_ttl: float = 7 * 24 * 3600,
+                 media_ttl: float = 1800, max_entries: int = 5000):
+        self.path = path
+        self.metadata_ttl = metadata_ttl
+        self.media_ttl = media_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.metadata_hits = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                video_key TEXT NOT NULL,
+                format TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                streams TEXT NOT NULL,
+                metadata_expires REAL NOT NULL,
+                streams_expires REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (video_key, format)
+            )
+        ''')
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)'
+        )
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['ExtractionCache']:
+        """Create the cache from configuration, or None if disabled"""
+        if not config.get('extraction_cache_enabled', True):
+            return None
+
+        return cls(
+            config.get('extraction_cache_path', 'cache/extraction.sqlite3'),
+            metadata_ttl=config.get('extraction_cache_metadata_ttl', 7 * 24 * 3600),
+            media_ttl=config.get('extraction_cache_media_ttl', 1800),
+            max_entries=config.get('extraction_cache_max_entries', 5000)
+        )
+
+    @staticmethod
+    def _video_key(key: Tuple[str, str]) -> str:
+        """Flatten (extractor, video_id) to a single column value"""
+        return f'{key[0]}:{key[1]}'
+
+    def get(self, key: Tuple[str, str], fmt: str) -> Optional[Dict]:
+        """Return the full cached result if both metadata and streams are fresh"""
+        now = time.time()
+        video_key = self._video_key(key)
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT metadata, streams FROM entries '
+                'WHERE video_key = ? AND format = ? '
+                'AND metadata_expires > ? AND streams_expires > ?',
+                (video_key, fmt, now, now)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._touch(video_key, fmt, now)
+
+        result = json.loads(row[0])
+        result['streams'] = json.loads(row[1])
+        return result
+
+    def get_metadata(self, key: Tuple[str, str]) -> Optional[Dict]:
+        """Return cached metadata (title etc.) for any format, ignoring stream expiry"""
+        now = time.time()
+        video_key = self._video_key(key)
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT format, metadata FROM entries '
+                'WHERE video_key = ? AND metadata_expires > ? '
+                'ORDER BY last_access DESC LIMIT 1',
+                (video_key, now)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self.metadata_hits += 1
+            self._touch(video_key, row[0], now)
+
+        return json.loads(row[1])
+
+    def put(self, key: Tuple[str, str], fmt: str, result: Dict):
+        """Store a resolver result"""
+        now = time.time()
+        metadata = {k: v for k, v in result.items() if k != 'streams'}
+        streams = result.get('streams') or []
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries '
+                '(video_key, format, metadata, streams, metadata_expires, streams_expires, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (
+                    self._video_key(key), fmt,
+                    json.dumps(metadata, ensure_ascii=False),
+                    json.dumps(streams, ensure_ascii=False),
+                    now + self.metadata_ttl,
+                    self._streams_expiry(streams, now),
+                    now
+                )
+            )
+            self._evict()
+            self._conn.commit()
+
+    def expire_streams(self, key: Tuple[str, str]):
+        """Mark cached stream URLs stale but keep the metadata"""
+        with self._lock:
+            self._conn.execute(
+                'UPDATE entries SET streams_expires = 0 WHERE video_key = ?',
+                (self._video_key(key),)
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            size = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'metadata_hits': self.metadata_hits,
+            'entries': size,
+            'max_entries': self.max_entries
+        }
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
+
+    def _touch(self, video_key: str, fmt: str, now: float):
+        """Update LRU position"""
+        self._conn.execute(
+            'UPDATE entries SET last_access = ? WHERE video_key = ? AND format = ?',
+            (now, video_key, fmt)
+        )
+        self._conn.commit()
+
+    def _evict(self):
+        """Drop least recently used entries above the size cap"""
+        self._conn.execute(
+            'DELETE FROM entries WHERE rowid IN ('
+            'SELECT rowid FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def _streams_expiry(self, streams, now: float) -> float:
+        """Expire signed URLs at the TTL or at their own 'expire' parameter"""
+        expiry = now + self.media_ttl
+
+        for stream in streams:
+            values = parse_qs(urlparse(stream.get('url') or '').query).get('expire')
+            if values and values[0].isdigit():
+                # Keep a margin so a download never starts on an almost-dead URL
+                expiry = min(expiry, int(values[0]) - 300)
+
+        return expiry
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fragments - HLS/DASH fragment lists and in-order joining
+"""
+
+import os
+import re
+import shutil
+import threading
+import urllib.request
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urljoin
+
+
+FRAGMENTED_PROTOCOLS = {'m3u8', 'm3u8_native', 'http_dash_segments'}
+
+HLS_URI = re.compile(r'URI="([^"]+)"')
+
+
+def is_fragmented(stream: Dict) -> bool:
+    """Whether a stream is delivered as HLS or DASH fragments"""
+    return stream.get('protocol') in FRAGMENTED_PROTOCOLS
+
+
+def parse_hls_playlist(text: str, base_url: str) -> Optional[List[str]]:
+    """Segment URLs of an HLS media playlist (init segment first)
+
+    Returns None for playlists that plain segment downloads cannot
+    reproduce: master or live playlists, encryption and byte ranges.
+    """
+    if '#EXT-X-ENDLIST' not in text or '#EXT-X-STREAM-INF' in text:
+        return None
+
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('#EXT-X-KEY') and 'METHOD=NONE' not in line:
+            return None
+        if line.startswith('#EXT-X-BYTERANGE') or (line.startswith('#EXT-X-MAP') and 'BYTERANGE' in line):
+            return None
+
+        if line.startswith('#EXT-X-MAP'):
+            match = HLS_URI.search(line)
+            if match:
+                urls.append(urljoin(base_url, match.group(1)))
+        elif not line.startswith('#'):
+            urls.append(urljoin(base_url, line))
+
+    return urls or None
+
+
+def fragment_urls(stream: Dict, timeout: float = 15) -> Optional[List[str]]:
+    """Expand a fragmented stream to its fragment URLs, or None if not possible"""
+    if stream.get('fragments'):
+        return list(stream['fragments'])
+
+    if not stream.get('protocol', '').startswith('m3u8'):
+        return None
+
+    try:
+        request = urllib.request.Request(stream['url'], headers=stream.get('http_headers') or {})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            text = response.read().decode('utf-8', 'replace')
+            base_url = response.geturl()
+    except Exception:
+        return None
+
+    return parse_hls_playlist(text, base_url)
+
+
+def download_native(stream: Dict, path: str, progress_callback: Optional[Callable] = None,
+                    concurrency: int = 8, speed_limit: Optional[int] = None,
+                    cancelled: Optional[threading.Event] = None) -> Dict:
+    """Download a stream with yt-dlp's own fragment downloader (encrypted or live HLS etc.)
+
+    Setting ``cancelled`` aborts the download at its next progress update.
+    """
+    import yt_dlp
+    from yt_dlp.downloader import get_suitable_downloader
+    from yt_dlp.utils import DownloadCancelled
+
+    info = {
+        'url': stream['url'],
+        'protocol': stream['protocol'],
+        'ext': stream.get('ext') or 'mp4',
+        'format_id': stream.get('format_id'),
+        'http_headers': stream.get('http_headers') or {},
+    }
+    if stream.get('fragments'):
+        info['fragments'] = [{'url': url} for url in stream['fragments']]
+
+    def hook(d):
+        if cancelled and cancelled.is_set():
+            raise DownloadCancelled()
+        if progress_callback and d.get('status') == 'downloading':
+            total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+            done = d.get('downloaded_bytes') or 0
+            percent = int(done * 100 / total) if total else 0
+            progress_callback(percent, done, int(total), int(d.get('speed') or 0))
+
+    params = {
+        'quiet': True,
+        'no_warnings': True,
+        'noprogress': True,
+        'continuedl': True,
+        'concurrent_fragment_downloads': concurrency,
+    }
+    if speed_limit:
+        params['ratelimit'] = speed_limit
+
+    try:
+        with yt_dlp.YoutubeDL(params) as ydl:
+            downloader = get_suitable_downloader(info, ydl.params)(ydl, ydl.params)
+            downloader.add_progress_hook(hook)
+            ok, _ = downloader.download(path, info)
+            if not ok:
+                return {'success': False, 'error': 'フラグメントのダウンロードに失敗しました'}
+    except DownloadCancelled:
+        return {'success': False, 'error': 'ダウンロードが中止されました'}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+    if progress_callback:
+        progress_callback(100)
+    return {'success': True}
+
+
+class FragmentJoiner:
+    """Appends finished fragments to the output file in order
+
+    Fragments land in ``<output>.frags/``. Whenever the next fragment in
+    sequence is complete it is appended to ``<output>.part`` and deleted,
+    so joining overlaps with the download and disk use stays near the
+    size of the file. ``finish()`` renames the part file into place.
+
+    The number of joined fragments is kept in the work directory, so a
+    joiner for the same output picks up where a paused one stopped.
+    """
+
+    STATE_FILE = 'joined'
+
+    def __init__(self, output: str, count: int):
+        self.output = output
+        self.count = count
+        self.workdir = output + '.frags'
+        self.done_bytes = 0
+        self._finished = set()
+        self._next = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.workdir, exist_ok=True)
+        self._out = self._open_part()
+        self.resumed = self._next  # fragments already joined by an earlier run
+
+    def _open_part(self):
+        """Open the part file, continuing a run of the same fragment list if there is one"""
+        part = self.output + '.part'
+        try:
+            with open(os.path.join(self.workdir, self.STATE_FILE), encoding='utf-8') as f:
+                count, joined, size = (int(value) for value in f.read().split())
+            if count == self.count and os.path.getsize(part) >= size:
+                out = open(part, 'r+b')
+                # Drop a fragment that was half appended when the run stopped
+                out.truncate(size)
+                out.seek(size)
+                self._next = joined
+                self.done_bytes = size
+                return out
+        except (OSError, ValueError):
+            pass
+        return open(part, 'wb')
+
+    def _save_state(self):
+        """Record how far the part file is joined (caller holds the lock)"""
+        path = os.path.join(self.workdir, self.STATE_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(f'{self.count} {self._next} {self.done_bytes}')
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def name(index: int) -> str:
+        """File name of a fragment"""
+        return f'{index:06d}.frag'
+
+    @staticmethod
+    def index_of(path: str) -> Optional[int]:
+        """Fragment index from a fragment file path"""
+        stem = os.path.basename(path).split('.', 1)[0]
+        return int(stem) if stem.isdigit() else None
+
+    @property
+    def completed_count(self) -> int:
+        """Fragments downloaded so far (joined or waiting for their turn)"""
+        with self._lock:
+            return self._next + len(self._finished)
+
+    def completed(self, index: int):
+        """Record a downloaded fragment and join every fragment now in sequence"""
+        with self._lock:
+            self._finished.add(index)
+            joined = False
+            while self._next in self._finished:
+                self._finished.discard(self._next)
+                path = os.path.join(self.workdir, self.name(self._next))
+                with open(path, 'rb') as f:
+                    shutil.copyfileobj(f, self._out, 1024 * 1024)
+                self.done_bytes = self._out.tell()
+                os.remove(path)
+                self._next += 1
+                joined = True
+
+            if joined:
+                self._out.flush()
+                self._save_state()
+
+    def finish(self) -> bool:
+        """Move the joined file into place once every fragment is in"""
+        with self._lock:
+            if self._next != self.count:
+                return False
+            self._out.close()
+
+        os.replace(self.output + '.part', self.output)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        return True
+
+    def close(self):
+        """Stop joining but keep the part file and fragments for a later run"""
+        with self._lock:
+            self._out.close()
+
+    def abort(self):
+        """Delete the partial output and any fragments"""
+        self.close()
+        self.discard(self.output)
+
+    @classmethod
+    def discard(cls, output: str):
+        """Delete the part file and work directory left for an output"""
+        try:
+            os.remove(output + '.part')
+        except OSError:
+            pass
+        shutil.rmtree(output + '.frags', ignore_errors=True)
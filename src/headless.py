@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Headless Mode - runs the download engine without widgets (QtCore only)
+"""
+
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+
+from PyQt5.QtCore import QCoreApplication, QObject, QTimer, pyqtSignal, pyqtSlot
+
+from .config import ConfigManager
+from .api import AppAPI
+from .plugin_manager import PluginManager
+from .download_manager import DownloadManager
+from .progress_table import ProgressTable
+from .control_server import ControlServer
+
+
+class HeadlessApp(QObject):
+    """Queue, scheduler, aria2 and plugins driven from the command line
+
+    Every event is written to stdout as one JSON object per line. Progress
+    is read from the shared ProgressTable on a timer, so only tasks that
+    changed since the last tick produce output.
+    """
+
+    url_received = pyqtSignal(str)
+
+    def __init__(self, config_path='config.json', output_dir=None, playlist=False,
+                 interval=1.0, keep_running=False):
+        super().__init__()
+        self.config = ConfigManager(config_path)
+        self.api = AppAPI(self)
+        self.plugin_manager = PluginManager(self.api)
+        self.download_manager = DownloadManager(self.config, self.api)
+        self.output_dir = output_dir or self.config.get('output_dir')
+        self.playlist = playlist
+        self.keep_running = keep_running
+        self.failures = 0
+        self.control_server = None
+
+        self._slot_tasks = {}  # progress slot -> task
+        self._input_done = False
+        self._out_lock = threading.Lock()
+
+        self.api.log_signal.connect(self.log_message)
+        self.download_manager.task_added.connect(self._on_task_added)
+        self.url_received.connect(self.add_url)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._flush)
+        self._timer.start(int(max(0.05, interval) * 1000))
+
+    def emit_event(self, event, **fields):
+        """Write one JSON line to stdout"""
+        line = json.dumps(dict(event=event, time=round(time.time(), 3), **fields), ensure_ascii=False)
+        with self._out_lock:
+            sys.stdout.write(line + '\n')
+            sys.stdout.flush()
+
+    @pyqtSlot(str, str)
+    def log_message(self, message, level='INFO'):
+        """Log messages from the engine and plugins"""
+        self.emit_event('log', level=level, message=message)
+
+    def add_plugin_menu_action(self, menu_name, action_name, callback):
+        """There are no menus without a GUI"""
+        self.log_message(f'メニュー項目を無視しました (headless): {action_name}', 'DEBUG')
+
+    def start(self, urls, read_stdin=False, resume=False):
+        """Load plugins, then queue URLs from the arguments and stdin"""
+        self.plugin_manager.load_plugins()
+
+        if resume:
+            restored = self.download_manager.restore()
+            if restored:
+                self.log_message(f'前回のキューを復元しました: {restored}件')
+
+        self.control_server = ControlServer.from_config(self.config, self.api)
+        if self.control_server:
+            self.control_server.start()
+
+        for url in urls:
+            self.add_url(url)
+
+        if read_stdin:
+            threading.Thread(target=self._read_stdin, daemon=True).start()
+        else:
+            self._input_done = True
+
+    def _read_stdin(self):
+        """Queue one URL per stdin line (on the main thread, via a signal)"""
+        for line in sys.stdin:
+            url = line.strip()
+            if url and not url.startswith('#'):
+                self.url_received.emit(url)
+        self._input_done = True
+
+    @pyqtSlot(str)
+    def add_url(self, url):
+        """Queue a URL (as a playlist when --playlist was given)"""
+        if self.playlist:
+            self.download_manager.add_playlist(url, self.output_dir)
+        elif self.download_manager.add_download(url, self.output_dir) is None:
+            self.emit_event('skipped', url=url, reason='archived')
+
+    @pyqtSlot(object)
+    def _on_task_added(self, task):
+        """Announce a new task"""
+        self.emit_event('added', id=task.id, url=task.url, title=task.title)
+
+    def _task_for_slot(self, slot):
+        """Task writing to a progress slot"""
+        task = self._slot_tasks.get(slot)
+        if task is None or task.slot != slot:
+            self._slot_tasks = {t.slot: t for t in list(self.download_manager.tasks) if t.slot is not None}
+            task = self._slot_tasks.get(slot)
+        return task
+
+    def _is_idle(self):
+        """Whether all input has been queued and every task has finished"""
+        manager = self.download_manager
+        return (
+            self._input_done
+            and not any(not p.is_finished for p in manager.playlists)
+            and manager.scheduler.pending_count() == 0
+            and manager.scheduler.running_count() == 0
+            and manager.postprocessor.busy_count() == 0
+        )
+
+    def _flush(self):
+        """Report changed tasks; quit once everything is done"""
+        # Checked first: tasks write their final state before releasing the scheduler
+        idle = self._is_idle()
+
+        table = self.download_manager.progress_table
+        finished = []
+        for slot in table.changed():
+            task = self._task_for_slot(slot)
+            if task is None:
+                continue
+
+            percent, done, total, speed, state = table.row(slot)
+            if state in (ProgressTable.COMPLETED, ProgressTable.ERROR):
+                if not task.success:
+                    self.failures += 1
+                self.emit_event(
+                    'finished', id=task.id, url=task.url, title=task.title,
+                    success=bool(task.success), message=task.status
+                )
+                finished.append(task)
+            else:
+                self.emit_event(
+                    'progress', id=task.id, url=task.url, title=task.title,
+                    state=ProgressTable.STATE_NAMES.get(state, 'unknown'), percent=percent,
+                    done=done, total=total, speed=speed
+                )
+
+        # Finished tasks are not kept around; memory stays flat on long runs
+        if finished:
+            self.download_manager.remove_downloads(finished)
+
+        # The control API can add work at any time, so it keeps the process alive
+        if idle and not self.keep_running and not self.control_server:
+            QCoreApplication.instance().quit()
+
+    def shutdown(self):
+        """Stop background services and write pending configuration"""
+        self._timer.stop()
+        if self.control_server:
+            self.control_server.stop()
+        self.download_manager.shutdown()
+        self.config.flush()
+
+
+def main(argv=None):
+    """Headless entry point; returns the exit code"""
+    parser = argparse.ArgumentParser(
+        prog='main.py --headless',
+        description='GUIなしでダウンロードを実行し、進捗をJSON Linesで出力します'
+    )
+    parser.add_argument('urls', nargs='*', help="URL (省略時または '-' で標準入力から1行1件)")
+    parser.add_argument('-o', '--output-dir', help='保存先フォルダ')
+    parser.add_argument('--playlist', action='store_true', help='プレイリスト・チャンネルとして展開')
+    parser.add_argument('--resume', action='store_true', help='前回のキューを復元')
+    parser.add_argument('--config', default='config.json', help='設定ファイル')
+    parser.add_argument('--interval', type=float, default=1.0, help='進捗出力間隔 (秒)')
+    parser.add_argument('--keep-running', action='store_true', help='完了後も終了しない')
+    args = parser.parse_args(argv)
+
+    read_stdin = not args.urls or args.urls == ['-']
+    urls = [] if args.urls == ['-'] else args.urls
+
+    app = QCoreApplication(sys.argv[:1])
+    app.setApplicationName("yt-dlp GUI")
+
+    # Ctrl+C quits the event loop (the progress timer lets Python see the signal)
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    signal.signal(signal.SIGTERM, lambda *_: app.quit())
+
+    headless = HeadlessApp(
+        config_path=args.config,
+        output_dir=args.output_dir,
+        playlist=args.playlist,
+        interval=args.interval,
+        keep_running=args.keep_running
+    )
+    headless.start(urls, read_stdin=read_stdin, resume=args.resume)
+
+    app.exec_()
+    headless.shutdown()
+    return 1 if headless.failures else 0
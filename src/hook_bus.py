@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hook Bus - runs plugin hooks off the download threads
+"""
+
+import queue
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class HookBus:
+    """Dispatches plugin hooks through bounded queues to worker threads
+
+    Each worker drains its own queue, and every hook for a task (keyed by
+    its URL) goes to the same queue, so one task's hooks run in order and
+    never at the same time, as they did when hooks were called inline.
+    Download threads only enqueue and never block. on_progress is either
+    coalesced (only the latest update per URL is delivered) or dropped
+    when the queue is full; other hooks are dropped with a warning. Each
+    plugin's callbacks are timed by a watchdog, so a plugin that exceeds
+    the time budget too often, or hangs in a single call, is disabled
+    while it is still running and its worker is replaced.
+    """
+
+    HOOK_NAMES = ('on_download_start', 'on_progress', 'on_complete', 'on_error')
+
+    def __init__(self, log: Optional[Callable[..., None]] = None,
+                 queue_size: int = 1000, workers: int = 2,
+                 progress_policy: str = 'coalesce',
+                 time_budget: float = 1.0, max_overruns: int = 5):
+        self.log = log or (lambda message, level='INFO': print(f'[{level}] {message}', file=sys.stderr))
+        self.progress_policy = progress_policy
+        self.time_budget = time_budget
+        self.max_overruns = max_overruns
+        self.hooks: Dict[str, List[Callable]] = {name: [] for name in self.HOOK_NAMES}
+        self.dropped = 0
+
+        workers = max(1, workers)
+        self._queues = [queue.Queue(maxsize=max(1, queue_size // workers)) for _ in range(workers)]
+        self._lock = threading.Lock()
+        self._pending_progress = {}  # url -> latest info
+        self._stats = {}  # plugin -> stats dict
+        self._disabled = set()
+        self._running = {}  # worker thread id -> [plugin, hook name, start, overrun counted]
+        self._shards = {}  # worker thread id -> index of the queue it drains
+        self._abandoned = set()  # worker thread ids replaced while stuck in a plugin
+        self._workers = []
+
+        for shard in range(workers):
+            self._start_worker(shard)
+
+        self._watchdog = threading.Thread(target=self._watch, daemon=True)
+        self._watchdog.start()
+
+    @classmethod
+    def from_config(cls, config, log=None) -> 'HookBus':
+        """Create a bus from configuration"""
+        return cls(
+            log=log,
+            queue_size=config.get('hook_queue_size', 1000),
+            workers=config.get('hook_workers', 2),
+            progress_policy=config.get('hook_progress_policy', 'coalesce'),
+            time_budget=config.get('hook_time_budget', 1.0),
+            max_overruns=config.get('hook_max_overruns', 5)
+        )
+
+    @staticmethod
+    def plugin_name(callback: Callable) -> str:
+        """Plugin a callback belongs to (plugins are loaded as modules named after the file)"""
+        return getattr(callback, '__module__', None) or repr(callback)
+
+    def register(self, name: str, callback: Callable) -> bool:
+        """Register a hook callback"""
+        if name not in self.hooks:
+            return False
+
+        with self._lock:
+            self.hooks[name].append(callback)
+        return True
+
+    def clear(self):
+        """Forget every registered callback (before reloading plugins)"""
+        with self._lock:
+            for callbacks in self.hooks.values():
+                callbacks.clear()
+            self._disabled.clear()
+
+    def emit(self, name: str, info: dict):
+        """Queue a hook call; never runs plugin code on the caller's thread"""
+        if not self.hooks.get(name):
+            return
+
+        if name == 'on_progress':
+            self._emit_progress(info)
+            return
+
+        try:
+            self._queue_for(info.get('url')).put_nowait((name, info))
+        except queue.Full:
+            self.dropped += 1
+            self.log(f'Hook queue full, dropped {name} ({self.dropped} dropped so far)', 'WARNING')
+
+    def _emit_progress(self, info: dict):
+        """Queue on_progress according to the drop/coalesce policy"""
+        if self.progress_policy == 'coalesce':
+            key = info.get('url')
+            with self._lock:
+                queued = key in self._pending_progress
+                self._pending_progress[key] = info
+            if queued:
+                return  # the queued entry will deliver this newer info
+
+            try:
+                self._queue_for(key).put_nowait(('on_progress', key))
+            except queue.Full:
+                with self._lock:
+                    self._pending_progress.pop(key, None)
+                self.dropped += 1
+            return
+
+        try:
+            self._queue_for(info.get('url')).put_nowait(('on_progress', info))
+        except queue.Full:
+            self.dropped += 1
+
+    def _queue_for(self, url) -> queue.Queue:
+        """Queue that carries every hook of the task with this URL"""
+        return self._queues[hash(url) % len(self._queues)]
+
+    def _start_worker(self, shard: int):
+        """Start one worker thread for a queue"""
+        worker = threading.Thread(target=self._worker, args=(shard,), daemon=True)
+        worker.start()
+        with self._lock:
+            self._workers.append(worker)
+
+    def _worker(self, shard: int):
+        """Pull hook calls from one queue and run them"""
+        me = threading.get_ident()
+        hooks = self._queues[shard]
+        with self._lock:
+            self._shards[me] = shard
+        while me not in self._abandoned:
+            name, payload = hooks.get()
+            try:
+                if name == 'on_progress' and self.progress_policy == 'coalesce':
+                    with self._lock:
+                        payload = self._pending_progress.pop(payload, None)
+                    if payload is None:
+                        continue
+
+                with self._lock:
+                    callbacks = list(self.hooks.get(name, []))
+
+                for callback in callbacks:
+                    self._run(name, callback, payload)
+            finally:
+                hooks.task_done()
+
+        with self._lock:
+            self._abandoned.discard(me)
+            self._shards.pop(me, None)
+            self._workers = [w for w in self._workers if w.ident != me]
+
+    def _run(self, name: str, callback: Callable, info: dict):
+        """Run one callback with timing and budget enforcement"""
+        plugin = self.plugin_name(callback)
+        if plugin in self._disabled:
+            return
+
+        me = threading.get_ident()
+        start = time.perf_counter()
+        running = [plugin, name, start, False]
+        with self._lock:
+            self._running[me] = running
+        try:
+            callback(info)
+        except Exception as e:
+            self.log(f'Plugin hook error ({plugin}.{name}): {e}', 'ERROR')
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._running.pop(me, None)
+            stats = self._plugin_stats(plugin)
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed * 1000
+            stats['max_ms'] = max(stats['max_ms'], elapsed * 1000)
+
+            # The watchdog has already counted calls it saw run over budget
+            if elapsed <= self.time_budget or running[3]:
+                return
+            disable = self._count_overrun(plugin)
+
+        if disable:
+            self._log_disabled(plugin, name)
+
+    def _plugin_stats(self, plugin: str) -> dict:
+        """Stats entry for a plugin (caller holds the lock)"""
+        return self._stats.setdefault(plugin, {
+            'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'overruns': 0
+        })
+
+    def _count_overrun(self, plugin: str) -> bool:
+        """Record an overrun; True if the plugin has just been disabled (caller holds the lock)"""
+        stats = self._plugin_stats(plugin)
+        stats['overruns'] += 1
+        if stats['overruns'] >= self.max_overruns and plugin not in self._disabled:
+            self._disabled.add(plugin)
+            return True
+        return False
+
+    def _log_disabled(self, plugin: str, name: str):
+        """Tell the user a plugin was disabled"""
+        self.log(
+            f'プラグインを無効化しました: {plugin} '
+            f'({name} が {self.time_budget:.1f}秒 を {self.max_overruns}回 超過)',
+            'WARNING'
+        )
+
+    def _watch(self):
+        """Watchdog: enforce the time budget on callbacks that are still running
+
+        A call is counted as an overrun as soon as it passes the budget. A
+        single call still running after max_overruns budgets is treated as
+        hung: its plugin is disabled and the stuck worker is replaced so the
+        queue keeps draining.
+        """
+        hang_timeout = self.time_budget * self.max_overruns
+        tick = max(0.05, min(self.time_budget, 1.0) / 2)
+        while True:
+            time.sleep(tick)
+            now = time.perf_counter()
+            disabled, replace = [], []
+            with self._lock:
+                for worker, running in self._running.items():
+                    plugin, name, start, counted = running
+                    elapsed = now - start
+                    if elapsed > self.time_budget and not counted:
+                        running[3] = True
+                        if self._count_overrun(plugin):
+                            disabled.append((plugin, name))
+                    if elapsed > hang_timeout and worker not in self._abandoned:
+                        self._abandoned.add(worker)
+                        replace.append(self._shards[worker])
+                        if plugin not in self._disabled:
+                            self._disabled.add(plugin)
+                            disabled.append((plugin, name))
+
+            for plugin, name in disabled:
+                self._log_disabled(plugin, name)
+            for shard in replace:
+                self._start_worker(shard)
+
+    def enable(self, plugin: str):
+        """Re-enable a plugin disabled for exceeding its time budget"""
+        with self._lock:
+            self._disabled.discard(plugin)
+            if plugin in self._stats:
+                self._stats[plugin]['overruns'] = 0
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-plugin call count, timing and disabled flag"""
+        with self._lock:
+            return {
+                plugin: dict(stats, disabled=plugin in self._disabled)
+                for plugin, stats in self._stats.items()
+            }
+
+    def wait_idle(self):
+        """Block until every queued hook has run"""
+        for hooks in self._queues:
+            hooks.join()
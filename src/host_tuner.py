@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Host Tuner - learns split/connection counts per host from aria2 results
+"""
+
+import atexit
+import ipaddress
+import json
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from .write_behind import WriteBehind
+
+
+# Second-level labels under country TLDs that act as public suffixes (co.uk, com.au, ...)
+COUNTRY_SLDS = {'ac', 'co', 'com', 'edu', 'gov', 'ne', 'net', 'or', 'org'}
+
+
+class HostTuner:
+    """Chooses aria2 split and max-connection-per-server for each host
+
+    Every finished RPC download reports its host, the connection count it
+    was given, its average speed while active and whether it failed.
+    Per host and connection count the tuner keeps an EWMA of throughput
+    and an error rate, then:
+
+    * steps down (halves) when the current count fails too often,
+    * tries the next doubling once the current count is known and good,
+    * otherwise settles on the fastest count, preferring fewer
+      connections unless more are clearly faster.
+
+    Profiles are kept per registrable domain, so every CDN edge of a site
+    (``rr3---sn-xxxx.googlevideo.com``) feeds the same profile. They are
+    saved to a JSON file, write-behind like the configuration, and only
+    the ``max_hosts`` most recently used domains are kept.
+    """
+
+    MIN_SAMPLES = 2          # results needed before judging a level
+    MIN_BYTES = 4 * 1024 ** 2  # smaller files say little about throughput
+    EWMA_ALPHA = 0.3
+    GAIN_THRESHOLD = 1.1     # more connections must be 10% faster to win
+
+    def __init__(self, path: str, min_connections: int = 1, max_connections: int = 16,
+                 initial_connections: int = 4, max_error_rate: float = 0.2,
+                 max_hosts: int = 500, save_delay: float = 5.0, max_split: int = 16):
+        self.path = path
+        self.max_hosts = max(1, max_hosts)
+        self.save_delay = save_delay
+        self.min_connections = max(1, min_connections)
+        self.set_bounds(max_connections, max_split)
+        self.initial_connections = min(self.max_connections, max(self.min_connections, initial_connections))
+        self.max_error_rate = max_error_rate
+        self.hosts: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._writer = WriteBehind(
+            path, lambda: json.dumps(self.hosts, indent=2, sort_keys=True),
+            self._lock, save_delay, name='host profiles'
+        )
+        self.load()
+
+        # Write pending profiles on interpreter exit
+        atexit.register(self.save)
+
+    @classmethod
+    def from_config(cls, config) -> Optional['HostTuner']:
+        """Create the tuner from configuration, or None if disabled
+
+        The user's aria2c_max_connections and aria2c_split settings are
+        upper bounds for whatever the tuner picks.
+        """
+        if not config.get('host_tuning_enabled', True):
+            return None
+
+        return cls(
+            config.get('host_tuning_path', 'cache/host_profiles.json'),
+            min_connections=config.get('host_tuning_min_connections', 1),
+            max_connections=cls.connection_bound(config),
+            initial_connections=config.get('host_tuning_initial_connections', 4),
+            max_error_rate=config.get('host_tuning_max_error_rate', 0.2),
+            max_hosts=config.get('host_tuning_max_hosts', 500),
+            max_split=config.get('aria2c_split', 16)
+        )
+
+    @staticmethod
+    def connection_bound(config) -> int:
+        """Most connections the configuration allows the tuner to use"""
+        return min(
+            config.get('host_tuning_max_connections', 16),
+            config.get('aria2c_max_connections', 16)
+        )
+
+    def set_bounds(self, max_connections: int, max_split: int):
+        """Change the upper bounds (e.g. after the settings changed)"""
+        self.max_connections = max(self.min_connections, min(16, max_connections))
+        self.max_split = max(1, max_split)
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        """Host part of a URL"""
+        return (urlparse(url).hostname or '').lower()
+
+    @classmethod
+    def domain_of(cls, url: str) -> str:
+        """Registrable domain of a URL (profile key); IP addresses stay as they are"""
+        host = cls.host_of(url)
+        try:
+            ipaddress.ip_address(host)
+            return host
+        except ValueError:
+            pass
+
+        labels = host.split('.')
+        keep = 3 if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in COUNTRY_SLDS else 2
+        return '.'.join(labels[-keep:])
+
+    def load(self):
+        """Read saved profiles"""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.hosts = json.load(f)
+        except Exception as e:
+            print(f'Failed to load host profiles: {e}', file=sys.stderr)
+            self.hosts = {}
+            return
+
+        # Files from before profiles were keyed by domain hold one entry per CDN edge;
+        # keep the most recently updated one for each domain
+        by_domain = {}
+        for host, profile in sorted(self.hosts.items(), key=lambda item: item[1].get('updated', 0)):
+            by_domain[self.domain_of(f'//{host}')] = profile
+        if by_domain.keys() != self.hosts.keys():
+            self.hosts = by_domain
+            self._schedule_save()
+        if self._evict():
+            self._schedule_save()
+
+    def save(self):
+        """Write pending profiles atomically (no-op if nothing changed)"""
+        self._writer.flush()
+
+    def _schedule_save(self):
+        """Write behind: results within save_delay share one write"""
+        self._writer.schedule()
+
+    def _evict(self) -> bool:
+        """Drop the least recently updated profiles above max_hosts"""
+        excess = len(self.hosts) - self.max_hosts
+        if excess <= 0:
+            return False
+
+        oldest = sorted(self.hosts, key=lambda host: self.hosts[host].get('updated', 0))
+        for host in oldest[:excess]:
+            del self.hosts[host]
+        return True
+
+    def choose(self, url: str) -> Tuple[int, int]:
+        """(split, max-connection-per-server) for a download from this URL's host"""
+        host = self.domain_of(url)
+        with self._lock:
+            profile = self.hosts.get(host)
+            connections = profile['current'] if profile else self.initial_connections
+
+        connections = min(self.max_connections, max(self.min_connections, connections))
+        return min(self.max_split, connections), connections
+
+    def record(self, url: str, connections: int, speed: float, size: int, failed: bool):
+        """Learn from one finished download"""
+        host = self.domain_of(url)
+        if not host:
+            return
+
+        with self._lock:
+            profile = self.hosts.setdefault(host, {'current': connections, 'levels': {}})
+            level = profile['levels'].setdefault(str(connections), {
+                'speed': 0.0, 'samples': 0, 'results': 0, 'errors': 0
+            })
+
+            level['results'] += 1
+            if failed:
+                level['errors'] += 1
+            elif speed > 0 and size >= self.MIN_BYTES:
+                level['speed'] = speed if level['samples'] == 0 else (
+                    self.EWMA_ALPHA * speed + (1 - self.EWMA_ALPHA) * level['speed']
+                )
+                level['samples'] += 1
+
+            profile['current'] = self._next_level(profile, connections)
+            profile['updated'] = time.time()
+            self._evict()
+            self._schedule_save()
+
+    def _error_rate(self, level: Dict) -> float:
+        return level['errors'] / level['results'] if level['results'] else 0.0
+
+    def _next_level(self, profile: Dict, connections: int) -> int:
+        """Connection count to use next for a host"""
+        levels = profile['levels']
+        level = levels[str(connections)]
+
+        # Too many failures: back off right away
+        if level['results'] >= self.MIN_SAMPLES and self._error_rate(level) > self.max_error_rate:
+            return max(self.min_connections, connections // 2)
+
+        if level['samples'] < self.MIN_SAMPLES:
+            return connections
+
+        # Healthy levels, fastest first; fewer connections win unless clearly slower
+        healthy = sorted(
+            (int(n), stats['speed']) for n, stats in levels.items()
+            if stats['samples'] >= self.MIN_SAMPLES and self._error_rate(stats) <= self.max_error_rate
+        )
+        best, best_speed = healthy[0]
+        for n, speed in healthy[1:]:
+            if speed > best_speed * self.GAIN_THRESHOLD:
+                best, best_speed = n, speed
+
+        # Explore one step up from the best level if it has never been tried
+        up = min(self.max_connections, best * 2)
+        if best == connections and up != best and str(up) not in levels:
+            return up
+
+        return best
+
+    def profiles(self) -> Dict[str, Dict]:
+        """Copy of the learned profiles"""
+        with self._lock:
+            return json.loads(json.dumps(self.hosts))
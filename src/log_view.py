@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Log View - bounded log panel with batched appends
+"""
+
+from collections import deque
+
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPlainTextEdit
+)
+from PyQt5.QtCore import QTimer
+
+
+class LogView(QWidget):
+    """Log panel backed by a fixed-capacity ring buffer
+
+    Messages are buffered and appended in one batch per timer tick, and
+    the text widget never holds more than ``capacity`` lines, so the cost
+    per message stays constant however long the app runs.
+    """
+
+    LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+    FILTERS = [('すべて', 'DEBUG'), ('情報以上', 'INFO'), ('警告以上', 'WARNING'), ('エラーのみ', 'ERROR')]
+
+    def __init__(self, capacity=5000, flush_interval_ms=200, parent=None):
+        super().__init__(parent)
+        self._entries = deque(maxlen=capacity)
+        self._pending = []
+        self._min_level = self.LEVELS['INFO']
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel('表示レベル:'))
+        self.level_combo = QComboBox()
+        for label, level in self.FILTERS:
+            self.level_combo.addItem(label, level)
+        self.level_combo.setCurrentIndex(1)
+        self.level_combo.currentIndexChanged.connect(self._on_filter_changed)
+        filter_layout.addWidget(self.level_combo)
+        filter_layout.addStretch()
+        layout.addLayout(filter_layout)
+
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setMaximumBlockCount(capacity)
+        self.text.setUndoRedoEnabled(False)
+        layout.addWidget(self.text)
+
+        self._flush_timer = QTimer(self)
+        self._flush_timer.timeout.connect(self._flush)
+        self._flush_timer.start(flush_interval_ms)
+
+    def append(self, line, level='INFO'):
+        """Buffer a formatted line; it is shown on the next flush"""
+        entry = (self.LEVELS.get(level, self.LEVELS['INFO']), line)
+        self._entries.append(entry)
+        self._pending.append(entry)
+
+        # Lines that fell out of the ring buffer don't need to be shown either
+        if len(self._pending) > self._entries.maxlen:
+            del self._pending[:-self._entries.maxlen]
+
+    def _visible(self, entries):
+        """Lines passing the level filter"""
+        return [line for level, line in entries if level >= self._min_level]
+
+    def _flush(self):
+        """Append buffered lines in one batch"""
+        if not self._pending:
+            return
+
+        lines = self._visible(self._pending)
+        self._pending = []
+        if not lines:
+            return
+
+        scrollbar = self.text.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 2
+
+        self.text.appendPlainText('\n'.join(lines))
+
+        # Follow new output only if the user hasn't scrolled up
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def _on_filter_changed(self, index):
+        """Re-render the ring buffer with the new level filter"""
+        self._min_level = self.LEVELS[self.level_combo.itemData(index)]
+        self._pending = []
+        self.text.setPlainText('\n'.join(self._visible(self._entries)))
+        scrollbar = self.text.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
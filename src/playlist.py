@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Playlist Feeder - streams playlist/channel entries into the download queue
+"""
+
+import re
+import sys
+import threading
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+
+import yt_dlp
+
+
+# Flat 'url' entries that point at a playlist when the extractor cannot say
+PLAYLIST_URL = re.compile(r'/playlist\?|/playlists\b|/(?:channel|c|user)/|/@[^/?#]+(?:/[^/?#]*)?/?(?:[?#]|$)')
+
+
+class PlaylistFeeder:
+    """Enumerates a playlist lazily and queues its entries as they arrive
+
+    Entries come from flat extraction without processing, so the extractor
+    fetches pages only as they are iterated. At most ``lookahead`` entries
+    wait in the queue at a time; the feeder blocks until queued tasks have
+    started, so memory stays flat however long the playlist is.
+    """
+
+    def __init__(self, url: str,
+                 enqueue: Callable[[str, Optional[str], Optional[Tuple[str, str]]], object],
+                 is_queued: Callable[[object], bool], lookahead: int = 20,
+                 log: Optional[Callable[..., None]] = None):
+        self.url = url
+        self.enqueue = enqueue
+        self.is_queued = is_queued
+        self.lookahead = max(1, int(lookahead))
+        self.log = log or (lambda message, level='INFO': print(f'[{level}] {message}', file=sys.stderr))
+        self.title = None
+        self.added = 0
+        self.skipped = 0
+        self.is_finished = False
+
+        self._pending = []  # queued tasks that have not started yet
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start enumerating in a background thread"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop queueing further entries"""
+        self._stop.set()
+
+    def _ydl_opts(self) -> Dict:
+        """yt-dlp options for flat, unprocessed enumeration"""
+        return {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+            'skip_download': True,
+        }
+
+    def _run(self):
+        """Enumerate entries and feed them to the queue"""
+        try:
+            with yt_dlp.YoutubeDL(self._ydl_opts()) as ydl:
+                info = ydl.extract_info(self.url, download=False, process=False)
+                if not info:
+                    self.log(f'プレイリストの取得に失敗しました: {self.url}', 'ERROR')
+                    return
+
+                self.title = info.get('title') or self.url
+                self.log(f'プレイリスト読み込み開始: {self.title}')
+
+                for entry in self._iter_entries(ydl, info, self.url, {self.url}):
+                    if not self._wait_for_room():
+                        break
+                    self._add(entry)
+
+            state = '停止' if self._stop.is_set() else '完了'
+            self.log(
+                f'プレイリスト読み込み{state}: {self.title} '
+                f'({self.added}件追加, {self.skipped}件スキップ)'
+            )
+        except Exception as e:
+            self.log(f'プレイリストエラー: {e}', 'ERROR')
+        finally:
+            self.is_finished = True
+
+    def _iter_entries(self, ydl, info: Dict, url: str, seen: Set[str]) -> Iterator[Dict]:
+        """Yield video entries, descending into nested playlists"""
+        kind = info.get('_type')
+        if kind in ('url', 'url_transparent'):
+            # A reference, e.g. a channel's playlists tab listing playlists
+            if self._is_playlist_ref(ydl, info):
+                yield from self._expand(ydl, info, seen)
+            else:
+                yield info
+            return
+
+        if kind not in ('playlist', 'multi_video'):
+            # Not a playlist after all; queue the URL itself
+            yield {'url': info.get('webpage_url') or url, 'title': info.get('title')}
+            return
+
+        # A generator or paged list: pages are fetched as iteration reaches them
+        # (no truthiness test: len() of a paged list fetches every page)
+        entries = info.get('entries')
+        if entries is None:
+            return
+
+        for entry in entries:
+            if self._stop.is_set():
+                return
+            if not entry:
+                continue
+
+            if entry.get('_type') in ('url', 'url_transparent', 'playlist', 'multi_video'):
+                yield from self._iter_entries(ydl, entry, url, seen)
+            else:
+                yield entry
+
+    def _is_playlist_ref(self, ydl, entry: Dict) -> bool:
+        """Whether a flat 'url' entry points at a playlist rather than a video"""
+        url = entry.get('url') or ''
+        single = None
+        try:
+            ie = ydl.get_info_extractor(entry['ie_key']) if entry.get('ie_key') else None
+            if ie is not None and hasattr(ie, 'is_single_video'):
+                single = ie.is_single_video(url)
+        except Exception:
+            pass
+
+        if single is not None:
+            return not single
+        # Extractors that return either (e.g. YouTube tabs): judge by the URL
+        return bool(PLAYLIST_URL.search(url))
+
+    def _expand(self, ydl, entry: Dict, seen: Set[str]) -> Iterator[Dict]:
+        """Flat-extract the playlist a 'url' entry points at"""
+        url = entry['url']
+        if url in seen:
+            return
+        seen.add(url)
+
+        try:
+            nested = ydl.extract_info(url, download=False, process=False, ie_key=entry.get('ie_key'))
+        except Exception as e:
+            self.log(f'プレイリストの取得に失敗しました: {url} ({e})', 'WARNING')
+            return
+
+        if nested:
+            yield from self._iter_entries(ydl, nested, url, seen)
+
+    def _wait_for_room(self) -> bool:
+        """Block while lookahead entries are still queued; False once stopped"""
+        while not self._stop.is_set():
+            self._pending = [task for task in self._pending if self.is_queued(task)]
+            if len(self._pending) < self.lookahead:
+                return True
+            self._stop.wait(0.5)
+
+        return False
+
+    def _add(self, entry: Dict):
+        """Queue one flat entry"""
+        url = entry.get('url') or entry.get('webpage_url')
+        if not url:
+            return
+
+        # Flat entries already carry the extractor and id for archive checks
+        archive_key = None
+        if entry.get('ie_key') and entry.get('id'):
+            archive_key = (entry['ie_key'], entry['id'])
+
+        task = self.enqueue(url, entry.get('title'), archive_key)
+        if task is None:
+            self.skipped += 1
+            return
+
+        self._pending.append(task)
+        self.added += 1
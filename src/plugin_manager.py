@@ -81,6 +81,9 @@ def example_action():
         """Load all plugins"""
         self.plugins.clear()
         
+        # Drop hooks of previously loaded plugins so reloads don't duplicate them
+        self.api.clear_hooks()
+        
         if not self.plugins_dir.exists():
             return
         
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Post Processing - ffmpeg stream-copy merge, audio extraction and embedding
+"""
+
+import heapq
+import itertools
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import urllib.request
+from typing import Callable, Dict, List, Optional
+
+
+# Containers that take a cover image as an attached_pic stream
+PICTURE_CONTAINERS = {'mp4', 'm4a', 'mov', 'mp3'}
+
+# ffmpeg audio encoder per target format, and source extensions that can be copied
+AUDIO_CODECS = {
+    'mp3': ('libmp3lame', {'mp3'}),
+    'aac': ('aac', {'m4a', 'aac', 'mp4'}),
+    'm4a': ('aac', {'m4a', 'aac', 'mp4'}),
+    'flac': ('flac', {'flac'}),
+    'wav': ('pcm_s16le', {'wav'}),
+    'opus': ('libopus', {'opus', 'webm'}),
+}
+
+
+def find_ffmpeg(config) -> Optional[str]:
+    """Path of the configured ffmpeg, or None if it cannot be found"""
+    path = config.get('ffmpeg_path') or 'ffmpeg'
+    if os.path.isfile(path):
+        return path
+    return shutil.which(path)
+
+
+def audio_codec(audio_format: str, source_ext: Optional[str]) -> str:
+    """ffmpeg audio codec for a target format ('copy' when no re-encode is needed)"""
+    codec, copyable = AUDIO_CODECS.get(audio_format, (None, set()))
+    if codec is None or source_ext in copyable:
+        return 'copy'
+    return codec
+
+
+def fetch_thumbnail(url: str, path: str, headers: Optional[Dict[str, str]] = None,
+                    timeout: float = 15) -> bool:
+    """Download a thumbnail image next to the media file"""
+    try:
+        request = urllib.request.Request(url, headers=headers or {})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = response.read()
+        with open(path, 'wb') as f:
+            f.write(data)
+        return True
+    except Exception:
+        return False
+
+
+def build_command(ffmpeg: str, inputs: List[Dict], output: str,
+                  audio_only: bool = False, codec: str = 'copy',
+                  metadata: Optional[Dict[str, str]] = None,
+                  thumbnail: Optional[str] = None) -> List[str]:
+    """ffmpeg command that muxes the inputs into one file in a single pass
+
+    Each input is ``{'path', 'video', 'audio'}``; video and audio streams
+    are copied unless ``codec`` asks for an audio re-encode. A thumbnail is
+    only added for containers that support cover images.
+    """
+    cmd = [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y']
+    for item in inputs:
+        cmd += ['-i', item['path']]
+
+    container = os.path.splitext(output)[1].lstrip('.').lower()
+    picture = thumbnail if container in PICTURE_CONTAINERS else None
+    if picture:
+        cmd += ['-i', picture]
+
+    video_streams = 0
+    for index, item in enumerate(inputs):
+        if item.get('video', True) and not audio_only:
+            cmd += ['-map', f'{index}:v:0?']
+            video_streams += 1
+        if item.get('audio', True):
+            cmd += ['-map', f'{index}:a:0?']
+
+    cmd += ['-c', 'copy']
+    if codec != 'copy':
+        cmd += ['-c:a', codec]
+
+    if picture:
+        cmd += [
+            '-map', f'{len(inputs)}:v:0',
+            f'-c:v:{video_streams}', 'mjpeg',
+            f'-disposition:v:{video_streams}', 'attached_pic',
+        ]
+        if container == 'mp3':
+            cmd += ['-id3v2_version', '3']
+
+    for key, value in (metadata or {}).items():
+        if value:
+            cmd += ['-metadata', f'{key}={value}']
+
+    cmd.append(output)
+    return cmd
+
+
+def run_ffmpeg(cmd: List[str],
+               on_process: Optional[Callable[[subprocess.Popen], None]] = None) -> Dict:
+    """Run an ffmpeg command (on_process receives the process, e.g. to kill it)"""
+    try:
+        process = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors='replace'
+        )
+        if on_process:
+            on_process(process)
+        _, stderr = process.communicate()
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+    if process.returncode != 0:
+        error = stderr.strip().splitlines()
+        return {'success': False, 'error': error[-1] if error else f'ffmpeg終了コード: {process.returncode}'}
+
+    return {'success': True}
+
+
+class PostProcessPool:
+    """Worker pool for ffmpeg jobs, separate from the download slots
+
+    Downloads hand their finished files over and free their network slot
+    at once, so merging and encoding overlap with other tasks' transfers.
+    Jobs run by priority (higher first, then submission order). The heavy
+    lifting happens in ffmpeg child processes; one worker thread waits on
+    each, so the pool size is the number of concurrent ffmpeg processes.
+    A job that raises is logged and its ``on_error`` callback is called.
+    """
+
+    def __init__(self, workers: int = 0, log: Optional[Callable[..., None]] = None):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.log = log or (lambda message, level='INFO': print(f'[{level}] {message}', file=sys.stderr))
+        self._heap = []  # (-priority, seq, job, on_error)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._busy = 0  # queued + running jobs
+        self._stopped = False
+        self._threads = []
+
+    @classmethod
+    def from_config(cls, config, log=None) -> 'PostProcessPool':
+        """Create the pool from configuration (0 workers means one per CPU)"""
+        return cls(int(config.get('postprocess_workers', 0) or 0), log=log)
+
+    def submit(self, job: Callable[[], None], priority: int = 0,
+               on_error: Optional[Callable[[Exception], None]] = None):
+        """Queue a job; on_error(exception) is called if it raises"""
+        with self._cond:
+            if self._stopped:
+                return
+            heapq.heappush(self._heap, (-priority, next(self._seq), job, on_error))
+            self._busy += 1
+            if len(self._threads) < min(self.workers, self._busy):
+                thread = threading.Thread(target=self._run, daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            self._cond.notify()
+
+    def busy_count(self) -> int:
+        """Jobs queued or running"""
+        with self._cond:
+            return self._busy
+
+    def shutdown(self):
+        """Drop queued jobs and stop the workers after their current job"""
+        with self._cond:
+            self._stopped = True
+            self._busy -= len(self._heap)
+            self._heap.clear()
+            self._cond.notify_all()
+
+    def _run(self):
+        """Worker loop"""
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                _, _, job, on_error = heapq.heappop(self._heap)
+
+            try:
+                job()
+            except Exception as e:
+                self.log(f'Post-processing job failed: {e}', 'ERROR')
+                if on_error:
+                    try:
+                        on_error(e)
+                    except Exception as e:
+                        self.log(f'Post-processing error handler failed: {e}', 'ERROR')
+            finally:
+                with self._cond:
+                    self._busy -= 1
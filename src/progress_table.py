@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Progress Table - compact shared progress state for all tasks
+"""
+
+import threading
+from array import array
+from typing import List, Tuple
+
+
+class ProgressTable:
+    """Array-backed progress slots written by workers and read by the UI
+
+    Workers overwrite their slot as often as they like; nothing is sent
+    across threads. A reader (one UI timer) calls ``changed()`` at its own
+    rate and gets only the slots written since the last call.
+    """
+
+    QUEUED = 0
+    RESOLVING = 1
+    DOWNLOADING = 2
+    POSTPROCESSING = 3
+    COMPLETED = 4
+    ERROR = 5
+    PAUSED = 6
+    CANCELLED = 7
+
+    STATE_NAMES = {
+        QUEUED: 'queued',
+        RESOLVING: 'resolving',
+        DOWNLOADING: 'downloading',
+        POSTPROCESSING: 'postprocessing',
+        COMPLETED: 'completed',
+        ERROR: 'error',
+        PAUSED: 'paused',
+        CANCELLED: 'cancelled',
+    }
+
+    def __init__(self, capacity: int = 256):
+        self._lock = threading.Lock()
+        self._free: List[int] = []
+        self._next = 0
+        self.done = array('q')
+        self.total = array('q')
+        self.speed = array('q')
+        self.percent = array('b')
+        self.state = array('b')
+        self.dirty = bytearray()
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        """Extend every column to capacity slots"""
+        extra = capacity - len(self.state)
+        if extra <= 0:
+            return
+
+        self.done.extend([0] * extra)
+        self.total.extend([0] * extra)
+        self.speed.extend([0] * extra)
+        self.percent.extend([0] * extra)
+        self.state.extend([self.QUEUED] * extra)
+        self.dirty.extend(b'\x00' * extra)
+
+    def allocate(self) -> int:
+        """Reserve a slot for a new task"""
+        with self._lock:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = self._next
+                self._next += 1
+                if slot >= len(self.state):
+                    self._grow(len(self.state) * 2)
+
+            self.done[slot] = 0
+            self.total[slot] = 0
+            self.speed[slot] = 0
+            self.percent[slot] = 0
+            self.state[slot] = self.QUEUED
+            self.dirty[slot] = 1
+            return slot
+
+    def release(self, slot: int):
+        """Return a slot once its task is removed"""
+        with self._lock:
+            self.dirty[slot] = 0
+            self._free.append(slot)
+
+    def update(self, slot: int, percent: int = None, done: int = None,
+               total: int = None, speed: int = None, state: int = None):
+        """Write progress for a slot (no locking; single-value writes are atomic)"""
+        if done is not None:
+            self.done[slot] = done
+        if total is not None:
+            self.total[slot] = total
+        if speed is not None:
+            self.speed[slot] = speed
+        if percent is not None:
+            self.percent[slot] = max(0, min(100, percent))
+        if state is not None:
+            self.state[slot] = state
+        self.dirty[slot] = 1
+
+    def changed(self) -> List[int]:
+        """Slots written since the last call"""
+        slots = []
+        dirty = self.dirty
+        slot = dirty.find(1)
+
+        while slot != -1:
+            # Clear before the caller reads, so a concurrent write re-marks it
+            dirty[slot] = 0
+            slots.append(slot)
+            slot = dirty.find(1, slot + 1)
+
+        return slots
+
+    def row(self, slot: int) -> Tuple[int, int, int, int, int]:
+        """(percent, done, total, speed, state) for a slot"""
+        return (
+            self.percent[slot], self.done[slot], self.total[slot],
+            self.speed[slot], self.state[slot]
+        )
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Queue Store - crash-safe journal of the download queue
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+class QueueStore:
+    """SQLite (WAL) record of every task and its state transitions
+
+    Each transition is one small committed write, so after a crash or
+    restart the queue can be rebuilt from the last state of each task,
+    including the aria2 GID of downloads that were in flight. ``gid`` is
+    a single download the restarted task can reattach to before resolving
+    its URL; ``gids`` lists every GID the task owned (separate streams,
+    fragment batches), so each stream reattaches by its output file and
+    the rest can be removed from aria2. Paused tasks come back paused.
+    """
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    PAUSED = 'paused'
+    COMPLETED = 'completed'
+    ERROR = 'error'
+
+    FIELDS = ('state', 'gid', 'gids', 'title', 'filename', 'priority', 'error')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                output_dir TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                state TEXT NOT NULL,
+                gid TEXT,
+                gids TEXT,
+                title TEXT,
+                filename TEXT,
+                archive_extractor TEXT,
+                archive_id TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state)')
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config) -> Optional['QueueStore']:
+        """Create the store from configuration, or None if disabled"""
+        if not config.get('queue_store_enabled', True):
+            return None
+
+        return cls(config.get('queue_store_path', 'cache/queue.sqlite3'))
+
+    def add(self, task_id: str, url: str, output_dir: str, priority: int = 0,
+            title: Optional[str] = None, archive_key=None):
+        """Record a newly queued task"""
+        now = time.time()
+        extractor, video_id = archive_key or (None, None)
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO tasks '
+                '(id, url, output_dir, priority, state, title, archive_extractor, archive_id, created, updated) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (task_id, url, output_dir, priority, self.QUEUED, title, extractor, video_id, now, now)
+            )
+            self._conn.commit()
+
+    def update(self, task_id: str, **fields):
+        """Record a state transition or new task details"""
+        fields = {key: value for key, value in fields.items() if key in self.FIELDS}
+        if not fields:
+            return
+
+        columns = ', '.join(f'{key} = ?' for key in fields)
+        with self._lock:
+            self._conn.execute(
+                f'UPDATE tasks SET {columns}, updated = ? WHERE id = ?',
+                (*fields.values(), time.time(), task_id)
+            )
+            self._conn.commit()
+
+    def remove(self, task_ids: List[str]):
+        """Forget removed tasks"""
+        with self._lock:
+            self._conn.executemany('DELETE FROM tasks WHERE id = ?', [(i,) for i in task_ids])
+            self._conn.commit()
+
+    def prune(self):
+        """Drop finished tasks from earlier sessions"""
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM tasks WHERE state IN (?, ?)', (self.COMPLETED, self.ERROR)
+            )
+            self._conn.commit()
+
+    def unfinished(self) -> List[Dict]:
+        """Queued, paused and in-flight tasks, in the order they were added"""
+        with self._lock:
+            cursor = self._conn.execute(
+                'SELECT * FROM tasks WHERE state IN (?, ?, ?) ORDER BY rowid',
+                (self.QUEUED, self.RUNNING, self.PAUSED)
+            )
+            columns = [c[0] for c in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._conn.close()
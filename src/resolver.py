@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Media Resolver - single in-process extraction per URL
+"""
+
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+import yt_dlp
+from yt_dlp.extractor import gen_extractor_classes
+from yt_dlp.utils import sanitize_filename
+
+from .extraction_cache import ExtractionCache
+
+
+@lru_cache(maxsize=4096)
+def canonical_id(url: str) -> Optional[Tuple[str, str]]:
+    """Map a URL to (extractor_key, video_id) without any network access"""
+    for ie in gen_extractor_classes():
+        if ie.ie_key() == 'Generic':
+            continue
+
+        try:
+            if not ie.suitable(url):
+                continue
+            video_id = ie.get_temp_id(url)
+        except Exception:
+            continue
+
+        return (ie.ie_key(), video_id) if video_id else None
+
+    return None
+
+
+class MediaResolver:
+    """Resolves a URL to its title, stream URLs and HTTP headers"""
+
+    def __init__(self, config, cache: Optional[ExtractionCache] = None):
+        self.config = config
+        self.cache = cache
+
+    def _format_spec(self) -> str:
+        """yt-dlp format selector from the download settings"""
+        if self.config.get('extract_audio', False):
+            return 'bestaudio/best'
+
+        spec = self.config.get('download_format', 'best') or 'best'
+        # Sites without separate streams still get the best muxed format
+        if '+' in spec and '/' not in spec:
+            spec += '/best'
+        return spec
+
+    def _format_key(self) -> str:
+        """Cache key for the selected format"""
+        return self._format_spec()
+
+    @staticmethod
+    def _cache_key(url: str) -> Tuple[str, str]:
+        """Canonical video key, or the URL itself for unknown sites"""
+        return canonical_id(url) or ('url', url)
+
+    def _ydl_opts(self) -> Dict:
+        """Build yt-dlp options for extraction"""
+        return {
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+            'skip_download': True,
+            'format': self._format_spec(),
+        }
+
+    def peek(self, url: str) -> Optional[Dict]:
+        """Return cached metadata (title etc.) without touching the network"""
+        if not self.cache:
+            return None
+
+        return self.cache.get_metadata(self._cache_key(url))
+
+    def resolve(self, url: str) -> Dict:
+        """Extract info once and return everything the download needs"""
+        key = self._cache_key(url)
+        fmt = self._format_key()
+
+        if self.cache:
+            cached = self.cache.get(key, fmt)
+            if cached:
+                return cached
+
+        try:
+            with yt_dlp.YoutubeDL(self._ydl_opts()) as ydl:
+                info = ydl.extract_info(url, download=False)
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+        if not info:
+            return {'success': False, 'error': '動画情報の取得に失敗しました'}
+
+        result = self._build_result(info)
+
+        if result['success'] and self.cache:
+            self.cache.put(key, fmt, result)
+
+        return result
+
+    def expire(self, url: str):
+        """Forget cached stream URLs, e.g. after a failed download"""
+        if self.cache:
+            self.cache.expire_streams(self._cache_key(url))
+
+    def _build_result(self, info: Dict) -> Dict:
+        """Pick the fields used by the download stage from an info dict"""
+        # Selected formats (video+audio) or the single muxed format
+        formats = info.get('requested_formats') or [info]
+        streams = [self._stream(f) for f in formats if f.get('url')]
+
+        if not streams:
+            return {'success': False, 'error': 'ダウンロードURLの取得に失敗しました'}
+
+        title = info.get('title') or 'video'
+        ext = info.get('ext') or streams[0]['ext'] or 'mp4'
+
+        return {
+            'success': True,
+            'id': info.get('id'),
+            'extractor_key': info.get('extractor_key'),
+            'webpage_url': info.get('webpage_url'),
+            'title': title,
+            'ext': ext,
+            'filename': f'{sanitize_filename(title)}.{ext}',
+            'filesize': self._filesize(info) or sum(s['filesize'] or 0 for s in streams) or None,
+            'thumbnail': info.get('thumbnail'),
+            'metadata': {
+                'title': title,
+                'artist': info.get('artist') or info.get('uploader'),
+                'date': info.get('upload_date'),
+                'comment': info.get('webpage_url'),
+            },
+            'streams': streams,
+        }
+
+    def _stream(self, fmt: Dict) -> Dict:
+        """Describe a single downloadable stream"""
+        # DASH segment lists are kept as absolute URLs for the fragment downloader
+        fragments = None
+        if isinstance(fmt.get('fragments'), list):
+            base = fmt.get('fragment_base_url') or ''
+            fragments = [f.get('url') or urljoin(base, f.get('path', '')) for f in fmt['fragments']]
+
+        return {
+            'format_id': fmt.get('format_id'),
+            'url': fmt.get('url'),
+            'http_headers': dict(fmt.get('http_headers') or {}),
+            'ext': fmt.get('ext'),
+            'protocol': fmt.get('protocol'),
+            'video': fmt.get('vcodec') != 'none',
+            'audio': fmt.get('acodec') != 'none',
+            'filesize': self._filesize(fmt),
+            'fragments': fragments,
+        }
+
+    @staticmethod
+    def _filesize(fmt: Dict) -> Optional[int]:
+        """Exact or approximate size in bytes"""
+        return fmt.get('filesize') or fmt.get('filesize_approx')
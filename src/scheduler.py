@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Download Scheduler - bounded, prioritized admission of download tasks
+"""
+
+import heapq
+import itertools
+import threading
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+
+class DownloadScheduler:
+    """Starts queued tasks in priority order as download slots become free
+
+    Tasks need a ``start()`` method and must call ``release(task)`` once
+    they have finished. Higher priority runs first; equal priorities run
+    in submission order.
+
+    Optionally each task belongs to groups (e.g. its host and extractor)
+    with their own concurrency limits. A task whose group is saturated is
+    parked on that group's heap and skipped in favour of runnable tasks;
+    it returns to the main queue when the group frees a slot.
+    """
+
+    def __init__(self, max_slots: int = 3,
+                 groups: Optional[Callable[[object], Iterable[Hashable]]] = None,
+                 group_limit: Optional[Callable[[Hashable], int]] = None):
+        self.max_slots = max(1, int(max_slots))
+        self.groups = groups
+        self.group_limit = group_limit
+        self._lock = threading.RLock()
+        self._heap = []  # [-priority, seq, task, valid]
+        self._entries = {}  # task -> heap entry
+        self._running = set()
+        self._seq = itertools.count()
+        self._top_seq = itertools.count(-1, -1)
+        self._group_running: Dict[Hashable, int] = {}
+        self._blocked: Dict[Hashable, list] = {}  # group -> heap of parked entries
+        self._task_groups: Dict[object, tuple] = {}  # running task -> its groups
+
+    def submit(self, task, priority: int = 0):
+        """Queue a task; it starts as soon as a slot is free"""
+        with self._lock:
+            self._push(task, priority, next(self._seq))
+        self._dispatch()
+
+    def release(self, task):
+        """Free the slot held by a finished task and admit the next one"""
+        with self._lock:
+            self._running.discard(task)
+            for group in self._task_groups.pop(task, ()):
+                count = self._group_running[group] - 1
+                if count:
+                    self._group_running[group] = count
+                else:
+                    del self._group_running[group]
+                self._unblock(group)
+        self._dispatch()
+
+    def remove(self, task) -> bool:
+        """Drop a task that has not started yet"""
+        with self._lock:
+            entry = self._entries.pop(task, None)
+            if entry is None:
+                return False
+            entry[-1] = False
+            return True
+
+    def set_priority(self, task, priority: int):
+        """Change the priority of a queued task"""
+        with self._lock:
+            entry = self._entries.get(task)
+            if entry is not None:
+                self._repush(entry, priority, entry[1])
+
+    def move_to_top(self, task) -> Optional[int]:
+        """Run a queued task before every other queued task
+
+        Returns the task's new priority (None if it is not queued). It is
+        raised above every other queued task, so the order also holds when
+        the task is re-submitted with that priority.
+        """
+        with self._lock:
+            entry = self._entries.get(task)
+            if entry is None:
+                return None
+            priority = -entry[0]
+            others = [-e[0] for e in self._entries.values() if e is not entry]
+            if others:
+                priority = max(priority, max(others) + 1)
+            self._repush(entry, priority, next(self._top_seq))
+            return priority
+
+    def move_to_bottom(self, task) -> Optional[int]:
+        """Run a queued task after every other queued task
+
+        Returns the task's new priority (None if it is not queued), lowered
+        below every other queued task.
+        """
+        with self._lock:
+            entry = self._entries.get(task)
+            if entry is None:
+                return None
+            priority = -entry[0]
+            others = [-e[0] for e in self._entries.values() if e is not entry]
+            if others:
+                priority = min(priority, min(others) - 1)
+            self._repush(entry, priority, next(self._seq))
+            return priority
+
+    def set_max_slots(self, max_slots: int):
+        """Change the number of concurrent downloads"""
+        with self._lock:
+            self.max_slots = max(1, int(max_slots))
+        self._dispatch()
+
+    def refresh_limits(self):
+        """Re-check parked tasks after group limits changed"""
+        with self._lock:
+            for heap in self._blocked.values():
+                for entry in heap:
+                    if entry[-1]:
+                        heapq.heappush(self._heap, entry)
+            self._blocked.clear()
+        self._dispatch()
+
+    def group_counts(self) -> Dict[Hashable, int]:
+        """Running tasks per group"""
+        with self._lock:
+            return dict(self._group_running)
+
+    def is_queued(self, task) -> bool:
+        """Whether the task is waiting for a slot"""
+        with self._lock:
+            return task in self._entries
+
+    def pending_count(self) -> int:
+        """Number of tasks waiting for a slot"""
+        with self._lock:
+            return len(self._entries)
+
+    def running_count(self) -> int:
+        """Number of tasks holding a slot"""
+        with self._lock:
+            return len(self._running)
+
+    def _push(self, task, priority: int, seq: int):
+        """Add a heap entry for a task"""
+        entry = [-priority, seq, task, True]
+        self._entries[task] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _repush(self, entry: list, priority: int, seq: int):
+        """Replace a heap entry, leaving the old one to be skipped lazily"""
+        entry[-1] = False
+        self._push(entry[2], priority, seq)
+
+    def _saturated(self, groups: tuple) -> Optional[Hashable]:
+        """First group already at its limit, if any"""
+        for group in groups:
+            limit = self.group_limit(group) if self.group_limit else 0
+            if limit and self._group_running.get(group, 0) >= limit:
+                return group
+        return None
+
+    def _unblock(self, group: Hashable):
+        """Move the best parked task of a group back to the main queue"""
+        heap = self._blocked.get(group)
+        while heap:
+            entry = heapq.heappop(heap)
+            if entry[-1]:
+                heapq.heappush(self._heap, entry)
+                break
+        if not heap:
+            self._blocked.pop(group, None)
+
+    def _dispatch(self):
+        """Start queued tasks while slots are free"""
+        to_start: List = []
+
+        with self._lock:
+            while self._heap and len(self._running) < self.max_slots:
+                entry = heapq.heappop(self._heap)
+                if not entry[-1]:
+                    continue
+
+                task = entry[2]
+                groups = tuple(self.groups(task)) if self.groups else ()
+                full = self._saturated(groups)
+                if full is not None:
+                    # Park it; a runnable task from another group goes first
+                    heapq.heappush(self._blocked.setdefault(full, []), entry)
+                    continue
+
+                del self._entries[task]
+                self._running.add(task)
+                self._task_groups[task] = groups
+                for group in groups:
+                    self._group_running[group] = self._group_running.get(group, 0) + 1
+                to_start.append(task)
+
+        # Start outside the lock; a task may finish (and release) immediately
+        for task in to_start:
+            task.start()
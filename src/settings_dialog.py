@@ -8,10 +8,12 @@ from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
     QLineEdit, QPushButton, QCheckBox, QSpinBox,
     QComboBox, QFileDialog, QTabWidget, QWidget,
-    QLabel, QGroupBox
+    QLabel, QGroupBox, QPlainTextEdit, QMessageBox
 )
 from PyQt5.QtCore import Qt
 
+from .bandwidth import parse_rate, BandwidthSchedule
+
 
 class SettingsDialog(QDialog):
     """Settings dialog"""
@@ -113,6 +115,52 @@ class SettingsDialog(QDialog):
             self.format_input.setCurrentIndex(index)
         form_layout.addRow('フォーマット:', self.format_input)
         
+        # Concurrent downloads
+        self.max_concurrent_input = QSpinBox()
+        self.max_concurrent_input.setMinimum(1)
+        self.max_concurrent_input.setMaximum(32)
+        self.max_concurrent_input.setValue(self.config.get('max_concurrent_downloads', 3))
+        form_layout.addRow('同時ダウンロード数:', self.max_concurrent_input)
+        
+        # Per-host / per-extractor concurrency (0 = no limit)
+        self.per_host_input = QSpinBox()
+        self.per_host_input.setMinimum(0)
+        self.per_host_input.setMaximum(32)
+        self.per_host_input.setSpecialValueText('無制限')
+        self.per_host_input.setValue(self.config.get('max_downloads_per_host', 2))
+        self.per_host_input.setToolTip('同じサイトから同時に実行するダウンロード数。上限に達したサイトのタスクは後回しにし、他のサイトのタスクを先に開始します')
+        form_layout.addRow('サイトごとの同時数:', self.per_host_input)
+        
+        self.per_extractor_input = QSpinBox()
+        self.per_extractor_input.setMinimum(0)
+        self.per_extractor_input.setMaximum(32)
+        self.per_extractor_input.setSpecialValueText('無制限')
+        self.per_extractor_input.setValue(self.config.get('max_downloads_per_extractor', 0))
+        form_layout.addRow('抽出器ごとの同時数:', self.per_extractor_input)
+        
+        # Progress refresh rate
+        self.refresh_hz_input = QSpinBox()
+        self.refresh_hz_input.setMinimum(1)
+        self.refresh_hz_input.setMaximum(30)
+        self.refresh_hz_input.setValue(self.config.get('progress_refresh_hz', 8))
+        form_layout.addRow('進捗更新頻度 (Hz):', self.refresh_hz_input)
+        
+        # Post-processing workers (0 = one per CPU)
+        self.postprocess_workers_input = QSpinBox()
+        self.postprocess_workers_input.setMinimum(0)
+        self.postprocess_workers_input.setMaximum(64)
+        self.postprocess_workers_input.setSpecialValueText('自動 (CPU数)')
+        self.postprocess_workers_input.setValue(self.config.get('postprocess_workers', 0))
+        self.postprocess_workers_input.setToolTip('結合・変換・埋め込みを同時に実行する数。ダウンロード枠とは別に数えます（再起動後に反映）')
+        form_layout.addRow('後処理の同時数:', self.postprocess_workers_input)
+        
+        # Playlist look-ahead
+        self.playlist_lookahead_input = QSpinBox()
+        self.playlist_lookahead_input.setMinimum(1)
+        self.playlist_lookahead_input.setMaximum(500)
+        self.playlist_lookahead_input.setValue(self.config.get('playlist_lookahead', 20))
+        form_layout.addRow('プレイリスト先読み件数:', self.playlist_lookahead_input)
+        
         # Extract audio
         self.extract_audio_check = QCheckBox()
         self.extract_audio_check.setChecked(self.config.get('extract_audio', False))
@@ -138,6 +186,24 @@ class SettingsDialog(QDialog):
         form_layout.addRow('メタデータ埋め込み:', self.embed_metadata_check)
         
         layout.addLayout(form_layout)
+        
+        # Bandwidth
+        bandwidth_group = QGroupBox('帯域制限 (例: 2M, 500K, 0=無制限)')
+        bandwidth_layout = QFormLayout()
+        
+        self.global_limit_input = QLineEdit(str(self.config.get('bandwidth_global_limit', '0')))
+        bandwidth_layout.addRow('全体の上限:', self.global_limit_input)
+        
+        self.task_limit_input = QLineEdit(str(self.config.get('bandwidth_task_limit', '0')))
+        bandwidth_layout.addRow('タスクごとの上限:', self.task_limit_input)
+        
+        self.schedule_input = QPlainTextEdit('\n'.join(self.config.get('bandwidth_schedule', [])))
+        self.schedule_input.setPlaceholderText('unlimited 01:00-07:00\n2M 09:00-18:00')
+        self.schedule_input.setMaximumHeight(80)
+        bandwidth_layout.addRow('時間帯ルール:', self.schedule_input)
+        
+        bandwidth_group.setLayout(bandwidth_layout)
+        layout.addWidget(bandwidth_group)
         layout.addStretch()
         
         return tab
@@ -155,6 +221,10 @@ class SettingsDialog(QDialog):
         self.use_rpc_check.setChecked(self.config.get('aria2c_use_rpc', True))
         mode_layout.addRow('RPCモード使用:', self.use_rpc_check)
         
+        self.manage_daemon_check = QCheckBox()
+        self.manage_daemon_check.setChecked(self.config.get('aria2c_manage_daemon', True))
+        mode_layout.addRow('aria2cデーモンを自動起動:', self.manage_daemon_check)
+        
         mode_group.setLayout(mode_layout)
         layout.addWidget(mode_group)
         
@@ -198,6 +268,17 @@ class SettingsDialog(QDialog):
         self.split_input.setValue(self.config.get('aria2c_split', 16))
         dl_layout.addRow('分割数:', self.split_input)
         
+        self.host_tuning_check = QCheckBox()
+        self.host_tuning_check.setChecked(self.config.get('host_tuning_enabled', True))
+        self.host_tuning_check.setToolTip('ホストごとの速度・エラー率から接続数と分割数を自動で選びます（再起動後に反映）')
+        dl_layout.addRow('ホストごとに自動調整:', self.host_tuning_check)
+        
+        self.host_tuning_max_input = QSpinBox()
+        self.host_tuning_max_input.setMinimum(1)
+        self.host_tuning_max_input.setMaximum(16)
+        self.host_tuning_max_input.setValue(self.config.get('host_tuning_max_connections', 16))
+        dl_layout.addRow('自動調整の上限:', self.host_tuning_max_input)
+        
         dl_group.setLayout(dl_layout)
         layout.addWidget(dl_group)
         
@@ -244,28 +325,52 @@ class SettingsDialog(QDialog):
     
     def save_settings(self):
         """Save settings"""
-        # General
-        self.config.set('output_dir', self.output_dir_input.text())
-        self.config.set('ffmpeg_path', self.ffmpeg_path_input.text())
-        
-        # Download
-        self.config.set('download_format', self.format_input.currentText())
-        self.config.set('extract_audio', self.extract_audio_check.isChecked())
-        self.config.set('audio_format', self.audio_format_input.currentText())
-        self.config.set('embed_thumbnail', self.embed_thumbnail_check.isChecked())
-        self.config.set('embed_metadata', self.embed_metadata_check.isChecked())
-        
-        # aria2c
-        self.config.set('aria2c_use_rpc', self.use_rpc_check.isChecked())
-        self.config.set('aria2c_rpc_url', self.rpc_url_input.text())
-        self.config.set('aria2c_rpc_secret', self.rpc_secret_input.text())
-        self.config.set('aria2c_path', self.aria2c_path_input.text())
-        self.config.set('aria2c_max_connections', self.max_connections_input.value())
-        self.config.set('aria2c_split', self.split_input.value())
-        
-        # Update
-        self.config.set('auto_check_updates', self.auto_check_check.isChecked())
-        self.config.set('auto_update', self.auto_update_check.isChecked())
-        self.config.set('update_manifest_url', self.manifest_url_input.text())
+        schedule = [line.strip() for line in self.schedule_input.toPlainText().splitlines() if line.strip()]
+        try:
+            parse_rate(self.global_limit_input.text())
+            parse_rate(self.task_limit_input.text())
+            for rule in schedule:
+                BandwidthSchedule.parse_rule(rule)
+        except ValueError as e:
+            QMessageBox.warning(self, '帯域制限', f'設定が正しくありません\n\n{e}')
+            return
+        
+        self.config.update({
+            # General
+            'output_dir': self.output_dir_input.text(),
+            'ffmpeg_path': self.ffmpeg_path_input.text(),
+            
+            # Download
+            'download_format': self.format_input.currentText(),
+            'max_concurrent_downloads': self.max_concurrent_input.value(),
+            'max_downloads_per_host': self.per_host_input.value(),
+            'max_downloads_per_extractor': self.per_extractor_input.value(),
+            'progress_refresh_hz': self.refresh_hz_input.value(),
+            'postprocess_workers': self.postprocess_workers_input.value(),
+            'playlist_lookahead': self.playlist_lookahead_input.value(),
+            'extract_audio': self.extract_audio_check.isChecked(),
+            'audio_format': self.audio_format_input.currentText(),
+            'embed_thumbnail': self.embed_thumbnail_check.isChecked(),
+            'embed_metadata': self.embed_metadata_check.isChecked(),
+            'bandwidth_global_limit': self.global_limit_input.text().strip() or '0',
+            'bandwidth_task_limit': self.task_limit_input.text().strip() or '0',
+            'bandwidth_schedule': schedule,
+            
+            # aria2c
+            'aria2c_use_rpc': self.use_rpc_check.isChecked(),
+            'aria2c_manage_daemon': self.manage_daemon_check.isChecked(),
+            'aria2c_rpc_url': self.rpc_url_input.text(),
+            'aria2c_rpc_secret': self.rpc_secret_input.text(),
+            'aria2c_path': self.aria2c_path_input.text(),
+            'aria2c_max_connections': self.max_connections_input.value(),
+            'aria2c_split': self.split_input.value(),
+            'host_tuning_enabled': self.host_tuning_check.isChecked(),
+            'host_tuning_max_connections': self.host_tuning_max_input.value(),
+            
+            # Update
+            'auto_check_updates': self.auto_check_check.isChecked(),
+            'auto_update': self.auto_update_check.isChecked(),
+            'update_manifest_url': self.manifest_url_input.text()
+        })
         
         self.accept()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Write Behind - debounced, atomic saving of a file rendered from live data
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from typing import Callable
+
+
+class WriteBehind:
+    """Coalesces changes made within ``delay`` into one atomic write
+
+    The owner changes its data under its own lock and then calls
+    ``schedule()``; ``flush()`` renders the data under that same lock and
+    writes it to a temp file that is renamed over ``path``. Snapshot and
+    rename happen under one write lock, so a timer flush and an explicit
+    save cannot overtake each other with older data. A failed write stays
+    pending and is retried by the next flush.
+    """
+
+    def __init__(self, path: str, render: Callable[[], str], lock, delay: float,
+                 name: str = 'file', fsync: bool = False):
+        self.path = path
+        self.render = render  # called with ``lock`` held
+        self.lock = lock  # the owner's data lock
+        self.delay = delay
+        self.name = name
+        self.fsync = fsync
+        self._state_lock = threading.Lock()  # always taken after the owner's lock
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._dirty = False
+
+    @property
+    def dirty(self) -> bool:
+        """Whether changes are waiting to be written"""
+        return self._dirty
+
+    def schedule(self):
+        """Mark the data changed and start the delay timer if it is not running"""
+        with self._state_lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write pending changes now (no-op if clean)"""
+        with self._write_lock:
+            with self.lock, self._state_lock:
+                if self._timer:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return
+                content = self.render()
+                self._dirty = False
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(prefix='.write-', suffix='.tmp', dir=directory)
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        f.write(content)
+                        if self.fsync:
+                            f.flush()
+                            os.fsync(f.fileno())
+                    os.replace(tmp_path, self.path)
+                except Exception:
+                    os.unlink(tmp_path)
+                    raise
+            except Exception as e:
+                with self._state_lock:
+                    self._dirty = True
+                print(f'Failed to save {self.name}: {e}', file=sys.stderr)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Aria2EventListener against a fake aria2 WebSocket endpoint
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from src.aria2_events import Aria2EventListener  # noqa: E402
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() is true"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class FakeAria2:
+    """aria2's /jsonrpc WebSocket, served from its own event loop"""
+
+    def __init__(self):
+        self.sockets = []
+        self.connections = 0
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self._call(self._start())
+
+    @property
+    def rpc_url(self):
+        return f'http://127.0.0.1:{self.port}/jsonrpc'
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(5)
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get('/jsonrpc', self._handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = self.runner.addresses[0][1]
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        self.connections += 1
+        async for _ in ws:
+            pass  # the listener never sends calls
+        if ws in self.sockets:
+            self.sockets.remove(ws)
+        return ws
+
+    def notify(self, method, *gids):
+        """Push a notification like aria2 does (one params entry per GID)"""
+        payload = json.dumps({
+            'jsonrpc': '2.0',
+            'method': method,
+            'params': [{'gid': gid} for gid in gids],
+        })
+        self._call(self._send(payload))
+
+    async def _send(self, payload):
+        for ws in list(self.sockets):
+            await ws.send_str(payload)
+
+    def drop(self):
+        """Close every open socket from the server side"""
+        self._call(self._drop())
+
+    async def _drop(self):
+        sockets, self.sockets = self.sockets, []
+        for ws in sockets:
+            await ws.close()
+
+    def close(self):
+        self._call(self.runner.cleanup())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(5)
+        self.loop.close()
+
+
+class Recorder:
+    """Callback collecting (event, gid) pairs"""
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event, gid):
+        self.events.append((event, gid))
+
+
+@pytest.fixture
+def server():
+    fake = FakeAria2()
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def listener(server):
+    events = Aria2EventListener(server.rpc_url, reconnect_delay=0.05)
+    events.start()
+    assert events.connected.wait(5)
+    assert wait_for(lambda: server.sockets)
+    yield events
+    events.stop()
+
+
+def test_routes_notifications_by_gid(server, listener):
+    first, second = Recorder(), Recorder()
+    listener.subscribe('0000000000000001', first)
+    listener.subscribe('0000000000000002', second)
+
+    server.notify('aria2.onDownloadComplete', '0000000000000001')
+    server.notify('aria2.onDownloadError', '0000000000000002')
+    server.notify('aria2.onDownloadComplete', '00000000000000ff')
+
+    assert wait_for(lambda: first.events and second.events)
+    assert first.events == [('complete', '0000000000000001')]
+    assert second.events == [('error', '0000000000000002')]
+
+
+def test_unsubscribed_gid_gets_nothing(server, listener):
+    recorder, marker = Recorder(), Recorder()
+    listener.subscribe('0000000000000001', recorder)
+    listener.subscribe('00000000000000aa', marker)
+    listener.unsubscribe('0000000000000001')
+
+    server.notify('aria2.onDownloadComplete', '0000000000000001')
+    server.notify('aria2.onDownloadComplete', '00000000000000aa')
+
+    # Notifications arrive in order: once the marker has fired, the first was handled
+    assert wait_for(lambda: marker.events)
+    assert recorder.events == []
+
+
+def test_buffers_events_that_arrive_before_subscribe(server, listener):
+    marker = Recorder()
+    listener.subscribe('00000000000000aa', marker)
+
+    server.notify('aria2.onDownloadError', '0000000000000003')
+    server.notify('aria2.onDownloadComplete', '00000000000000aa')
+    assert wait_for(lambda: marker.events)
+
+    late = Recorder()
+    listener.subscribe('0000000000000003', late)
+    assert late.events == [('error', '0000000000000003')]
+
+    # The buffered event is delivered once, not again to a later subscriber
+    again = Recorder()
+    listener.unsubscribe('0000000000000003')
+    listener.subscribe('0000000000000003', again)
+    assert again.events == []
+
+
+def test_reconnects_after_server_drops_socket(server, listener):
+    server.drop()
+    assert wait_for(lambda: server.connections == 2 and server.sockets)
+    assert listener.connected.wait(5)
+
+    recorder = Recorder()
+    listener.subscribe('0000000000000004', recorder)
+    server.notify('aria2.onDownloadComplete', '0000000000000004')
+
+    assert wait_for(lambda: recorder.events)
+    assert recorder.events == [('complete', '0000000000000004')]